@@ -0,0 +1,49 @@
+import json
+import sys
+import time
+import urllib.request
+
+from http_client import HTTPClient
+from rakuten_stub import RakutenStub, make_item, make_self_signed_context
+
+# 使い方: python -m benchmarks.bench_http [リクエスト数]
+# ローカルHTTPSスタブに対して、毎回 urlopen する旧方式と接続プール方式の1リクエストあたりのレイテンシを比較する
+
+
+def stub_catalog(params):
+    return [make_item(f"ベンチ作品{n}", f"作者{n % 50}", caption="あらすじ" * 40) for n in range(300)]
+
+
+def bench_urlopen(url, n, ctx):
+    start = time.perf_counter()
+    for i in range(n):
+        req = urllib.request.Request(f"{url}?page={i % 10 + 1}", headers={'User-Agent': 'Mozilla/5.0'})
+        with urllib.request.urlopen(req, context=ctx) as response:
+            json.loads(response.read().decode('utf-8'))
+    return (time.perf_counter() - start) / n
+
+
+def bench_pooled(url, n, ctx):
+    client = HTTPClient(ssl_context=ctx)
+    start = time.perf_counter()
+    for i in range(n):
+        client.get_json(f"{url}?page={i % 10 + 1}")
+    elapsed = time.perf_counter() - start
+    client.close()
+    return elapsed / n
+
+
+def main(n=200):
+    server_ctx, client_ctx = make_self_signed_context()
+    with RakutenStub(stub_catalog, ssl_context=server_ctx) as stub:
+        old = bench_urlopen(stub.url, n, client_ctx)
+        new = bench_pooled(stub.url, n, client_ctx)
+    print(f"requests: {n}")
+    print(f"urlopen (new connection each time): {old * 1000:.2f} ms/req")
+    print(f"pooled keep-alive + gzip:           {new * 1000:.2f} ms/req")
+    print(f"speedup: x{old / new:.1f}")
+    return {"urlopen_ms": old * 1000, "pooled_ms": new * 1000}
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
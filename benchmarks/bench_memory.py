@@ -0,0 +1,98 @@
+import json
+import resource
+import subprocess
+import sys
+import time
+
+# 使い方: python -m benchmarks.bench_memory [件数]
+# 合成カタログ（benchmarks.rakuten_corpus）のクロール結果から、シリーズへのまとめ・並べ替え・SSG の描画
+# （書き込みはしない）までを通したときのメモリ使用量を、クロール結果の持ち方ごとに別プロセスで測る。
+#   raw      API の Item を dict のまま保持し、SSG の全ページの値を先にリストにする（従来の持ち方）
+#   compact  ItemRecord で保持し、SSG のページは1件ずつ作る
+# 解説文はキャッシュなしで生成する（キャッシュの DB はどちらの方式でも同じだけ使うため除く）
+
+MODES = ["raw", "compact"]
+
+
+def rss_mb():
+    # 現在の常駐メモリ（Linux の /proc から。無ければピーク値で代用）
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * resource.getpagesize() / 2 ** 20
+    except OSError:
+        return peak_mb()
+
+
+def peak_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2 ** 20 if sys.platform == "darwin" else peak / 1024
+
+
+def child(mode, n):
+    import generate_data
+    from benchmarks.rakuten_corpus import RakutenCorpus
+    from commentary_engine import CommentaryEngine
+    from item_record import ItemRecord
+    from ssg_template import PageTemplate
+
+    generate_data.COMMENTARY = CommentaryEngine(generate_data.VOLUME_HIGHLIGHTS)
+    corpus = RakutenCorpus(n)
+    stages = {"baseline": rss_mb()}
+    start = time.perf_counter()
+
+    # クロール: 1ページ(30件)ずつ判定して受け入れたものを保持する
+    series_map = {}
+    for i in range(0, n, 30):
+        page = [corpus.item(j) for j in range(i, min(n, i + 30))]
+        for r in generate_data.NORMALIZER.classify_page(page, series=False):
+            if r["is_manga"] and r["id"] not in series_map:
+                series_map[r["id"]] = r["item"] if mode == "raw" else ItemRecord.from_api(r["item"])
+    stages["crawled"] = rss_mb()
+
+    if mode == "raw":
+        # 従来はまとめの間も API の Item が残っていた
+        groups = generate_data.group_series({k: ItemRecord.from_api(v) for k, v in series_map.items()})
+    else:
+        groups = generate_data.group_series(series_map)
+        del series_map
+    manga_list = generate_data.order_series(groups)
+    del groups
+    stages["grouped"] = rss_mb()
+
+    template = PageTemplate.from_file("index.html")
+    pages = generate_data.ssg_pages(manga_list)
+    if mode == "raw":
+        pages = list(pages)
+    rendered = 0
+    for path, values in pages:
+        template.render(**values)
+        rendered += 1
+    stages["ssg"] = rss_mb()
+    return {"mode": mode, "items": n, "manga": len(manga_list), "pages": rendered, "seconds": time.perf_counter() - start,
+            "peak_mb": peak_mb(), "stages_mb": stages}
+
+
+def run_child(mode, n):
+    out = subprocess.run([sys.executable, "-m", "benchmarks.bench_memory", "--child", mode, str(n)],
+                         check=True, capture_output=True, text=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main(n=500000):
+    rows = [run_child(mode, n) for mode in MODES]
+    for r in rows:
+        s = r["stages_mb"]
+        growth = r["peak_mb"] - s["baseline"]
+        print(f"{r['mode']:<8} {r['items']:>7} items -> {r['manga']} manga / {r['pages']} pages in {r['seconds']:.1f}s")
+        print(f"         rss: crawled {s['crawled'] - s['baseline']:>7.0f} MB, grouped {s['grouped'] - s['baseline']:>7.0f} MB, "
+              f"ssg {s['ssg'] - s['baseline']:>7.0f} MB   peak growth {growth:>7.0f} MB")
+    raw, compact = rows
+    print(f"peak growth reduction: x{(raw['peak_mb'] - raw['stages_mb']['baseline']) / (compact['peak_mb'] - compact['stages_mb']['baseline']):.1f}")
+    return rows
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        print(json.dumps(child(sys.argv[2], int(sys.argv[3]))))
+    else:
+        main(int(sys.argv[1]) if len(sys.argv) > 1 else 500000)
@@ -0,0 +1,130 @@
+import gzip
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.dataset import synthetic_manga_list
+from search_index import build_search_index, fuse_record, search_docs
+
+# 使い方: python -m benchmarks.bench_search_index [件数...]
+# 検索インデックスのサイズと、クライアント側で Fuse のインデックスを用意するコストを比較する。
+#   runtime:  ブラウザで索引を作る（fuse.js 7 の FuseIndex.create と同じ処理）
+#   full:     Fuse.createIndex().toJSON() 形式の JSON をパースする（本文を二重に持つ）
+#   compact:  search.json（ノルムのみ）をパースして手元のデータからレコードを組み立てる
+# クライアント側は node で計測する（各7回の中央値）。node が無ければサイズのみ
+
+NODE_SCRIPT = r"""
+const fs = require('fs');
+const [docsPath, fullPath, compactPath] = process.argv.slice(1);
+const SPACE = /[^ ]+/g;
+function norm(value) {
+  const n = 1 / Math.pow(value.match(SPACE).length, 0.5);
+  return parseFloat(Math.round(n * 1000) / 1000);
+}
+const isBlank = v => !v.trim().length;
+const keys = ['seriesTitle', 'title', 'author', 'description', 'tags'];
+function createIndex(docs) {
+  return docs.map((doc, i) => {
+    const $ = {};
+    keys.forEach((key, k) => {
+      const value = doc[key];
+      if (value === undefined || value === null) return;
+      if (Array.isArray(value)) {
+        const sub = [];
+        const stack = value.filter(v => v !== undefined && v !== null).map((v, j) => ({ j, v }));
+        while (stack.length) {
+          const { j, v } = stack.pop();
+          if (typeof v === 'string' && !isBlank(v)) sub.push({ v, i: j, n: norm(v) });
+        }
+        $[k] = sub;
+      } else if (typeof value === 'string' && !isBlank(value)) {
+        $[k] = { v: value, n: norm(value) };
+      }
+    });
+    return { i, $ };
+  });
+}
+function expand(docs, norms) {
+  return norms.map((fields, i) => {
+    const $ = {};
+    Object.keys(fields).forEach(k => {
+      const value = docs[i][keys[k]];
+      const n = fields[k];
+      if (Array.isArray(n)) {
+        const values = value.filter(v => v !== undefined && v !== null);
+        $[k] = n.map(([j, nn]) => ({ v: values[j], i: j, n: nn }));
+      } else {
+        $[k] = { v: value, n };
+      }
+    });
+    return { i, $ };
+  });
+}
+function median(f) {
+  const runs = [];
+  let out;
+  for (let r = 0; r < 7; r++) {
+    const t = process.hrtime.bigint();
+    out = f();
+    runs.push(Number(process.hrtime.bigint() - t) / 1e6);
+  }
+  return [runs.sort((a, b) => a - b)[3], out];
+}
+const docs = JSON.parse(fs.readFileSync(docsPath, 'utf8'));
+const full = fs.readFileSync(fullPath, 'utf8');
+const compact = fs.readFileSync(compactPath, 'utf8');
+const [runtimeMs, built] = median(() => createIndex(docs));
+const [fullMs, parsed] = median(() => JSON.parse(full).records);
+const [compactMs, expanded] = median(() => expand(docs, JSON.parse(compact).norms));
+const same = JSON.stringify(built) === JSON.stringify(parsed) && JSON.stringify(built) === JSON.stringify(expanded);
+console.log(JSON.stringify({ runtimeMs, fullMs, compactMs, same }));
+"""
+
+
+def measure(n, node):
+    manga_list = synthetic_manga_list(n)
+    start = time.perf_counter()
+    data = build_search_index(manga_list)
+    build_s = time.perf_counter() - start
+    compact = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    docs = [doc for _, _, doc in search_docs(manga_list)]
+    full = json.dumps({"keys": data["keys"], "records": [fuse_record(doc, i) for i, doc in enumerate(docs)]},
+                      ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    row = {"items": n, "docs": len(docs), "python_build_s": build_s,
+           "compact_bytes": len(compact), "compact_gzip": len(gzip.compress(compact)),
+           "full_bytes": len(full), "full_gzip": len(gzip.compress(full))}
+    if node:
+        tmp = tempfile.mkdtemp(prefix="bench_search_")
+        try:
+            paths = [os.path.join(tmp, name) for name in ("docs.json", "full.json", "search.json")]
+            for path, body in zip(paths, [json.dumps(docs, ensure_ascii=False).encode("utf-8"), full, compact]):
+                with open(path, "wb") as f:
+                    f.write(body)
+            out = subprocess.run([node, "-e", NODE_SCRIPT] + paths, check=True, capture_output=True, text=True).stdout
+            row.update(json.loads(out))
+        finally:
+            shutil.rmtree(tmp)
+    return row
+
+
+def main(sizes=(5000, 50000)):
+    node = shutil.which("node")
+    rows = [measure(n, node) for n in sizes]
+    for r in rows:
+        print(f"{r['items']:>6} items / {r['docs']:>6} docs (python build {r['python_build_s'] * 1000:.0f} ms)")
+        print(f"  size     full {r['full_bytes'] / 1024:>8,.0f} KB (gzip {r['full_gzip'] / 1024:>6,.0f} KB)"
+              f"   compact {r['compact_bytes'] / 1024:>7,.0f} KB (gzip {r['compact_gzip'] / 1024:>5,.0f} KB)")
+        if "runtimeMs" in r:
+            print(f"  client   runtime {r['runtimeMs']:>6.1f} ms   full {r['fullMs']:>6.1f} ms"
+                  f"   compact {r['compactMs']:>6.1f} ms{'' if r['same'] else '   (MISMATCH)'}")
+    if not node:
+        print("node not found: client-side timings skipped")
+    return rows
+
+
+if __name__ == "__main__":
+    main(tuple(int(a) for a in sys.argv[1:]) or (5000, 50000))
@@ -0,0 +1,60 @@
+import re
+import sys
+import time
+
+from benchmarks.dataset import load_manga_list
+from ssg_template import PageTemplate
+
+# 使い方: python -m benchmarks.bench_ssg_render
+# 旧来の re.sub 5回方式とコンパイル済みテンプレートの描画速度（ページ/秒）を比較する（書き込みは含まない）
+
+
+def render_regex(template, m):
+    title, author, cover, m_id = m["title"], m["author"], m["cover"], m["id"]
+    page_html = template
+    page_html = re.sub(r'<title>.*?</title>', f'<title>{title} - Manga Reach</title>', page_html)
+    descript_text = f"{title}（{author}）のあらすじ、詳細データ、購入リンク。"
+    page_html = re.sub(r'<meta name="description" content=".*?" />', f'<meta name="description" content="{descript_text}" />', page_html)
+    page_html = re.sub(r'<meta property="og:title" content=".*?" />', f'<meta property="og:title" content="{title} - Manga Reach" />', page_html)
+    page_html = re.sub(r'<meta property="og:image" content=".*?" />', f'<meta property="og:image" content="{cover}" />', page_html)
+    page_html = re.sub(r'<link rel="canonical" href=".*?" />', f'<link rel="canonical" href="https://manga-reach.com/manga/{m_id}" />', page_html)
+    return page_html
+
+
+def render_compiled(template, m):
+    title = m["title"]
+    return template.render(
+        title=f"{title} - Manga Reach",
+        description=f"{title}（{m['author']}）のあらすじ、詳細データ、購入リンク。",
+        og_title=f"{title} - Manga Reach",
+        og_image=m["cover"],
+        canonical=f"https://manga-reach.com/manga/{m['id']}"
+    )
+
+
+def bench(render, template, manga_list):
+    start = time.perf_counter()
+    for m in manga_list:
+        render(template, m)
+    return len(manga_list) / (time.perf_counter() - start)
+
+
+def main(n=None):
+    manga_list = load_manga_list(n)
+    with open("index.html", "r", encoding="utf-8") as f:
+        source = f.read()
+    start = time.perf_counter()
+    compiled = PageTemplate(source)
+    parse_ms = (time.perf_counter() - start) * 1000
+
+    regex_pps = bench(render_regex, source, manga_list)
+    compiled_pps = bench(render_compiled, compiled, manga_list)
+    print(f"pages: {len(manga_list)} (template parse {parse_ms:.2f} ms, once)")
+    print(f"re.sub x5:          {regex_pps:>10,.0f} pages/s")
+    print(f"compiled template:  {compiled_pps:>10,.0f} pages/s")
+    print(f"speedup: x{compiled_pps / regex_pps:.1f}")
+    return {"regex_pages_per_sec": regex_pps, "compiled_pages_per_sec": compiled_pps}
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else None)
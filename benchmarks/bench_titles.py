@@ -0,0 +1,49 @@
+import sys
+import time
+
+from benchmarks import legacy_titles
+from benchmarks.title_corpus import title_corpus
+from generate_data import LEGENDARY_TITLES, NEGATIVE_KEYWORDS, NORMALIZER, SPECIAL_KEYWORDS
+
+# 使い方: python -m benchmarks.bench_titles [件数]
+# 取得済みタイトルを元にしたコーパスで clean_title / is_manga / get_series_info の処理速度（件/秒）を比較する
+
+
+def run_legacy(items):
+    out = []
+    for item in items:
+        v = item["Item"]
+        title = legacy_titles.clean_title(v["title"])
+        if legacy_titles.is_manga(title, v["itemCaption"], v["booksGenreId"], NEGATIVE_KEYWORDS, LEGENDARY_TITLES):
+            out.append(legacy_titles.get_series_info(v["title"], v["author"], SPECIAL_KEYWORDS, LEGENDARY_TITLES))
+    return out
+
+
+def run_batch(items):
+    # APIの1ページ(30件)単位でまとめて判定する
+    out = []
+    for i in range(0, len(items), 30):
+        out.extend(r for r in NORMALIZER.classify_page(items[i:i + 30]) if r["is_manga"])
+    return out
+
+
+def timed(fn, items):
+    start = time.perf_counter()
+    result = fn(items)
+    return len(items) / (time.perf_counter() - start), len(result)
+
+
+def main(n=50000):
+    items = title_corpus(n)
+    legacy_ips, legacy_n = timed(run_legacy, items)
+    batch_ips, batch_n = timed(run_batch, items)
+    assert legacy_n == batch_n
+    print(f"titles: {len(items)} ({batch_n} accepted as manga)")
+    print(f"legacy per-keyword regex: {legacy_ips:>10,.0f} items/s")
+    print(f"compiled batch:           {batch_ips:>10,.0f} items/s")
+    print(f"speedup: x{batch_ips / legacy_ips:.1f}")
+    return {"legacy_items_per_sec": legacy_ips, "batch_items_per_sec": batch_ips}
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
@@ -0,0 +1,72 @@
+import glob
+import json
+import os
+import sys
+
+from benchmarks.suite import RESULTS_DIR
+
+# 使い方: python -m benchmarks.compare [旧.json 新.json]
+# benchmarks.suite の結果2つを並べて比較する（省略時は RESULTS_DIR の新しい2つ）。
+# *_per_sec は大きいほど、*seconds は小さいほど良い。どちらかに 10% 以上動いた項目に印をつける
+
+THRESHOLD = 0.10
+
+
+def load(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def latest(results_dir=RESULTS_DIR, count=2):
+    paths = sorted(glob.glob(os.path.join(results_dir, "*.json")), key=os.path.getmtime)
+    if len(paths) < count:
+        raise SystemExit(f"need {count} results in {results_dir}, found {len(paths)}")
+    return paths[-count:]
+
+
+def verdict(key, old, new):
+    if not old or not isinstance(old, (int, float)):
+        return ""
+    change = (new - old) / old
+    if abs(change) < THRESHOLD:
+        return ""
+    if key.endswith("_per_sec"):
+        return "faster" if change > 0 else "SLOWER"
+    if key.endswith("seconds"):
+        return "faster" if change < 0 else "SLOWER"
+    return "changed"
+
+
+def compare(old, new):
+    rows = []
+    for name, values in new["results"].items():
+        before = old["results"].get(name, {})
+        for key, value in values.items():
+            prev = before.get(key)
+            ratio = value / prev if isinstance(prev, (int, float)) and prev else None
+            rows.append((name, key, prev, value, ratio, verdict(key, prev, value)))
+    return rows
+
+
+def fmt(value):
+    if value is None:
+        return "-"
+    return f"{value:,.3f}" if isinstance(value, float) else f"{value:,}"
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    old_path, new_path = argv if len(argv) == 2 else latest()
+    old, new = load(old_path), load(new_path)
+    print(f"old: {os.path.basename(old_path)} (commit {old['commit']}, scale {old['scale']})")
+    print(f"new: {os.path.basename(new_path)} (commit {new['commit']}, scale {new['scale']})")
+    if old["scale"] != new["scale"] or old.get("options") != new.get("options"):
+        print("warning: scale or options differ between runs")
+    rows = compare(old, new)
+    for name, key, prev, value, ratio, mark in rows:
+        print(f"  {name + '.' + key:<36} {fmt(prev):>16} {fmt(value):>16} {'x%.2f' % ratio if ratio else '':>7} {mark}")
+    return rows
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+import json
+import os
+import random
+
+# ベンチマーク用のデータセット
+# src/data/mangaData.json があればそれを使い、無ければ同程度の規模の合成データを作る
+
+DATA_FILE = "src/data/mangaData.json"
+
+TITLE_WORDS = ["異世界", "転生", "勇者", "魔王", "恋", "学園", "探偵", "剣", "王国", "少女", "竜", "料理", "令嬢", "最強", "&", "\"特別\""]
+
+
+def synthetic_manga_list(n=7400, seed=0):
+    rng = random.Random(seed)
+    items = []
+    series_count = max(1, n * 3 // 8)
+    for i in range(n):
+        s = rng.randrange(series_count)
+        series_title = "".join(rng.choice(TITLE_WORDS) for _ in range(3)) + f"{s}"
+        vol = rng.randint(1, 40)
+        items.append({
+            "id": f"{i:012x}", "title": f"{series_title} {vol}", "seriesId": f"{s:012x}",
+            "seriesTitle": series_title, "volumeNumber": str(vol), "isSpecial": False,
+            "description": "あらすじ" * 20, "commentary": "解説" * 50,
+            "tags": [f"作者{s % 500}", "漫画", series_title], "author": f"作者{s % 500}",
+            "rating": round(rng.uniform(4.5, 5.0), 1),
+            "cover": f"https://thumbnail.image.rakuten.co.jp/@0_mall/book/cabinet/{i}.jpg?_ex=300x420",
+            "genreId": "001001001", "isLegendary": False
+        })
+    return items
+
+
+def load_manga_list(n=None):
+    if os.path.exists(DATA_FILE):
+        with open(DATA_FILE, "r", encoding="utf-8") as f:
+            items = json.load(f)
+        return items[:n] if n else items
+    return synthetic_manga_list(n or 7400)
@@ -0,0 +1,49 @@
+import hashlib
+import re
+
+# 比較用: 正規化エンジン導入前の clean_title / get_series_info / is_manga の実装（そのままの写し）
+
+
+def zen_to_han(text):
+    return text.translate(str.maketrans('０１２３４５６７８９', '0123456789'))
+
+
+def clean_title(title):
+    title = zen_to_han(title)
+    cleaned = re.sub(r'\(.*?\)|（.*?）', '', title)
+    cleaned = re.sub(r'【.*?】|\[.*?\]', '', cleaned)
+    cleaned = re.sub(r'[\(\)（）]', '', cleaned).strip()
+    return cleaned
+
+
+def get_series_info(title, author, special_keywords, legendary_titles):
+    title = clean_title(title)
+    is_special = any(sk in title for sk in special_keywords)
+    base_search_title = re.sub(r'[!！?？:：\s]', '', title)
+    vol_match = re.search(r'(\d+)$', base_search_title)
+    vol_num = vol_match.group(1) if vol_match else "1"
+    core_title = title
+    for sk in special_keywords:
+        core_title = re.sub(sk, '', core_title, flags=re.IGNORECASE).strip()
+    core_title = re.sub(r'\s*\d+$', '', core_title).strip()
+    normalized_core_name = re.sub(r'[!！?？:：\s]', '', core_title)
+    for lt in legendary_titles:
+        norm_lt = re.sub(r'[!！?？:：\s]', '', lt)
+        if normalized_core_name.startswith(norm_lt) or norm_lt.startswith(normalized_core_name):
+            normalized_core_name = norm_lt
+            core_title = lt
+            break
+    if not normalized_core_name: normalized_core_name = "unknown"
+    series_id = hashlib.md5((normalized_core_name + author).encode()).hexdigest()[:12]
+    return series_id, core_title, vol_num, is_special
+
+
+def is_manga(title, description, genre_id, negative_keywords, legendary_titles):
+    if genre_id and not genre_id.startswith("001001"): return False
+    LEGENDARY_UPPER = [lt.upper() for lt in legendary_titles]
+    TITLE_UPPER = title.upper()
+    if any(lt in TITLE_UPPER for lt in LEGENDARY_UPPER): return True
+    if re.search(r'\d{4}年\s*\d+号', title) or re.search(r'\d+号$', title): return False
+    text = (title + " " + (description or "")).lower()
+    if any(nk.lower() in text for nk in negative_keywords): return False
+    return True
@@ -0,0 +1,235 @@
+import random
+from array import array
+from datetime import date, timedelta
+
+# ベンチマーク用の合成楽天ブックスカタログ
+# 実APIの Items と同じ形（{"Item": {...}}）のアイテムを、シード固定で 5k〜500k 件規模まで作る。
+# シリーズごとに通常巻（半角・全角の巻数、レーベル括弧つき）、特装版・外伝・ファンブック、画集・小説などの
+# 除外対象、雑誌の号数、表紙なし（noimage）を混ぜ、ジャンル×ソート順（reviewCount / sales / standard /
+# -releaseDate）とタイトル検索（title=）でページングできるようにする。
+# 電子書籍の取得元（BooksEbook / Kobo）向けに、電子版のある巻（約7割）を各取得元の形で返すビューも持つ
+# アイテムは項目ごとの array に整数で持ち、ページを返すときにだけ dict を組み立てる（500k 件でも数十MB）
+
+GENRES = ["001001001", "001001002", "001001003", "001001004", "001001006", "001001007", "001001008"]
+SCALES = {"5k": 5000, "50k": 50000, "500k": 500000}
+
+# generate_data.LEGENDARY_TITLES の一部。Phase 2 のキーワード検索で多くの巻がヒットする
+LEGENDARY = ["ONE PIECE", "NARUTO", "BLEACH", "鬼滅の刃", "呪術廻戦", "キングダム", "名探偵コナン", "ブルーロック",
+             "進撃の巨人", "ハイキュー!!", "SPY×FAMILY", "ジョジョの奇妙な冒険"]
+HEADS = ["異世界", "転生", "最強", "薬屋の", "放課後", "辺境の", "悪役令嬢", "魔法", "恋する", "迷宮", "銀河", "江戸", "深夜の",
+         "ダンジョン", "スキル", "追放された", "チート", "令和"]
+TAILS = ["勇者", "魔王", "探偵", "剣士", "料理人", "花嫁", "ひとりごと", "騎士団", "食堂", "錬金術師", "少女", "竜", "学園",
+         "バンド", "監獄", "医者", "聖女", "ライフ"]
+LAST_NAMES = ["佐藤", "鈴木", "高橋", "田中", "伊藤", "渡辺", "山本", "中村", "小林", "加藤", "吉田", "山田", "松本", "井上"]
+FIRST_NAMES = ["翔", "陽菜", "蓮", "結衣", "悠真", "さくら", "湊", "美咲", "大和", "葵", "ユウキ", "ヒカル", "あきら"]
+LABELS = ["ジャンプコミックス", "少年マガジンKC", "ビッグコミックス", "花とゆめコミックス", "MFC", "ヤングジャンプコミックス"]
+PUBLISHERS = ["集英社", "講談社", "小学館", "白泉社", "KADOKAWA", "スクウェア・エニックス"]
+MAGAZINES = ["週刊少年ジャンプ", "週刊少年マガジン", "週刊ヤングジャンプ", "別冊マーガレット", "月刊少年ガンガン"]
+CAPTIONS = [
+    "", "大人気シリーズ最新刊！", "待望のアニメ化作品。", "累計発行部数1000万部突破の話題作。",
+    "{name}、ついに新章突入！仲間たちとの絆が試される。", "描き下ろしイラスト集を収録した特別版。",
+    "宿命のライバルとの決戦の行方は――。{name}第{vol}巻。",
+]
+NOIMAGE_URL = "https://thumbnail.image.rakuten.co.jp/@0_mall/book/cabinet/noimage_01.gif"
+
+# 種別: 通常巻 / 全角巻数 / レーベル括弧つき / 特装版 / 外伝 / ファンブック / 画集（除外） / 小説（除外） / 雑誌号（除外）
+KIND_VOLUME, KIND_ZEN, KIND_LABEL, KIND_SPECIAL_ED, KIND_GAIDEN, KIND_FANBOOK, KIND_ARTBOOK, KIND_NOVEL, KIND_MAGAZINE = range(9)
+ZEN = str.maketrans("0123456789", "０１２３４５６７８９")
+EPOCH = date(2000, 1, 1)
+SORTS = ("reviewCount", "sales", "standard", "-releaseDate")
+KOBO_COMIC_GENRE = "101904"
+
+
+class RakutenCorpus:
+    def __init__(self, n=5000, seed=0):
+        self.n = n
+        self.seed = seed
+        rng = random.Random(seed)
+        # シリーズ: (名前, 著者, ジャンル番号, 出版社番号)
+        self.series = []
+        fields = ("series", "kind", "vol", "genre", "reviews", "sales", "day", "flags")
+        self.cols = {f: array("i") for f in fields}
+        legendary = list(LEGENDARY)
+        while len(self.cols["kind"]) < n:
+            self._add_series(rng, legendary.pop(0) if legendary and rng.random() < 0.2 else None)
+        for col in self.cols.values():
+            del col[n:]
+        self._sorted = {}
+        self._keyword = {}
+        self._ebook = {}
+
+    def _add_series(self, rng, legendary_name):
+        s = len(self.series)
+        if legendary_name:
+            name, volumes, popularity = legendary_name, rng.randint(30, 110), rng.uniform(50, 200)
+        elif rng.random() < 0.005:
+            name, volumes, popularity = rng.choice(MAGAZINES), rng.randint(10, 40), rng.uniform(0.1, 1)
+        else:
+            name = rng.choice(HEADS) + rng.choice(TAILS) + ("" if rng.random() < 0.5 else str(s))
+            # 巻数は裾の重い分布（大半は数巻、まれに長期連載）
+            volumes, popularity = min(120, int(rng.paretovariate(1.3))), min(1000.0, rng.paretovariate(1.5))
+        magazine = name in MAGAZINES
+        self.series.append((name, rng.choice(LAST_NAMES) + rng.choice(FIRST_NAMES), rng.randrange(len(GENRES)),
+                            rng.randrange(len(PUBLISHERS))))
+        start = rng.randrange(0, 7000)
+        entries = [(KIND_MAGAZINE if magazine else rng.choices(
+            (KIND_VOLUME, KIND_ZEN, KIND_LABEL), (85, 5, 10))[0], v) for v in range(1, volumes + 1)]
+        if not magazine and volumes >= 5:
+            for kind, p in ((KIND_SPECIAL_ED, 0.2), (KIND_GAIDEN, 0.1), (KIND_FANBOOK, 0.15), (KIND_ARTBOOK, 0.1), (KIND_NOVEL, 0.1)):
+                if rng.random() < p:
+                    entries.append((kind, rng.randint(1, volumes)))
+        c = self.cols
+        for kind, v in entries:
+            c["series"].append(s)
+            c["kind"].append(kind)
+            c["vol"].append(v)
+            c["genre"].append(self.series[s][2])
+            c["reviews"].append(int(popularity * rng.uniform(5, 40) / (1 + v * 0.05)))
+            c["sales"].append(int(popularity * rng.uniform(50, 400)))
+            c["day"].append(start + v * rng.randint(60, 120))
+            # bit0: 表紙なし, bit1: あらすじ無し
+            c["flags"].append((rng.random() < 0.01) | ((rng.random() < 0.15) << 1))
+
+    def __len__(self):
+        return self.n
+
+    def title(self, i):
+        name = self.series[self.cols["series"][i]][0]
+        kind, vol = self.cols["kind"][i], self.cols["vol"][i]
+        if kind == KIND_VOLUME:
+            return f"{name} {vol}"
+        if kind == KIND_ZEN:
+            return f"{name} {str(vol).translate(ZEN)}"
+        if kind == KIND_LABEL:
+            return f"{name} {vol}（{LABELS[vol % len(LABELS)]}）"
+        if kind == KIND_SPECIAL_ED:
+            return f"{name} {vol} 特装版"
+        if kind == KIND_GAIDEN:
+            return f"{name} 外伝 {vol % 5 + 1}"
+        if kind == KIND_FANBOOK:
+            return f"{name} 公式ファンブック"
+        if kind == KIND_ARTBOOK:
+            return f"{name} 画集"
+        if kind == KIND_NOVEL:
+            return f"小説 {name} {vol % 3 + 1}"
+        return f"{name} {2024 - vol // 53}年 {vol % 52 + 1}号"
+
+    def item(self, i):
+        c = self.cols
+        name, author, genre, publisher = self.series[c["series"][i]]
+        vol, flags = c["vol"][i], c["flags"][i]
+        sales_date = EPOCH + timedelta(days=c["day"][i])
+        isbn = f"978{(i * 7919 + self.seed) % 10 ** 10:010d}"
+        caption = "" if flags & 2 else CAPTIONS[i % len(CAPTIONS)].format(name=name, vol=vol)
+        image = NOIMAGE_URL if flags & 1 else f"https://thumbnail.image.rakuten.co.jp/@0_mall/book/cabinet/{isbn[-4:]}/{isbn}.jpg"
+        return {"Item": {
+            "title": self.title(i), "author": author, "publisherName": PUBLISHERS[publisher],
+            "seriesName": f"{name}（{LABELS[publisher % len(LABELS)]}）", "size": "コミック", "isbn": isbn,
+            "itemCaption": caption, "salesDate": f"{sales_date.year}年{sales_date.month:02d}月{sales_date.day:02d}日",
+            "itemPrice": 528 + vol % 3 * 66, "itemUrl": f"https://books.rakuten.co.jp/rb/{17000000 + i}/",
+            "smallImageUrl": image + "?_ex=64x64", "mediumImageUrl": image + "?_ex=120x120", "largeImageUrl": image + "?_ex=200x200",
+            "availability": "1", "reviewCount": c["reviews"][i], "reviewAverage": f"{3.5 + (i % 15) / 10:.2f}",
+            "booksGenreId": GENRES[genre],
+        }}
+
+    def has_ebook(self, i):
+        return (i * 2654435761 >> 8) % 10 < 7
+
+    def ebook_item(self, i):
+        # BooksEbook: 紙と同じ ISBN で、著者名は姓と名の間に空白が入る（id は紙と別になる）
+        item = self.item(i)["Item"]
+        author = item["author"]
+        last = next((n for n in LAST_NAMES if author.startswith(n)), "")
+        return {"Item": dict(item, author=f"{last} {author[len(last):]}" if last else author, size="電子書籍")}
+
+    def kobo_item(self, i):
+        # Kobo: ジャンルは koboGenreId、タイトルに電子版のレーベル表記、ISBN なし。一部は大サイズの表紙が無い
+        item = self.item(i)["Item"]
+        out = {"title": f"{item['title']}（{LABELS[i % len(LABELS)]}DIGITAL）", "author": item["author"],
+               "publisherName": item["publisherName"], "itemCaption": item["itemCaption"], "salesDate": item["salesDate"],
+               "itemPrice": item["itemPrice"] - 50, "itemNumber": str(9000000 + i), "reviewCount": item["reviewCount"],
+               "koboGenreId": KOBO_COMIC_GENRE + item["booksGenreId"][-3:],
+               "mediumImageUrl": item["mediumImageUrl"].replace("_ex=120x120", "_ex=150x150")}
+        if i % 10:
+            out["largeImageUrl"] = item["largeImageUrl"]
+        return {"Item": out}
+
+    def sorted_ids(self, genre_id, sort):
+        # ジャンル（前方一致）× ソート順のアイテム番号列
+        key = (genre_id, sort)
+        if key not in self._sorted:
+            c = self.cols
+            ids = [i for i in range(self.n) if GENRES[c["genre"][i]].startswith(genre_id)]
+            if sort == "reviewCount":
+                ids.sort(key=lambda i: -c["reviews"][i])
+            elif sort == "sales":
+                ids.sort(key=lambda i: -c["sales"][i])
+            elif sort == "-releaseDate":
+                ids.sort(key=lambda i: -c["day"][i])
+            else:
+                ids.sort(key=lambda i: (i * 2654435761) % 4294967296)
+            self._sorted[key] = array("i", ids)
+        return self._sorted[key]
+
+    def keyword_ids(self, keyword, genre_id="001001"):
+        # タイトル検索。シリーズ名に含まれるかで判定する（アイテムごとにタイトルを組み立てない）
+        key = (keyword.lower(), genre_id)
+        if key not in self._keyword:
+            kw = keyword.lower()
+            series = {s for s, (name, _, _, _) in enumerate(self.series) if kw in name.lower()}
+            c = self.cols
+            self._keyword[key] = array("i", [i for i in range(self.n)
+                                             if c["series"][i] in series and GENRES[c["genre"][i]].startswith(genre_id)])
+        return self._keyword[key]
+
+    def items(self):
+        # 全件（API の Items と同じ形のリスト）。title_corpus 等と同じ用途のベンチマーク向け
+        return [self.item(i) for i in range(self.n)]
+
+    def items_for(self, params):
+        # RakutenStub に渡す関数。ページ単位で必要な分だけ dict を組み立てる
+        genre_id = params.get("booksGenreId", "001001")
+        if params.get("title"):
+            ids = self.keyword_ids(params["title"], genre_id)
+        else:
+            ids = self.sorted_ids(genre_id, params.get("sort", "standard"))
+        return _ItemView(self, ids)
+
+    def ebook_ids(self, genre_id, sort=None, keyword=None):
+        # 電子版のある巻だけに絞った sorted_ids / keyword_ids
+        key = (genre_id, sort, keyword)
+        if key not in self._ebook:
+            ids = self.keyword_ids(keyword, genre_id) if keyword else self.sorted_ids(genre_id, sort)
+            self._ebook[key] = array("i", [i for i in ids if self.has_ebook(i)])
+        return self._ebook[key]
+
+    def ebook_items_for(self, params):
+        # RakutenStub の routes["BooksEbook/Search"] 用
+        ids = self.ebook_ids(params.get("booksGenreId", "001001"), params.get("sort", "standard"), params.get("title"))
+        return _ItemView(self, ids, self.ebook_item)
+
+    def kobo_items_for(self, params):
+        # RakutenStub の routes["Kobo/EbookSearch"] 用。Kobo の漫画ジャンルは楽天ブックスの 001001 に対応させる
+        genre_id = "001001" + params.get("koboGenreId", KOBO_COMIC_GENRE)[len(KOBO_COMIC_GENRE):]
+        ids = self.ebook_ids(genre_id, params.get("sort", "standard"), params.get("title"))
+        return _ItemView(self, ids, self.kobo_item)
+
+
+class _ItemView:
+    def __init__(self, corpus, ids, make=None):
+        self.corpus = corpus
+        self.ids = ids
+        self.make = make or corpus.item
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return [self.make(i) for i in self.ids[key]]
+        return self.make(self.ids[key])
+
+
+def parse_scale(value):
+    # "5k" / "50k" / "500k" または件数
+    return SCALES.get(value) or int(value)
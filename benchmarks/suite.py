@@ -0,0 +1,371 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.parse
+from datetime import datetime, timezone
+
+import generate_data
+from benchmarks.rakuten_corpus import RakutenCorpus, parse_scale
+from commentary_engine import CommentaryCache, CommentaryEngine
+from crawl_journal import CrawlJournal
+from crawler import TokenBucket
+from http_client import HTTPClient
+from item_record import ItemRecord
+from precompress import brotli, precompress
+from rakuten_stub import RakutenStub
+from series_resolver import merge_series
+from response_cache import ResponseCache
+from sitemap_engine import write_sitemaps
+
+# 使い方: python -m benchmarks.suite [--scale 5k|50k|500k|件数] [--only crawl,titles,...] [--latency 秒] [--rps 毎秒]
+# 合成カタログ（benchmarks.rakuten_corpus）でパイプラインの各段を計測し、結果を RESULTS_DIR に
+# コミット・環境情報つきの JSON で保存する。比較は python -m benchmarks.compare
+#   crawl       ローカルスタブ（遅延・レート制限つき）に対する crawl_catalog
+#   titles      clean_title / is_manga / get_series_info とページ単位の classify_page
+#   grouping    シリーズへのまとめ（解説文生成を含む）と並べ替え
+#   series      表記ゆれの巻（新装版・副題つき・著者名の空白・中黒）を足したシリーズ一覧での merge_series（統合数・適合率・再現率）
+#   commentary  解説文の生成（キャッシュなし）とキャッシュ命中時
+#   ssg         SSG ページの書き出し（初回と、変更なしの再実行）
+#   sitemap     サイトマップの書き出し（初回と、変更なしの再実行）
+#   compress    SSG ページの事前圧縮（初回と、変更なしの再実行）
+#   pipeline    スタブに対する generate_manga_data 全体（巻ページをクロールと並行して作る場合と、クロール後にまとめて作る場合）
+#   sources     BooksBook のみと、BooksEbook・Kobo を加えた3取得元でのクロール（レート上限はエンドポイントごと）
+# 500k は grouping 以降で数GBのメモリと、ssg で約100万ファイル分のディスクを使う
+
+RESULTS_DIR = os.path.join(".cache", "benchmarks")
+BENCHMARKS = ["crawl", "titles", "grouping", "series", "commentary", "ssg", "sitemap", "compress", "pipeline", "sources"]
+
+
+@contextlib.contextmanager
+def patched(obj, **values):
+    saved = {k: getattr(obj, k) for k in values}
+    for k, v in values.items():
+        setattr(obj, k, v)
+    try:
+        yield
+    finally:
+        for k, v in saved.items():
+            setattr(obj, k, v)
+
+
+@contextlib.contextmanager
+def workdir():
+    # 生成物は一時ディレクトリに書く（リポジトリの public/ や .cache/ を汚さない）
+    cwd = os.getcwd()
+    tmp = tempfile.mkdtemp(prefix="manga_reach_bench_")
+    shutil.copy(os.path.join(cwd, "index.html"), tmp)
+    os.chdir(tmp)
+    try:
+        yield tmp
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def best_of(repeat, fn):
+    # 副作用のない処理は repeat 回のうち最短の時間を採る（1回ごとの揺れを抑える）
+    runs = [timed(fn) for _ in range(repeat)]
+    return min(seconds for seconds, _ in runs), runs[-1][1]
+
+
+def crawl_output(corpus):
+    # クロール結果と同じ形の {id: ItemRecord}（漫画と判定されたもの）
+    series_map = {}
+    items = corpus.items()
+    for i in range(0, len(items), 30):
+        for r in generate_data.NORMALIZER.classify_page(items[i:i + 30], series=False):
+            if r["is_manga"] and r["id"] not in series_map:
+                series_map[r["id"]] = ItemRecord.from_api(r["item"])
+    return series_map
+
+
+SOURCE_ROUTES = {"ebook": ("BooksEbook/Search", "20170404"), "kobo": ("Kobo/EbookSearch", "20170412")}
+
+
+def run_crawl(corpus, args, sources=("books",)):
+    # スタブに対する crawl_catalog。スタブのレート制限とクライアントのリミッタはどちらもエンドポイントごと
+    routes = {"BooksEbook/Search": corpus.ebook_items_for, "Kobo/EbookSearch": corpus.kobo_items_for}
+    with RakutenStub(corpus.items_for, latency=args.latency, rate_limit=args.rps, burst=2, routes=routes) as stub, \
+            workdir() as tmp:
+        urls = {name: stub.url_for(*SOURCE_ROUTES[name]) for name in SOURCE_ROUTES}
+        client = HTTPClient(limiter=TokenBucket(args.rps), metrics=generate_data.METRICS, limiters={
+            urllib.parse.urlsplit(url).path: TokenBucket(args.rps) for url in urls.values()})
+        with patched(generate_data, BOOKS_BASE_URL=stub.url, BOOKS_EBOOK_URL=urls["ebook"], KOBO_BASE_URL=urls["kobo"],
+                     HTTP_CLIENT=client, TARGET_COUNT=len(corpus), CRAWL_SOURCES=list(sources),
+                     RESPONSE_CACHE=ResponseCache(":memory:", mode="off")):
+            generate_data.METRICS.reset()
+            journal = CrawlJournal(os.path.join(tmp, "journal.jsonl"))
+            seconds, series_map = timed(generate_data.crawl_catalog, journal=journal)
+            counters = generate_data.METRICS.report()["counters"]
+        client.close()
+    return seconds, series_map, len(stub.requests), stub.throttled, counters
+
+
+def bench_crawl(ctx):
+    seconds, series_map, requests, throttled, _ = run_crawl(ctx["corpus"], ctx["args"])
+    return {"seconds": seconds, "requests": requests, "throttled": throttled, "items": len(series_map),
+            "requests_per_sec": requests / seconds, "items_per_sec": len(series_map) / seconds,
+            "items_per_request": len(series_map) / requests}
+
+
+def bench_sources(ctx):
+    corpus, args = ctx["corpus"], ctx["args"]
+    books_s, books_map, books_requests, _, _ = run_crawl(corpus, args)
+    all_s, all_map, all_requests, throttled, counters = run_crawl(corpus, args, ("books", "ebook", "kobo"))
+    out = {"books_seconds": books_s, "books_requests": books_requests, "books_items": len(books_map),
+           "all_seconds": all_s, "all_requests": all_requests, "all_items": len(all_map), "all_throttled": throttled,
+           "dedup_isbn": counters.get("dedup.isbn", 0), "dedup_id": counters.get("dedup.id", 0)}
+    for name in ("books", "ebook", "kobo"):
+        out[f"{name}_new_items"] = counters.get(f"sources.{name}.new", 0)
+    return out
+
+
+def bench_titles(ctx):
+    items, repeat = ctx["corpus"].items(), ctx["args"].repeat
+    normalizer = generate_data.NORMALIZER
+    out = {"items": len(items)}
+    values = [(it["Item"]["title"], it["Item"]["author"], it["Item"]["itemCaption"], it["Item"]["booksGenreId"]) for it in items]
+    seconds, titles = best_of(repeat, lambda: [generate_data.clean_title(t) for t, _, _, _ in values])
+    out["clean_title_per_sec"] = len(values) / seconds
+    seconds, _ = best_of(repeat, lambda: [generate_data.is_manga(t, c, g) for t, (_, _, c, g) in zip(titles, values)])
+    out["is_manga_per_sec"] = len(values) / seconds
+    seconds, _ = best_of(repeat, lambda: [generate_data.get_series_info(t, a) for t, a, _, _ in values])
+    out["get_series_info_per_sec"] = len(values) / seconds
+    seconds, _ = best_of(repeat, lambda: [normalizer.classify_page(items[i:i + 30]) for i in range(0, len(items), 30)])
+    out["classify_page_per_sec"] = len(items) / seconds
+    return out
+
+
+def memory_commentary():
+    return CommentaryEngine(generate_data.VOLUME_HIGHLIGHTS, CommentaryCache(":memory:"))
+
+
+def bench_grouping(ctx):
+    series_map = ctx["series_map"]
+    with patched(generate_data, COMMENTARY=memory_commentary()):
+        group_s, groups = timed(generate_data.group_series, series_map)
+        sort_s, final_list = timed(generate_data.order_series, groups)
+    ctx["manga_list"] = final_list
+    return {"items": len(series_map), "series": len(groups), "group_seconds": group_s, "sort_seconds": sort_s,
+            "group_items_per_sec": len(series_map) / group_s, "sort_items_per_sec": len(final_list) / sort_s}
+
+
+def volume_stub(m_id, title, author):
+    # merge_series が使う項目だけの巻レコード（解説文は作らない）
+    series_id, core_title, vol_num, _ = generate_data.get_series_info(title, author)
+    return {"id": m_id, "seriesId": series_id, "seriesTitle": core_title, "author": author,
+            "isLegendary": generate_data.NORMALIZER.is_legendary(core_title), "tags": [author, "漫画", core_title]}
+
+
+def series_variants(series_map, every=10):
+    # シリーズ単位のまとまりと、every シリーズに1つ表記ゆれの巻を足したもの
+    # 戻り値: (series_groups, {足した巻の seriesId: 元の seriesId}, {足した巻の id: 元のシリーズの巻の id})
+    groups = {}
+    for m_id, v in series_map.items():
+        m = volume_stub(m_id, v.title, v.author)
+        groups.setdefault(m["seriesId"], []).append(m)
+    origin, pairs = {}, {}
+    for n, sid in enumerate(sorted(groups)[::every]):
+        m = groups[sid][0]
+        title, author, kind = m["seriesTitle"], m["author"], n % 4
+        if kind == 0:
+            title = f"{title} 新装版 1"
+        elif kind == 1:
+            title = f"{title} ～特別編～ 1"
+        elif kind == 2:
+            title, author = f"{title} 1", author[:2] + " " + author[2:]
+        else:
+            title = title[:len(title) // 2] + "・" + title[len(title) // 2:] + " 1"
+        variant = volume_stub(f"variant-{n}", title, author)
+        if variant["seriesId"] not in groups:
+            groups[variant["seriesId"]] = [variant]
+            origin[variant["seriesId"]] = sid
+            pairs[variant["id"]] = m["id"]
+    return groups, origin, pairs
+
+
+def bench_series(ctx):
+    groups, origin, pairs = series_variants(ctx["series_map"])
+    series = len(groups)
+    seconds, merges = timed(merge_series, groups)
+    # 正しい統合は足した巻のシリーズと元のシリーズの組だけ（合成カタログの元のシリーズどうしはすべて別作品）
+    merged = [(s["seriesId"], merge["into"]) for merge in merges for s in merge["merged"]]
+    correct = sum(1 for sid, into in merged if origin.get(sid, sid) == origin.get(into, into))
+    owner = {m["id"]: sid for sid, vols in groups.items() for m in vols}
+    recalled = sum(1 for m_id, base_id in pairs.items() if owner[m_id] == owner[base_id])
+    return {"series": series, "variants": len(pairs), "seconds": seconds, "series_per_sec": series / seconds,
+            "merged_series": len(merged), "precision": correct / len(merged) if merged else 1.0,
+            "recall": recalled / len(pairs) if pairs else 1.0}
+
+
+def bench_commentary(ctx):
+    manga_list = ctx["manga_list"]
+    engine = memory_commentary()
+    inputs = [(m["id"], m["title"], m["author"], m["isLegendary"], m["description"]) for m in manga_list]
+    repeat = ctx["args"].repeat
+    build_s, _ = best_of(repeat, lambda: [engine.build(*args) for args in inputs])
+    # 1回目は全件が生成＋保存、2回目以降はキャッシュ命中
+    cold_s, _ = timed(lambda: [engine.generate(*args) for args in inputs])
+    warm_s, _ = best_of(repeat, lambda: [engine.generate(*args) for args in inputs])
+    return {"items": len(inputs), "build_per_sec": len(inputs) / build_s, "generated_per_sec": len(inputs) / cold_s,
+            "cached_per_sec": len(inputs) / warm_s}
+
+
+def bench_ssg(ctx):
+    manga_list = ctx["manga_list"]
+    workers = ctx["args"].ssg_workers
+    with workdir():
+        cold_s, writer = timed(generate_data.generate_ssg, manga_list, workers=workers)
+        pages = writer.written + writer.unchanged
+        warm_s, warm = timed(generate_data.generate_ssg, manga_list, workers=workers)
+    return {"pages": pages, "workers": workers, "cold_seconds": cold_s, "warm_seconds": warm_s,
+            "cold_pages_per_sec": pages / cold_s, "warm_pages_per_sec": pages / warm_s, "warm_written": warm.written}
+
+
+def bench_sitemap(ctx):
+    manga_list = ctx["manga_list"]
+    with workdir():
+        paths = ("sitemap.xml", "sitemaps", "lastmod.db")
+        cold_s, stats = timed(write_sitemaps, manga_list, *paths)
+        warm_s, warm = timed(write_sitemaps, manga_list, *paths)
+    return {"urls": stats["urls"], "shards": stats["shards"], "cold_seconds": cold_s, "warm_seconds": warm_s,
+            "cold_urls_per_sec": stats["urls"] / cold_s, "warm_urls_per_sec": stats["urls"] / warm_s,
+            "warm_shards_written": warm["shards_written"]}
+
+
+def bench_compress(ctx):
+    manga_list = ctx["manga_list"]
+    workers = ctx["args"].ssg_workers
+    with workdir():
+        generate_data.generate_ssg(manga_list, workers=workers)
+        targets, manifest = ["public/manga", "public/series"], "compress.json"
+        cold_s, stats = timed(precompress, targets, manifest, workers)
+        warm_s, warm = timed(precompress, targets, manifest, workers)
+    return {"files": stats["files"], "workers": workers, "brotli": bool(brotli), "cold_seconds": cold_s,
+            "warm_seconds": warm_s, "cold_files_per_sec": stats["files"] / cold_s, "warm_files_per_sec": stats["files"] / warm_s,
+            "gzip_ratio": stats["gz_bytes"] / stats["bytes"], "warm_compressed": warm["compressed"]}
+
+
+def run_pipeline(corpus, args, streaming):
+    root = os.getcwd()
+    with RakutenStub(corpus.items_for, latency=args.latency, rate_limit=args.rps, burst=2) as stub, workdir() as tmp:
+        os.makedirs("public")
+        shutil.copy(os.path.join(root, "public", "sw.js"), "public/sw.js")
+        client = HTTPClient(limiter=TokenBucket(args.rps), metrics=generate_data.METRICS)
+        with patched(generate_data, BOOKS_BASE_URL=stub.url, HTTP_CLIENT=client, COMMENTARY=memory_commentary(), CRAWL_SOURCES=["books"],
+                     RESPONSE_CACHE=ResponseCache(":memory:", mode="off"), STREAM_VOLUME_PAGES=streaming,
+                     JOURNAL_PATH=os.path.join(tmp, "journal.jsonl"), SSG_MANIFEST_PATH=os.path.join(tmp, "ssg.json"),
+                     COMPRESS_MANIFEST_PATH=os.path.join(tmp, "compress.json"), SSG_WORKERS=args.ssg_workers):
+            generate_data.METRICS.reset()
+            seconds, _ = timed(generate_data.generate_manga_data)
+            phases = generate_data.METRICS.report()["phases"]
+        client.close()
+    crawl = phases["generate_manga_data/crawl_catalog"]["wall_seconds"]
+    return seconds, crawl
+
+
+def bench_pipeline(ctx):
+    corpus, args = ctx["corpus"], ctx["args"]
+    staged_s, staged_crawl = run_pipeline(corpus, args, False)
+    streamed_s, streamed_crawl = run_pipeline(corpus, args, True)
+    # クロール以外にかかった時間（クロール後の待ち）がどれだけ減ったか
+    return {"staged_seconds": staged_s, "staged_crawl_seconds": staged_crawl, "staged_after_crawl_seconds": staged_s - staged_crawl,
+            "streamed_seconds": streamed_s, "streamed_crawl_seconds": streamed_crawl,
+            "streamed_after_crawl_seconds": streamed_s - streamed_crawl}
+
+
+def git_revision():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"],
+                                    capture_output=True, text=True, check=True).stdout.strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return None, False
+
+
+def run(args):
+    only = args.only.split(",") if args.only else BENCHMARKS
+    unknown = set(only) - set(BENCHMARKS)
+    if unknown:
+        raise SystemExit(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+    n = parse_scale(args.scale)
+    print(f"Building synthetic catalog ({n} items, seed {args.seed})...", flush=True)
+    ctx = {"args": args, "corpus": RakutenCorpus(n, args.seed)}
+    results = {}
+    for name in BENCHMARKS:
+        if name not in only:
+            continue
+        # grouping 以降は前段（合成カタログ → クロール結果 → 掲載リスト）の出力を使う
+        if name not in ("crawl", "titles") and "series_map" not in ctx:
+            ctx["series_map"] = crawl_output(ctx["corpus"])
+        if name in ("commentary", "ssg", "sitemap", "compress") and "manga_list" not in ctx:
+            with contextlib.redirect_stdout(io.StringIO()):
+                bench_grouping(ctx)
+        print(f"  {name}...", flush=True)
+        with contextlib.redirect_stdout(sys.stdout if args.verbose else io.StringIO()):
+            results[name] = globals()[f"bench_{name}"](ctx)
+    commit, dirty = git_revision()
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit, "dirty": dirty, "scale": n, "seed": args.seed,
+        "options": {"latency": args.latency, "rps": args.rps, "ssg_workers": args.ssg_workers, "repeat": args.repeat},
+        "environment": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "results": results,
+    }
+
+
+def save(report, results_dir=RESULTS_DIR):
+    os.makedirs(results_dir, exist_ok=True)
+    stamp = report["created_at"].replace(":", "").replace("-", "").replace("+0000", "")
+    name = f"{stamp}-{report['commit'] or 'nogit'}{'-dirty' if report['dirty'] else ''}-{report['scale']}.json"
+    path = os.path.join(results_dir, name)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    return path
+
+
+def print_report(report):
+    print(f"commit {report['commit']}{' (dirty)' if report['dirty'] else ''}, scale {report['scale']}")
+    for name, values in report["results"].items():
+        print(f"[{name}]")
+        for k, v in values.items():
+            print(f"  {k:<26} {v:>14,.3f}" if isinstance(v, float) else f"  {k:<26} {v:>14,}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="合成カタログでパイプラインの各段を計測し、結果を保存する")
+    parser.add_argument("--scale", default="5k", help="5k / 50k / 500k または件数（既定 5k）")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5, help="副作用のない計測の繰り返し回数（最短を採る、既定 5）")
+    parser.add_argument("--only", default="", help=f"実行するベンチマーク（カンマ区切り: {','.join(BENCHMARKS)}）")
+    parser.add_argument("--latency", type=float, default=0.02, help="スタブの応答遅延（秒、既定 0.02）")
+    parser.add_argument("--rps", type=float, default=100, help="スタブのレート制限とクライアントのリミッタ（毎秒、既定 100）")
+    parser.add_argument("--ssg-workers", type=int, default=generate_data.SSG_WORKERS)
+    parser.add_argument("--results-dir", default=RESULTS_DIR)
+    parser.add_argument("--no-save", action="store_true", help="結果を保存しない")
+    parser.add_argument("--verbose", action="store_true", help="パイプラインの進捗出力を表示する")
+    args = parser.parse_args(argv)
+    report = run(args)
+    print_report(report)
+    if not args.no_save:
+        print(f"Saved to {save(report, args.results_dir)}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
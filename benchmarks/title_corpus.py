@@ -0,0 +1,48 @@
+import glob
+import html
+import os
+import random
+import re
+
+# タイトル判定ベンチマーク用のコーパス
+# 実際に取得・公開済みのページ (public/manga, public/series) の <title> からタイトルを集め、
+# APIで見かける表記揺れ（全角数字・括弧書き・特装版・雑誌号数など）を加えて件数を増やす
+
+TITLE_RE = re.compile(r'<title>(.*?)(?: シリーズ一覧)? - Manga Reach</title>')
+VARIANTS = [
+    lambda t, r: t,
+    lambda t, r: f"{t} {r.randint(1, 120)}",
+    lambda t, r: f"{t} {str(r.randint(1, 120)).translate(str.maketrans('0123456789', '０１２３４５６７８９'))}",
+    lambda t, r: f"{t} {r.randint(1, 40)}（ジャンプコミックス）",
+    lambda t, r: f"【期間限定】{t} {r.randint(1, 40)}",
+    lambda t, r: f"{t} 公式ファンブック",
+    lambda t, r: f"{t} 外伝 {r.randint(1, 5)}",
+    lambda t, r: f"{t} 特装版 {r.randint(1, 30)}",
+    lambda t, r: f"週刊{t} 2024年 {r.randint(1, 52)}号",
+]
+CAPTIONS = ["", "大人気シリーズ最新刊！", "待望のアニメ化作品。", "公式ガイドブック付き", "描き下ろしイラスト集を収録"]
+
+
+def recorded_titles(root="."):
+    titles = []
+    for path in sorted(glob.glob(os.path.join(root, "public", "manga", "*", "index.html")) +
+                       glob.glob(os.path.join(root, "public", "series", "*", "index.html"))):
+        with open(path, "r", encoding="utf-8") as f:
+            m = TITLE_RE.search(f.read(4096))
+        if m:
+            titles.append(html.unescape(m.group(1)))
+    return titles
+
+
+def title_corpus(n=50000, seed=0, root="."):
+    # [{"Item": {...}}] 形式（APIレスポンスの Items と同じ形）で返す
+    rng = random.Random(seed)
+    base = recorded_titles(root) or ["ONE PIECE", "キングダム", "呪術廻戦"]
+    items = []
+    for i in range(n):
+        title = rng.choice(VARIANTS)(base[i % len(base)], rng)
+        items.append({"Item": {
+            "title": title, "author": f"作者{rng.randrange(2000)}",
+            "itemCaption": rng.choice(CAPTIONS), "booksGenreId": rng.choice(["001001001", "001001003", "001004008"])
+        }})
+    return items
@@ -0,0 +1,154 @@
+import hashlib
+import json
+import os
+import sqlite3
+
+from catalog_index import parse_int
+from manga_store import write_json_array
+
+# 漫画カタログの SQLite ストア（パイプラインの正本）
+#   items      1行1アイテム。seq は全体の並び順（フロント用JSONの順序）、data はアイテムのJSON
+#   item_tags  タグの転置（小文字化したタグで引く）
+# 追加・更新はトランザクション単位で行い、内容が変わらないアイテムは書き換えない。
+# mangaData.json やシャードはここからの書き出し（エクスポート）として扱う
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    id TEXT PRIMARY KEY,
+    seq INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    series_id TEXT NOT NULL,
+    author TEXT,
+    genre_id TEXT,
+    hash TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS items_seq ON items (seq);
+CREATE INDEX IF NOT EXISTS items_title ON items (title);
+CREATE INDEX IF NOT EXISTS items_series ON items (series_id);
+CREATE INDEX IF NOT EXISTS items_author ON items (author);
+CREATE INDEX IF NOT EXISTS items_genre ON items (genre_id);
+CREATE TABLE IF NOT EXISTS item_tags (
+    id TEXT NOT NULL,
+    tag TEXT NOT NULL,
+    tag_lower TEXT NOT NULL,
+    PRIMARY KEY (id, tag)
+);
+CREATE INDEX IF NOT EXISTS item_tags_lower ON item_tags (tag_lower);
+"""
+
+
+def _dumps(item):
+    return json.dumps(item, ensure_ascii=False, separators=(",", ":"))
+
+
+class CatalogDB:
+    def __init__(self, path):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # --- 参照 ---
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+
+    def has_id(self, m_id):
+        return self.conn.execute("SELECT 1 FROM items WHERE id = ?", (m_id,)).fetchone() is not None
+
+    def has_title(self, title):
+        return self.conn.execute("SELECT 1 FROM items WHERE title = ? LIMIT 1", (title,)).fetchone() is not None
+
+    def _select(self, where="", params=()):
+        rows = self.conn.execute(f"SELECT data FROM items {where} ORDER BY seq", params)
+        return [json.loads(data) for data, in rows]
+
+    def get(self, m_id):
+        row = self.conn.execute("SELECT data FROM items WHERE id = ?", (m_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def series(self, series_id):
+        # SeriesDetail と同じ巻数順（parseInt || 0、同じ巻数は元の並び順）
+        return sorted(self._select("WHERE series_id = ?", (series_id,)), key=lambda m: parse_int(m.get("volumeNumber")))
+
+    def by_author(self, author):
+        return self._select("WHERE author = ?", (author,))
+
+    def by_genre(self, genre_id):
+        return self._select("WHERE genre_id = ?", (genre_id,))
+
+    def by_tag(self, tag):
+        return self._select("WHERE id IN (SELECT id FROM item_tags WHERE tag_lower = ?)", (tag.lower(),))
+
+    def iter_all(self):
+        # 全体の並び順で1件ずつ返す（全件をリストにしない）
+        for data, in self.conn.execute("SELECT data FROM items ORDER BY seq"):
+            yield json.loads(data)
+
+    def all(self):
+        return list(self.iter_all())
+
+    # --- 書き込み ---
+    def _put(self, m, seq, previous_hash):
+        data = _dumps(m)
+        digest = hashlib.sha256(data.encode("utf-8")).hexdigest()
+        if digest == previous_hash:
+            return False
+        self.conn.execute(
+            "INSERT OR REPLACE INTO items (id, seq, title, series_id, author, genre_id, hash, data) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (m["id"], seq, m["title"], m["seriesId"], m.get("author"), m.get("genreId"), digest, data))
+        self.conn.execute("DELETE FROM item_tags WHERE id = ?", (m["id"],))
+        self.conn.executemany("INSERT OR IGNORE INTO item_tags (id, tag, tag_lower) VALUES (?, ?, ?)",
+                              [(m["id"], t, t.lower()) for t in m.get("tags") or [] if isinstance(t, str) and t])
+        return True
+
+    def upsert(self, items):
+        # 既存 id は並び順を保ったまま内容だけ更新し、新規は末尾に追加する。戻り値: (追加数, 更新数)
+        added = updated = 0
+        with self.conn:
+            next_seq = (self.conn.execute("SELECT MAX(seq) FROM items").fetchone()[0] or 0) + 1
+            for m in items:
+                row = self.conn.execute("SELECT seq, hash FROM items WHERE id = ?", (m["id"],)).fetchone()
+                if row is None:
+                    self._put(m, next_seq, None)
+                    next_seq += 1
+                    added += 1
+                elif self._put(m, row[0], row[1]):
+                    updated += 1
+        return added, updated
+
+    def replace_all(self, items):
+        # 全件を items の並びで置き換える（無くなったアイテムは削除）。戻り値: (追加・更新数, 削除数)
+        changed = 0
+        with self.conn:
+            previous = {m_id: (seq, digest) for m_id, seq, digest in self.conn.execute("SELECT id, seq, hash FROM items")}
+            seen = set()
+            for seq, m in enumerate(items, 1):
+                if m["id"] in seen:
+                    continue
+                seen.add(m["id"])
+                prev_seq, prev_hash = previous.get(m["id"], (None, None))
+                if self._put(m, seq, prev_hash):
+                    changed += 1
+                elif prev_seq != seq:
+                    self.conn.execute("UPDATE items SET seq = ? WHERE id = ?", (seq, m["id"]))
+            removed = [(m_id,) for m_id in previous if m_id not in seen]
+            self.conn.executemany("DELETE FROM items WHERE id = ?", removed)
+            self.conn.executemany("DELETE FROM item_tags WHERE id = ?", removed)
+        return changed, len(removed)
+
+    # --- エクスポート ---
+    def export_json(self, path):
+        # フロント用の mangaData.json（1行1件）を並び順どおりにストリーミングで書き出す
+        return write_json_array(path, self.iter_all())
@@ -0,0 +1,145 @@
+import json
+import os
+import re
+
+from incremental_writer import atomic_write
+
+# フロント用の事前計算インデックス（ビルド時に一度だけ作り、画面遷移ごとの全件走査をなくす）
+#   tags.json      小文字化したタグ -> [[seriesId, [巻id...]], ...]（TagPage と同じ並び: 先頭巻の rating 降順）
+#   authors.json   著者 -> [id...]（データ順）
+#   related.json   id -> 関連作品 id 上位 RELATED_LIMIT 件（MangaDetail と同じスコア・同じ並び）
+#   series.json    seriesId -> [巻id...]（重複除去・巻数順、SeriesDetail と同じ並び）
+# seriesId は数字だけの場合があり、JS のオブジェクトでは整数キーが先頭に並び替わるため、順序が必要なものは配列で持つ
+
+RELATED_LIMIT = 6
+AUTHOR_SCORE = 10
+TAG_SCORE = 3
+RATING_WEIGHT = 0.5
+# この割合以上のアイテムが持つタグ（「漫画」など）は候補集合に使わず、シグネチャ単位でまとめて扱う
+DENSE_FRACTION = 0.1
+
+LEADING_INT_RE = re.compile(r'\s*([+-]?\d+)')
+
+
+def parse_int(value):
+    # JS の parseInt(value) || 0 相当
+    m = LEADING_INT_RE.match(str(value))
+    return int(m.group(1)) if m else 0
+
+
+def _tags(m):
+    return m.get("tags") or []
+
+
+def related_score(m, author, tag_set):
+    # App.jsx と同じ順序で加算する（浮動小数の丸めまで一致させるため）
+    score = 0
+    if m.get("author") == author: score += AUTHOR_SCORE
+    score += sum(1 for t in _tags(m) if t in tag_set) * TAG_SCORE
+    score += (m.get("rating") or 0) * RATING_WEIGHT
+    return score
+
+
+def related_ids(manga_list, limit=RELATED_LIMIT, dense_fraction=DENSE_FRACTION):
+    # 全アイテムの関連作品を求める。総当たり（O(n²)）と同じ結果を、
+    # 「著者・希少タグを共有する候補」は個別に採点し、それ以外は密なタグの組み合わせごとに rating 順の列から上位だけ拾って求める
+    n = len(manga_list)
+    postings = {}
+    by_author = {}
+    for i, m in enumerate(manga_list):
+        for t in set(_tags(m)):
+            postings.setdefault(t, []).append(i)
+        by_author.setdefault(m.get("author"), []).append(i)
+    dense = {t for t, idx in postings.items() if len(idx) >= max(1, n * dense_fraction)}
+
+    # 密なタグのシグネチャ（重複込み） -> rating 降順・データ順のインデックス列
+    groups = {}
+    for i, m in enumerate(manga_list):
+        sig = tuple(sorted(t for t in _tags(m) if t in dense))
+        groups.setdefault(sig, []).append(i)
+    for idx in groups.values():
+        idx.sort(key=lambda i: (-(manga_list[i].get("rating") or 0), i))
+
+    result = {}
+    for m in manga_list:
+        m_id = m["id"]
+        if m_id in result:
+            # 同じ id が複数あってもフロント（find）は先頭を使う
+            continue
+        author = m.get("author")
+        tag_set = set(_tags(m))
+        candidates = set(by_author.get(author, ()))
+        for t in tag_set:
+            if t not in dense:
+                candidates.update(postings.get(t, ()))
+        scored = [(related_score(manga_list[i], author, tag_set), i) for i in candidates if manga_list[i]["id"] != m_id]
+        for idx in groups.values():
+            # 同じグループ内ではスコアが rating に対して単調なので、先頭から limit 件で足りる
+            # （rating が違うのに丸めで同点になった分だけは、データ順で前に来うるので拾い続ける）
+            taken = []
+            last_rating = None
+            for i in idx:
+                if i in candidates or manga_list[i]["id"] == m_id:
+                    continue
+                score = related_score(manga_list[i], author, tag_set)
+                rating = manga_list[i].get("rating") or 0
+                if len(taken) >= limit and (score != taken[-1][0] or rating == last_rating):
+                    break
+                taken.append((score, i))
+                last_rating = rating
+            scored.extend(taken)
+        scored.sort(key=lambda x: (-x[0], x[1]))
+        result[m_id] = [manga_list[i]["id"] for _, i in scored[:limit]]
+    return result
+
+
+def tag_index(manga_list):
+    groups = {}
+    for m in manga_list:
+        for key in dict.fromkeys(t.lower() for t in _tags(m) if isinstance(t, str)):
+            series = groups.setdefault(key, {})
+            if m["seriesId"] not in series:
+                series[m["seriesId"]] = (m.get("rating") or 0, [])
+            series[m["seriesId"]][1].append(m["id"])
+    return {key: [[sid, ids] for sid, (_, ids) in sorted(series.items(), key=lambda x: -x[1][0])]
+            for key, series in groups.items()}
+
+
+def author_index(manga_list):
+    authors = {}
+    for m in manga_list:
+        if m.get("author"):
+            authors.setdefault(m["author"], []).append(m["id"])
+    return authors
+
+
+def series_index(manga_list):
+    series = {}
+    for m in manga_list:
+        series.setdefault(m["seriesId"], {}).setdefault(m["id"], m)
+    return {sid: [v["id"] for v in sorted(vols.values(), key=lambda v: parse_int(v.get("volumeNumber")))]
+            for sid, vols in series.items()}
+
+
+def build_indexes(manga_list):
+    return {
+        "tags": tag_index(manga_list),
+        "authors": author_index(manga_list),
+        "related": related_ids(manga_list),
+        "series": series_index(manga_list),
+    }
+
+
+def _dumps_object(mapping):
+    # 1行1キーのコンパクトなJSON（差分が読みやすい）
+    lines = [json.dumps(k, ensure_ascii=False) + ":" + json.dumps(v, ensure_ascii=False, separators=(",", ":"))
+             for k, v in mapping.items()]
+    return "{\n" + ",\n".join(lines) + "\n}\n" if lines else "{}\n"
+
+
+def write_indexes(out_dir, manga_list):
+    # 戻り値: {名前: 件数}
+    indexes = build_indexes(manga_list)
+    for name, mapping in indexes.items():
+        atomic_write(os.path.join(out_dir, f"{name}.json"), _dumps_object(mapping).encode("utf-8"))
+    return {name: len(mapping) for name, mapping in indexes.items()}
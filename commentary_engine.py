@@ -0,0 +1,184 @@
+import hashlib
+import os
+import random
+import re
+import sqlite3
+
+# 作品解説文の生成エンジン
+# 乱数はアイテム id から決まる（同じ入力なら毎回同じ文章になり、再ビルドで全件が書き換わらない）。
+# 生成結果は (id, 入力ハッシュ, テンプレートの版) をキーに SQLite へ保存し、変わっていないアイテムは生成を省く。
+# 文面・パターンの並びを変えたら COMMENTARY_VERSION を上げること（キャッシュが無効になる）
+
+COMMENTARY_VERSION = 1
+
+KEYWORD_RE = re.compile(r'[\u4E00-\u9FFF]{2,}|[\u30A1-\u30F6]{2,}')
+KEYWORD_IGNORE = frozenset(["物語", "世界", "登場", "展開", "魅力", "作品", "連載", "発売", "本作", "収録", "真相", "事件"])
+VOL_RE = re.compile(r'(\d+)\s*(巻|vol)')
+VOL_TAIL_RE = re.compile(r'\s(\d+)$')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS commentary (
+    id TEXT PRIMARY KEY,
+    input_hash TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    text TEXT NOT NULL
+);
+"""
+
+
+def item_rng(item_id, stream="commentary"):
+    # 文字列シードは PYTHONHASHSEED に依存しない（実行ごと・マシンごとに同じ列になる）
+    return random.Random(f"{stream}:{item_id}")
+
+
+def stable_rating(item_id, low, high):
+    # アイテムごとに固定のレーティング（再ビルドで変わらない）
+    return round(item_rng(item_id, "rating").uniform(low, high), 1)
+
+
+class NaturalSentenceBuilder:
+    def __init__(self, title, author, description, vol_num, rng=None, highlight=""):
+        self.title = title
+        self.author = author
+        self.desc = description
+        self.vol_num = vol_num
+        self.rng = rng or random.Random()
+        self.highlight = highlight
+        self.keywords = self._extract_keywords()
+
+    def _extract_keywords(self):
+        # 意味のあるカタカナ語や漢字の固有名詞を抽出
+        if not self.desc: return []
+        k = [p for p in KEYWORD_RE.findall(self.desc) if p not in KEYWORD_IGNORE]
+        return list(dict.fromkeys(k))[:3]
+
+    def build(self, is_legend):
+        # 導入
+        intro_patterns = [
+            f"『{self.title}』は、{self.author}先生が放つ渾身のエンターテインメント作品です。",
+            f"今、マンガファンの間で絶大な支持を集めている『{self.title}』（{self.author}著）は、一読の価値がある傑作です。",
+            f"{self.author}先生の圧倒的な筆力で描かれる『{self.title}』。読者の心を一気に掴んで離さない魅力的な一冊です。"
+        ]
+
+        # 巻数・リサーチ情報
+        vol_info = ""
+        if self.highlight:
+            vol_info = f"特に第{self.vol_num}巻である本作では、{self.highlight} "
+        elif self.vol_num:
+            vol_info = f"物語が大きな転換点を迎える第{self.vol_num}巻。前巻からの伏線が回収され、次なる嵐を予感させる重要な局面が描かれています。"
+
+        # ストーリー・描写
+        kw_text = "や".join(self.keywords) if self.keywords else "独自の重厚な世界観"
+        story_patterns = [
+            f"本作の核となるのは、{kw_text}を中心とした緻密なストーリー構成です。予測不可能な展開に、ページをめくる手が止まりません。",
+            f"緻密な世界観設定が本作の魅力。物語が進むにつれて{kw_text}にまつわる謎が明かされていく様は圧巻です。",
+            f"テンポの良い掛け合いと思わず唸るような独創的なアイデアが満載。{kw_text}を主軸とした迫力ある描写から目が離せません。"
+        ]
+
+        # 作画・構成
+        art_patterns = [
+            "作画のクオリティも非常に高く、背景の細部まで徹底的に描き込まれています。キャラクターの表情一つひとつに宿る感情が、ドラマをより一層引き立てます。",
+            "独特で洗練された絵のタッチが、作品の世界を鮮やかに彩っています。特に勝負所での演出センスは抜群で、視覚的なインパクトが非常に強いのが特徴です。",
+            "キャラクターの躍動感が素晴らしく、紙面から飛び出してきそうな迫力があります。繊細さと鋭さを兼ね備えた描写力は、まさに芸術的です。"
+        ]
+
+        # 結び
+        conclusion = self.rng.choice([
+            "全マンガファンに自信を持っておすすめできる、最高峰のエンターテインメント体験をお楽しみください。",
+            "あなたのマンガライフをより彩り豊かにしてくれること間違いなしの、珠玉の一冊です。",
+            "ジャンルの枠を超えた普遍的な感動があり、何度でも読み返したくなる不思議な魔力に満ちています。"
+        ])
+
+        paragraphs = [
+            self.rng.choice(intro_patterns),
+            vol_info,
+            self.rng.choice(story_patterns),
+            self.rng.choice(art_patterns),
+            conclusion
+        ]
+        if is_legend:
+            paragraphs.insert(0, f"漫画史に名を刻むレジェンド作品『{self.title}』。{kw_text}という革新的なテーマを世に知らしめた、まさに「必読」の一冊です。")
+
+        return "\n\n".join([p for p in paragraphs if p])
+
+
+class CommentaryCache:
+    def __init__(self, path):
+        self.path = path
+        self._db = None
+        self.hits = 0
+        self.misses = 0
+
+    def _conn(self):
+        # 接続は初回利用時に開く
+        if self._db is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            # クロールと並行する処理段（別スレッド）から使い、終了後にメインスレッドで flush する（同時には使わない）
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.executescript(SCHEMA)
+        return self._db
+
+    def get(self, item_id, input_hash):
+        row = self._conn().execute("SELECT input_hash, version, text FROM commentary WHERE id = ?", (item_id,)).fetchone()
+        if row is not None and row[0] == input_hash and row[1] == COMMENTARY_VERSION:
+            self.hits += 1
+            return row[2]
+        self.misses += 1
+        return None
+
+    def put(self, item_id, input_hash, text):
+        self._conn().execute("INSERT OR REPLACE INTO commentary (id, input_hash, version, text) VALUES (?, ?, ?, ?)",
+                             (item_id, input_hash, COMMENTARY_VERSION, text))
+
+    def flush(self):
+        if self._db is not None:
+            self._db.commit()
+
+    def close(self):
+        if self._db is not None:
+            self._db.commit()
+            self._db.close()
+            self._db = None
+
+
+class CommentaryEngine:
+    def __init__(self, highlights, cache=None):
+        self.highlights = highlights
+        # どのシリーズ名も含まないタイトル（大半）は1回の検索で判定する
+        self.highlight_re = re.compile("|".join(re.escape(name) for name in highlights)) if highlights else None
+        self.cache = cache
+
+    @staticmethod
+    def volume_number(title):
+        vol_match = VOL_RE.search(title) or VOL_TAIL_RE.search(title)
+        return vol_match.group(1) if vol_match else ""
+
+    def highlight(self, title, vol_num):
+        if self.highlight_re is None or not self.highlight_re.search(title):
+            return ""
+        # 該当がある場合だけ、定義順で最初に含まれるシリーズを採用する（従来の判定順）
+        for series_name, volumes in self.highlights.items():
+            if series_name in title:
+                return volumes.get(vol_num, "")
+        return ""
+
+    def build(self, item_id, title, author, is_legendary, description="", highlight=None):
+        vol_num = self.volume_number(title)
+        if highlight is None:
+            highlight = self.highlight(title, vol_num)
+        builder = NaturalSentenceBuilder(title, author, description, vol_num, item_rng(item_id), highlight)
+        return builder.build(is_legendary)
+
+    def generate(self, item_id, title, author, is_legendary, description=""):
+        if self.cache is None:
+            return self.build(item_id, title, author, is_legendary, description)
+        # 該当する VOLUME_HIGHLIGHTS の文面も入力に含める（書き換えたらその巻だけ作り直す）
+        highlight = self.highlight(title, self.volume_number(title))
+        input_hash = hashlib.sha256("\0".join([title, author, "1" if is_legendary else "0", description or "", highlight])
+                                    .encode("utf-8")).hexdigest()
+        text = self.cache.get(item_id, input_hash)
+        if text is None:
+            text = self.build(item_id, title, author, is_legendary, description, highlight)
+            self.cache.put(item_id, input_hash, text)
+        return text
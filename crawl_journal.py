@@ -0,0 +1,154 @@
+import json
+import os
+import time
+
+# クロールのチェックポイント（追記専用のJSON Linesジャーナル）
+# 1行1レコード:
+#   {"type": "page", "phase": 1, "stream": [...], "page": 3, "items": [[m_id, item], ...]}
+#   {"type": "done", "phase": 1, "stream": [...]}        列を最後まで読み切った
+#   {"type": "phase_done", "phase": 1}
+#   {"type": "run_done"}                                 クロール全体が完了した
+# 途中で落ちた場合は次回起動時にジャーナルを読み直し、取得済みページを飛ばして続きから再開する
+
+
+def _key(stream_key):
+    # JSON ではタプルがリストになるため、比較用にタプルへ戻す
+    return tuple(stream_key) if isinstance(stream_key, (list, tuple)) else stream_key
+
+
+class CrawlJournal:
+    def __init__(self, path, flush_every=20, flush_interval=5.0):
+        self.path = path
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.pages = {}      # (phase, stream_key) -> {page: items}
+        self.done = set()    # (phase, stream_key)
+        self.phases_done = set()
+        self.completed = False
+        self._buffer = []
+        self._last_flush = time.monotonic()
+        self._file = None
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return self
+        # 書き込み途中で落ちた最終行（改行で終わっていない・JSON として読めない行）は捨て、
+        # ファイルもその手前で切り詰める（追記が壊れた行の後ろにつながらないように）
+        good = 0
+        with open(self.path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    rec = json.loads(line.decode("utf-8"))
+                except ValueError:
+                    break
+                self._apply(rec)
+                good += len(line)
+        if good < os.path.getsize(self.path):
+            with open(self.path, "r+b") as f:
+                f.truncate(good)
+        return self
+
+    def _apply(self, rec):
+        kind = rec["type"]
+        if kind == "page":
+            self.pages.setdefault((rec["phase"], _key(rec["stream"])), {})[rec["page"]] = [tuple(x) for x in rec["items"]]
+        elif kind == "done":
+            self.done.add((rec["phase"], _key(rec["stream"])))
+        elif kind == "phase_done":
+            self.phases_done.add(rec["phase"])
+        elif kind == "run_done":
+            self.completed = True
+
+    def reset(self):
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self.pages, self.done, self.phases_done, self.completed = {}, set(), set(), False
+
+    @property
+    def resumed(self):
+        return bool(self.pages or self.done)
+
+    # --- 参照 ---
+    def next_page(self, phase, stream_key):
+        fetched = self.pages.get((phase, _key(stream_key)), {})
+        return max(fetched) + 1 if fetched else 1
+
+    def is_done(self, phase, stream_key):
+        return (phase, _key(stream_key)) in self.done
+
+    def phase_pages(self, phase):
+        # {(stream_key, page): items}
+        return {(sk, page): items
+                for (p, sk), pages in self.pages.items() if p == phase
+                for page, items in pages.items()}
+
+    # --- 記録 ---
+    def _write(self, rec):
+        self._apply(rec)
+        self._buffer.append(json.dumps(rec, ensure_ascii=False, separators=(",", ":")))
+        if len(self._buffer) >= self.flush_every or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def record_page(self, phase, stream_key, page, items):
+        self._write({"type": "page", "phase": phase, "stream": stream_key, "page": page, "items": items})
+
+    def record_done(self, phase, stream_key):
+        self._write({"type": "done", "phase": phase, "stream": stream_key})
+
+    def record_phase_done(self, phase):
+        self._write({"type": "phase_done", "phase": phase})
+        self.flush()
+
+    def finish(self):
+        self._write({"type": "run_done"})
+        self.flush()
+        self.close()
+
+    def flush(self):
+        if self._buffer:
+            if self._file is None:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.write("\n".join(self._buffer) + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._buffer = []
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    # --- 進捗レポート ---
+    def status(self):
+        rows = []
+        for (phase, sk), pages in sorted(self.pages.items(), key=lambda x: (x[0][0], x[0][1])):
+            rows.append({
+                "phase": phase,
+                "stream": list(sk[1:]) if isinstance(sk, tuple) else sk,
+                "pages": len(pages),
+                "last_page": max(pages),
+                "items": sum(len(items) for items in pages.values()),
+                "done": (phase, sk) in self.done,
+            })
+        return rows
+
+    def print_status(self):
+        rows = self.status()
+        if not rows:
+            print(f"No crawl in progress ({self.path}).")
+            return
+        state = "completed" if self.completed else "in progress"
+        print(f"Crawl journal: {self.path} ({state})")
+        for phase in sorted({r["phase"] for r in rows}):
+            phase_rows = [r for r in rows if r["phase"] == phase]
+            label = "genre/sort" if phase == 1 else "keyword"
+            done = "done" if phase in self.phases_done else f"{sum(r['done'] for r in phase_rows)}/{len(phase_rows)} streams done"
+            print(f"Phase {phase} ({label}): {done}")
+            for r in phase_rows:
+                mark = "✓" if r["done"] else "…"
+                print(f"  {mark} {' / '.join(r['stream']):<28} pages {r['pages']:>3} (last {r['last_page']:>3})  items {r['items']:>5}")
@@ -0,0 +1,168 @@
+import math
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+# 取れ高に応じてリクエストを割り振るクロールプランナー
+# 各列（ジャンル×ソート、キーワード）の1ページ目を先に読み、API の pageCount で最終ページを決める。
+# 以降は「直近のページで新しく見つかった id 数」の指数移動平均が高い列から順にページを進め、
+# 新規が min_yield（ページ件数に対する割合）未満のページが patience 回続いた列は打ち切る（飽和）。
+# 取得はラウンド単位: 各ラウンドで優先度の高い列を batch 本選び（1列1ページ）、並行に取得したあと
+# 列の順に結果を処理する。処理順が取得の完了順に依存しないので、並行数を変えても同じ結果になる。
+# lane を渡すと、レート上限の単位（取得元のエンドポイント等）ごとに batch 本ずつ選ぶ（上位が1つの取得元に偏って他が遊ぶのを防ぐ）。
+# 経路ごとにリクエストの枠が別なので、取れ高もその経路で見つけた id（と開始時の seen）に対して測る
+# （他の経路が先に見つけた分で列を打ち切らない。目標件数の判定は全体の seen で行う）
+
+EWMA_ALPHA = 0.5
+
+
+class StreamState:
+    def __init__(self, index, stream):
+        self.index = index
+        self.stream = stream
+        self.next_page = stream.start_page
+        self.last_page = stream.max_pages
+        self.pages = 0
+        self.new_ids = 0
+        self.score = math.inf
+        self.low_streak = 0
+        self.active = True
+        self.reason = None
+
+    def record(self, new, received, min_yield):
+        self.pages += 1
+        self.new_ids += new
+        self.score = new if self.score == math.inf else EWMA_ALPHA * new + (1 - EWMA_ALPHA) * self.score
+        self.low_streak = self.low_streak + 1 if new < min_yield * max(received, 1) else 0
+
+
+class CrawlPlanner:
+    # fetch(page=..., **stream.params) -> API レスポンス（"Items" と "pageCount" を含む dict）
+    # seen: 既知の id（新規判定に使い、取得中に追加していく）
+    # target: 既知の id がこの数に達したら止める / budget: このフェーズで使うリクエスト数の上限
+    # grace: 飽和判定をしない先頭ページ数 / lane(stream): 列の属する経路（batch・workers は経路ごと）
+    def __init__(self, fetch, streams, seen=None, batch=8, workers=8, min_yield=0.1, patience=2, grace=1,
+                 target=None, budget=None, lane=None):
+        self.fetch = fetch
+        self.states = [StreamState(i, s) for i, s in enumerate(streams)]
+        self._by_key = {st.stream.key: st for st in self.states}
+        self.seen = seen if seen is not None else set()
+        self.batch = batch
+        self.workers = workers
+        self.min_yield = min_yield
+        self.patience = patience
+        self.grace = grace
+        self.target = target
+        self.budget = budget
+        self.lane = lane
+        self._initial = set(self.seen) if lane is not None else None
+        self.lane_seen = {}
+        self.requests = 0
+        self.stopped = False
+        self.cut = Counter()
+
+    def replay(self, stream_key, page, ids):
+        # ジャーナルから復元したページを取得済みとして反映する（ページ順・列順に呼ぶこと）
+        st = self._by_key.get(stream_key)
+        new = self._add(ids, st)
+        if st is not None:
+            # 再開位置（next_page）はジャーナル側で決まっているので、ここでは取れ高だけを反映する
+            # 復元時は受け入れた件数しか分からないので、それをページ件数とみなす
+            st.record(len(new), len(ids), self.min_yield)
+
+    def _add(self, ids, st=None):
+        # 戻り値: 取れ高として数える id（lane があればその経路にとっての新規）
+        ids = set(ids)
+        new = ids - self.seen
+        self.seen.update(new)
+        if self.lane is None or st is None:
+            return new
+        lane = self.lane(st.stream)
+        if lane not in self.lane_seen:
+            self.lane_seen[lane] = set(self._initial)
+        known = self.lane_seen[lane]
+        new = ids - known
+        known.update(new)
+        return new
+
+    def _finish(self, st, reason, on_done):
+        st.active = False
+        st.reason = reason
+        self.cut[reason] += 1
+        if on_done and reason != "failed":
+            on_done(st.stream)
+
+    def _next_batch(self):
+        active = [st for st in self.states if st.active]
+        active.sort(key=lambda st: (-st.score, st.index))
+        size = self.batch
+        if self.lane is not None:
+            taken = Counter()
+            picked = []
+            for st in active:
+                lane = self.lane(st.stream)
+                if taken[lane] < self.batch:
+                    taken[lane] += 1
+                    picked.append(st)
+            active, size = picked, len(picked)
+        if self.budget is not None:
+            size = min(size, self.budget - self.requests)
+        return active[:max(0, size)]
+
+    def _fetch(self, st):
+        try:
+            return self.fetch(page=st.next_page, **st.stream.params), None
+        except Exception as e:
+            return None, e
+
+    def run(self, on_page, on_done=None):
+        # on_page(stream, page, items) -> そのページで受け入れた id のリスト
+        # on_done(stream): 列を読み切った・飽和したとき（取得失敗・予算切れ・目標到達で止めた列では呼ばない）
+        # 戻り値: 実際に行ったリクエスト数
+        for st in self.states:
+            self._check(st, on_done)
+        lanes = len({self.lane(st.stream) for st in self.states}) if self.lane is not None else 1
+        with ThreadPoolExecutor(max_workers=self.workers * max(1, lanes)) as executor:
+            while True:
+                if self.target is not None and len(self.seen) >= self.target:
+                    self.stopped = True
+                    break
+                batch = self._next_batch()
+                if not batch:
+                    if self.budget is not None and self.requests >= self.budget and any(st.active for st in self.states):
+                        self.cut["budget"] += sum(st.active for st in self.states)
+                    break
+                results = list(executor.map(self._fetch, batch))
+                self.requests += len(batch)
+                for st, (data, error) in sorted(zip(batch, results), key=lambda x: x[0].index):
+                    self._process(st, data, error, on_page, on_done)
+        return self.requests
+
+    def _process(self, st, data, error, on_page, on_done):
+        page = st.next_page
+        if error is not None:
+            # 再試行しても取れなかった列は未完了のまま残す（次回の再開対象）
+            print(f"  Fetch failed: {st.stream.key} page {page}: {error}", flush=True)
+            self._finish(st, "failed", on_done)
+            return
+        items = data.get("Items", [])
+        if data.get("pageCount"):
+            st.last_page = min(st.stream.max_pages, data["pageCount"])
+        if not items:
+            self._finish(st, "exhausted", on_done)
+            return
+        ids = on_page(st.stream, page, items)
+        new = self._add(ids, st)
+        st.record(len(new), len(items), self.min_yield)
+        st.next_page += 1
+        self._check(st, on_done)
+
+    def _check(self, st, on_done):
+        if st.next_page > st.last_page:
+            self._finish(st, "exhausted", on_done)
+        elif st.pages > self.grace and st.low_streak >= self.patience:
+            self._finish(st, "saturated", on_done)
+
+    def summary(self):
+        return {"requests": self.requests, "unique": len(self.seen), "streams": len(self.states),
+                "exhausted": self.cut["exhausted"], "saturated": self.cut["saturated"], "failed": self.cut["failed"],
+                "budget": self.cut["budget"]}
@@ -0,0 +1,68 @@
+import json
+import os
+import re
+import time
+
+from incremental_writer import atomic_write
+
+# 日次の差分クロール用の高水位線（ジャンルごと）
+#   {"001001001": {"salesDate": "2024-05-10", "ids": [その日付で確認済みの id...]}, ...}
+# 発売日の新しい順（-releaseDate）に読み、高水位線より古いアイテムに達したらそのジャンルのページングをやめる。
+# 同じ発売日のアイテムは複数ページにまたがりうるので、日付だけでなく確認済み id も持つ。
+# 予約（発売日が今日より後）と発売日の読めないものは高水位線に使わない（先頭に並ぶ予約で線が未来へ進むと、
+# あとから登録された発売済みの巻を「古い」として読み飛ばしてしまう）。これらは毎回カタログ側で既知か判定する
+
+SALES_DATE_RE = re.compile(r'(\d{4})年\s*(\d{1,2})月(?:\s*(\d{1,2})日)?')
+
+
+def sales_date_key(text):
+    # "2024年05月10日" -> "2024-05-10"、日が無い（"2024年05月上旬" 等）は "2024-05-00"、読めなければ ""
+    m = SALES_DATE_RE.search(text or "")
+    if not m:
+        return ""
+    return f"{int(m.group(1)):04d}-{int(m.group(2)):02d}-{int(m.group(3) or 0):02d}"
+
+
+class Watermarks:
+    def __init__(self, path, today=None):
+        self.path = path
+        self.today = today or time.strftime("%Y-%m-%d")
+        self.marks = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.marks = json.load(f)
+
+    def get(self, genre_id):
+        mark = self.marks.get(genre_id)
+        if not mark:
+            return None, set()
+        return mark["salesDate"], set(mark["ids"])
+
+    def is_older(self, genre_id, date):
+        # 高水位線より前の発売日（=前回までに読み切っている範囲）か。発売日の読めないものはページングを止めない
+        mark_date, _ = self.get(genre_id)
+        return mark_date is not None and date != "" and date < mark_date
+
+    def is_known(self, genre_id, date, m_id):
+        mark_date, ids = self.get(genre_id)
+        if mark_date is None or date == "":
+            return False
+        return date < mark_date or (date == mark_date and m_id in ids)
+
+    def advance(self, genre_id, seen):
+        # seen: 今回読んだ [(発売日, id)]。今日までの最新の発売日とその日付の id で高水位線を進める
+        seen = [(date, m_id) for date, m_id in seen if date and date <= self.today]
+        if not seen:
+            return
+        mark_date, ids = self.get(genre_id)
+        top = max(date for date, _ in seen)
+        if mark_date is not None and top < mark_date:
+            return
+        top_ids = {m_id for date, m_id in seen if date == top}
+        if top == mark_date:
+            top_ids |= ids
+        self.marks[genre_id] = {"salesDate": top, "ids": sorted(top_ids)}
+
+    def save(self):
+        data = json.dumps(dict(sorted(self.marks.items())), ensure_ascii=False, indent=2) + "\n"
+        atomic_write(self.path, data.encode("utf-8"))
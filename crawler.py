@@ -0,0 +1,33 @@
+import threading
+import time
+from collections import namedtuple
+
+# 1本のページング列（ジャンル×ソート、またはキーワード）
+# key: 識別子, params: fetch関数へ渡す引数, max_pages: 最大ページ数, start_page: 再開時の開始ページ
+CrawlStream = namedtuple("CrawlStream", ["key", "params", "max_pages", "start_page"], defaults=(1,))
+
+
+class TokenBucket:
+    # 全ワーカーで共有するトークンバケット型レートリミッタ
+    def __init__(self, rate, capacity=1):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._tokens = float(capacity)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, stop_event=None):
+        # トークンが取れるまで待つ。stop_event がセットされたら False を返す
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if stop_event is None:
+                time.sleep(wait)
+            elif stop_event.wait(wait):
+                return False
@@ -1,98 +1,225 @@
-import json
+import os
 import random
 import time
-import os
 import hashlib
-from generate_data import fetch_rakuten_data, clean_title, is_manga, generate_commentary, generate_sitemap, generate_ssg, get_series_info
+from commentary_engine import stable_rating
+from crawl_watermark import Watermarks, sales_date_key
+from series_resolver import resolve_series
+from generate_data import compress_artifacts, generate_service_worker, fetch_rakuten_data, fetch_rakuten_page, clean_title, is_manga, generate_commentary, COMMENTARY, generate_sitemap, generate_ssg, get_series_info, load_manga_data, add_manga_data, open_catalog, save_catalog_index, run_with_report, CATALOG_DB, DATA_FILE, BOOK_GENRES, METRICS, NORMALIZER, REPORT_DIR
 
-DATA_FILE = 'src/data/mangaData.json'
+# 差分クロールの高水位線（CIでコミットして次回に引き継ぐ）
+WATERMARK_PATH = 'src/data/crawl_watermarks.json'
+# 1回の実行で追加する最大件数
+DAILY_NEW_ITEMS = int(os.environ.get("DAILY_NEW_ITEMS", "10"))
+# 差分モードで1ジャンルあたりに読む最大ページ数（高水位線に達すれば途中でやめる）
+DELTA_MAX_PAGES = int(os.environ.get("DELTA_MAX_PAGES", "5"))
 
-def daily_update():
-    print("Starting daily content update...")
-    
-    if not os.path.exists(DATA_FILE):
-        print(f"Error: {DATA_FILE} not found.")
-        return
-
-    # 1. 既存のデータを読み込む
-    with open(DATA_FILE, 'r', encoding='utf-8') as f:
-        manga_data = json.load(f)
-    
-    existing_ids = {m['id'] for m in manga_data}
-    existing_titles = {m['title'] for m in manga_data}
-
-    # 2. 楽天APIから「漫画」を検索（人気順）
-    # ランダムなジャンルから1ページ目を取得して新しいのを探す
-    BOOK_GENRES = ["001001001", "001001002", "001001003", "001001004", "001001006", "001001007", "001001008"]
-    random.shuffle(BOOK_GENRES)
-    
-    new_manga = None
-    
-    for gid in BOOK_GENRES:
+def item_key(m):
+    # (整形済みタイトル, id)。id は generate_data と同じく タイトル+著者 の MD5
+    title = clean_title(m.get("title", ""))
+    return title, hashlib.md5((title + m.get("author", "不明")).encode()).hexdigest()[:12]
+
+class KnownItems:
+    # 掲載済みかの判定。カタログDBの索引（id・タイトル）で引き、今回見つけた分はメモリで覚える
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self.ids = set()
+        self.titles = set()
+
+    def contains(self, m_id, title):
+        return (m_id in self.ids or title in self.titles or
+                self.catalog.has_id(m_id) or self.catalog.has_title(title))
+
+    def add(self, m_id, title):
+        self.ids.add(m_id)
+        self.titles.add(title)
+
+    def series_for(self, series_id, core_title, author):
+        # 新しい巻の (seriesId, シリーズ名)。同じ著者の掲載済みシリーズに表記ゆれ（新装版・副題つき等）で同じものがあればそちらにそろえる
+        series = {m["seriesId"]: (m["seriesTitle"], m["author"]) for m in self.catalog.by_author(author)}
+        if series_id in series:
+            return series_id, core_title
+        found = resolve_series(core_title, author, [(sid, t, a) for sid, (t, a) in sorted(series.items())])
+        if found is None:
+            return series_id, core_title
+        METRICS.incr("series.resolved")
+        return found, series[found][0]
+
+def build_new_manga(m, gid, known=None):
+    # API のアイテムが未掲載の漫画なら追加用のレコードを返す（漫画でなければ None）
+    # known（KnownItems）があれば、掲載済みのシリーズと表記ゆれで分かれないよう seriesId をそろえる
+    raw_title = m.get("title", "")
+    title = clean_title(raw_title)
+    if not is_manga(title, m.get("itemCaption", ""), m.get("booksGenreId", "")):
+        METRICS.incr(f"items.rejected.{NORMALIZER.rejection_reason(title, m.get('itemCaption', ''), m.get('booksGenreId', ''))}")
+        return None
+    author = m.get("author", "不明")
+
+    # 共通関数で情報を取得
+    series_id, core_title, vol_num, is_special = get_series_info(raw_title, author)
+    if known is not None:
+        series_id, core_title = known.series_for(series_id, core_title, author)
+    m_id = hashlib.md5((title + author).encode()).hexdigest()[:12]
+
+    desc = m.get("itemCaption", "")
+    if not desc:
+        desc = f"「{title}」の圧倒的な世界観。注目の最新作をチェックしましょう。"
+
+    image_url = m.get("largeImageUrl", "").split("?")[0] + "?_ex=300x420"
+
+    return {
+        "id": m_id,
+        "title": title,
+        "seriesId": series_id,
+        "seriesTitle": core_title,
+        "volumeNumber": vol_num,
+        "isSpecial": is_special,
+        "description": desc,
+        "commentary": generate_commentary(title, author, False, desc, item_id=m_id),
+        "tags": list(dict.fromkeys([author, "漫画"] + ([core_title.split()[0]] if " " in core_title else []))),
+        "author": author,
+        "rating": stable_rating(m_id, 4.4, 4.9),
+        "cover": image_url,
+        "genreId": gid,
+        "isLegendary": False
+    }
+
+@METRICS.phase("find_new_manga_delta")
+def find_new_manga_delta(known, limit, watermarks, genres=None, max_pages=None):
+    # 発売日の新しい順に読み、前回の高水位線を越えたらそのジャンルは打ち切る
+    max_pages = max_pages or DELTA_MAX_PAGES
+    found = []
+    for gid in genres or BOOK_GENRES:
+        print(f"Delta crawl in genre {gid}...", flush=True)
+        seen = []
+        caught_up = False
+        for p in range(1, max_pages + 1):
+            try:
+                data = fetch_rakuten_page(genre_id=gid, page=p, sort_method="-releaseDate")
+            except Exception as e:
+                # 取得に失敗したジャンルは高水位線を動かさない（次回に読み直す）
+                print(f"  Fetch failed on page {p}: {e}", flush=True)
+                seen = []
+                break
+            items = data.get("Items", [])
+            if not items:
+                caught_up = True
+                break
+            # 最終ページまで読めば、高水位線に達していなくても読み切ったことになる
+            last_page = p >= data.get("pageCount", 0)
+            for item in items:
+                m = item.get("Item", {})
+                date = sales_date_key(m.get("salesDate", ""))
+                if watermarks.is_older(gid, date):
+                    caught_up = True
+                    break
+                title, m_id = item_key(m)
+                seen.append((date, m_id))
+                METRICS.incr("delta.checked")
+                if watermarks.is_known(gid, date, m_id) or known.contains(m_id, title):
+                    METRICS.incr("delta.known")
+                    continue
+                new_manga = build_new_manga(m, gid, known)
+                if new_manga is None:
+                    continue
+                found.append(new_manga)
+                known.add(m_id, title)
+                if len(found) >= limit:
+                    break
+            else:
+                caught_up = caught_up or last_page
+            if caught_up or len(found) >= limit:
+                break
+        if len(found) >= limit and not caught_up:
+            # 上限で途中終了したジャンルは未処理分が残るので、高水位線は次回に持ち越す
+            print(f"  Reached limit of {limit} new items.", flush=True)
+            METRICS.incr("delta.limit_reached")
+            break
+        if caught_up:
+            METRICS.incr("delta.genres_caught_up")
+            watermarks.advance(gid, seen)
+        else:
+            # 高水位線まで読み切れなかった（ページ数の上限・取得失敗）ジャンルは線を動かさず、次回に続きを読む
+            METRICS.incr("delta.genres_unfinished")
+        print(f"  {len(seen)} recent items checked, {len(found)} new so far.", flush=True)
+    return found
+
+@METRICS.phase("find_new_manga_popular")
+def find_new_manga_popular(known):
+    # 従来モード: ランダムなジャンルの人気順を読んで未掲載の1件を探す
+    genres = list(BOOK_GENRES)
+    random.shuffle(genres)
+
+    for gid in genres:
         print(f"Searching in genre {gid}...")
         # 3ページ目くらいまで見てみる（1ページ目はすでにある可能性が高いので）
         for p in range(1, 10):
             items = fetch_rakuten_data(genre_id=gid, page=p, sort_method="reviewCount")
             if not items:
                 break
-                
+
             for item in items:
                 m = item.get("Item", {})
-                raw_title = m.get("title", "")
-                title = clean_title(raw_title)
-                
                 # まだサイトにない漫画を見つける
-                if is_manga(title, m.get("itemCaption", ""), m.get("booksGenreId", "")):
-                    author = m.get("author", "不明")
-                    
-                    # 共通関数で情報を取得
-                    series_id, core_title, vol_num, is_special = get_series_info(raw_title, author)
-                    m_id = hashlib.md5((title + author).encode()).hexdigest()[:12]
-                    
-                    if m_id not in existing_ids and title not in existing_titles:
-                        # 新規漫画確定
-                        desc = m.get("itemCaption", "")
-                        if not desc:
-                            desc = f"「{title}」の圧倒的な世界観。注目の最新作をチェックしましょう。"
-                        
-                        image_url = m.get("largeImageUrl", "").split("?")[0] + "?_ex=300x420"
-                        
-                        new_manga = {
-                            "id": m_id,
-                            "title": title,
-                            "seriesId": series_id,
-                            "seriesTitle": core_title,
-                            "volumeNumber": vol_num,
-                            "isSpecial": is_special,
-                            "description": desc,
-                            "commentary": generate_commentary(title, author, False, desc),
-                            "tags": list(set([author, "漫画"] + ([core_title.split()[0]] if " " in core_title else []))),
-                            "author": author,
-                            "rating": round(random.uniform(4.4, 4.9), 1),
-                            "cover": image_url,
-                            "genreId": gid,
-                            "isLegendary": False
-                        }
-                        break
-            if new_manga: break
-        if new_manga: break
-
-    if new_manga:
-        print(f"Adding new manga: {new_manga['title']}")
-        manga_data.append(new_manga)
-        
-        # 3. 保存
-        with open(DATA_FILE, 'w', encoding='utf-8') as f:
-            json.dump(manga_data, f, ensure_ascii=False, indent=2)
-        
-        print("Successfully updated mangaData.json")
-        
+                title, m_id = item_key(m)
+                if known.contains(m_id, title):
+                    continue
+                new_manga = build_new_manga(m, gid, known)
+                if new_manga:
+                    return [new_manga]
+    return []
+
+@METRICS.phase("daily_update")
+def daily_update(mode="delta", limit=None):
+    print("Starting daily content update...")
+
+    # 1. カタログDBを開く（掲載済みの判定は索引で引く）
+    with open_catalog() as catalog:
+        if catalog.count() == 0:
+            print(f"Error: the catalog DB ({CATALOG_DB}) is empty or missing, and there is no exported data "
+                  f"({DATA_FILE}) to import. Run generate_data.py first.")
+            return
+
+        # 2. 楽天APIから未掲載の漫画を探す
+        known = KnownItems(catalog)
+        if mode == "delta":
+            watermarks = Watermarks(WATERMARK_PATH)
+            new_items = find_new_manga_delta(known, limit or DAILY_NEW_ITEMS, watermarks)
+            watermarks.save()
+        else:
+            new_items = find_new_manga_popular(known)
+
+    METRICS.incr("items.new", len(new_items))
+    if new_items:
+        for new_manga in new_items:
+            print(f"Adding new manga: {new_manga['title']}")
+
+        # 3. 保存（追加分のみ書き込み）
+        with METRICS.phase("add_manga_data"):
+            add_manga_data(new_items)
+            COMMENTARY.cache.flush()
+            manga_data = load_manga_data()
+        # 関連作品は既存アイテムの分も変わりうるのでインデックスは全体を作り直す
+        save_catalog_index(manga_data)
+
+        print(f"Successfully added {len(new_items)} items to mangaData.json")
+
         # 4. サイトマップとSSGの再生成
         generate_sitemap(manga_data)
         generate_ssg(manga_data)
+        compress_artifacts()
+        generate_service_worker(manga_data)
         print("Successfully regenerated sitemap.xml and SSG files")
     else:
         print("No new manga found today.")
 
 if __name__ == "__main__":
-    daily_update()
+    import argparse
+    parser = argparse.ArgumentParser(description="新着の漫画を追加し、サイトマップ・SSGページを更新する")
+    parser.add_argument("--mode", choices=["delta", "popular"], default="delta",
+                        help="delta: 発売日順の差分クロール（既定） / popular: 人気順から1件探す従来方式")
+    parser.add_argument("--limit", type=int, default=None, help=f"追加する最大件数（既定 {DAILY_NEW_ITEMS}）")
+    parser.add_argument("--report", default=None, help=f"実行レポート(JSON)の出力先（既定 {REPORT_DIR}/daily_update.json）")
+    parser.add_argument("--profile", action="store_true", help="cProfile で計測し、統計を実行レポートと同じ場所に保存する")
+    args = parser.parse_args()
+    run_with_report("daily_update", daily_update, args.report, args.profile, mode=args.mode, limit=args.limit)
@@ -1,50 +1,123 @@
+import hashlib
 import json
-import random
-import urllib.request
 import time
 import urllib.parse
-import re
-import hashlib
 import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from catalog_db import CatalogDB
+from catalog_index import parse_int, write_indexes
+from commentary_engine import CommentaryCache, CommentaryEngine, stable_rating
+from crawl_journal import CrawlJournal
+from crawl_planner import CrawlPlanner
+from crawler import CrawlStream, TokenBucket
+from http_client import HTTPClient
+from incremental_writer import IncrementalWriter, atomic_write
+from item_record import ItemRecord
+from manga_store import ShardedStore, append_json_array
+from pipeline import BackgroundStage
+from precompress import compress_file, fingerprint, precompress
+from response_cache import ResponseCache
+from run_metrics import RunMetrics, instrumented_run
+from search_index import write_search_index
+from series_resolver import merge_series
+from sources import BOOKS_COMIC_GENRE, KOBO_COMIC_GENRE, KOBO_SORTS, DedupIndex, Source, books_item, kobo_item
+from service_worker import precache_entries, write_service_worker
+from sitemap_engine import write_sitemaps
+from ssg_template import PageTemplate, prerender_manga, prerender_series, redirect_page, series_summary
+from title_normalizer import TitleNormalizer
 
 # 楽天API設定
 APP_ID = os.environ.get("RAKUTEN_APP_ID", "1016939452195557224")
 BOOKS_BASE_URL = "https://app.rakuten.co.jp/services/api/BooksBook/Search/20170404"
+BOOKS_EBOOK_URL = "https://app.rakuten.co.jp/services/api/BooksEbook/Search/20170404"
+KOBO_BASE_URL = "https://app.rakuten.co.jp/services/api/Kobo/EbookSearch/20170412"
+# 取得元（楽天ブックスの紙・電子書籍、楽天Kobo）。Item の形の違いは sources.Source が吸収する
+SOURCES = {
+    "books": Source("books", "BooksBook/Search", "booksGenreId", BOOKS_COMIC_GENRE, books_item, {"imageFlag": 1}),
+    "ebook": Source("ebook", "BooksEbook/Search", "booksGenreId", BOOKS_COMIC_GENRE, books_item, {"imageFlag": 1}),
+    "kobo": Source("kobo", "Kobo/EbookSearch", "koboGenreId", KOBO_COMIC_GENRE, kobo_item, sorts=KOBO_SORTS,
+                   crawl_sorts=("reviewCount", "-releaseDate", "standard")),
+}
+# クロールする取得元（カンマ区切り、先に書いたものほど重複時に優先）
+CRAWL_SOURCES = os.environ.get("CRAWL_SOURCES", "books,ebook,kobo").split(",")
+# APIのリクエスト上限（毎秒）。エンドポイントごとに全スレッドで共有するリミッタで制御する
+REQUESTS_PER_SECOND = float(os.environ.get("RAKUTEN_RPS", "1"))
+RATE_LIMITER = TokenBucket(REQUESTS_PER_SECOND)
+# 実行ごとの計測（フェーズ別の時間・API呼び出し・判定の内訳など）。終了時に JSON レポートへ書き出す
+METRICS = RunMetrics()
+# 全フェッチで共有するキープアライブ接続プール（BooksBook 以外のエンドポイントはそれぞれのリミッタ）
+HTTP_CLIENT = HTTPClient(limiter=RATE_LIMITER, retries=3, metrics=METRICS, limiters={
+    urllib.parse.urlsplit(url).path: TokenBucket(REQUESTS_PER_SECOND) for url in (BOOKS_EBOOK_URL, KOBO_BASE_URL)
+})
+# ローカルの作業用ディレクトリ（キャッシュ等。git管理外）
+CACHE_DIR = os.environ.get("MANGA_REACH_CACHE_DIR", ".cache")
+# 実行レポート・プロファイルの出力先
+REPORT_DIR = os.path.join(CACHE_DIR, "reports")
+# APIレスポンスのディスクキャッシュ。RAKUTEN_CACHE_MODE=replay でオフライン再生、off で無効
+RESPONSE_CACHE = ResponseCache(
+    os.path.join(CACHE_DIR, "rakuten_responses.sqlite3"),
+    mode=os.environ.get("RAKUTEN_CACHE_MODE", "readwrite"),
+    ttls={source.endpoint: float(os.environ.get("RAKUTEN_CACHE_TTL", 24 * 3600)) for source in SOURCES.values()}
+)
+# クロールのチェックポイント（途中再開用）
+JOURNAL_PATH = os.path.join(CACHE_DIR, "crawl_journal.jsonl")
+# SSG出力の内容ハッシュ（変更のないページは書き込まない）
+SSG_MANIFEST_PATH = os.path.join(CACHE_DIR, "ssg_manifest.json")
+# SSGの並列ワーカー数（1 なら直列）
+SSG_WORKERS = int(os.environ.get("SSG_WORKERS", os.cpu_count() or 1))
+# クロールと並行して巻ページまで作るか（0 ならクロール後にまとめて作る）と、その処理段に溜められるページ数
+STREAM_VOLUME_PAGES = os.environ.get("STREAM_VOLUME_PAGES", "1") != "0"
+STREAM_QUEUE_PAGES = 64
+# 表記ゆれで分かれたシリーズをクロール後に統合するか（0 なら統合しない）と、統合の記録の出力先
+MERGE_SERIES = os.environ.get("MERGE_SERIES", "1") != "0"
+SERIES_MERGES_PATH = os.path.join(REPORT_DIR, "series_merges.json")
+# 統合で消えた seriesId -> 統合先。公開済みのシリーズURLは消さず、統合先へ転送するページにする（実行をまたいで引き継ぐ）
+SERIES_ALIASES_PATH = 'src/data/series_aliases.json'
+# クロールの並行数
+CRAWL_WORKERS = int(os.environ.get("CRAWL_WORKERS", "8"))
+# クロールの1ラウンドで取得するページ数（並行数を変えても結果が変わらないよう並行数とは別に持つ）
+CRAWL_BATCH = int(os.environ.get("CRAWL_BATCH", "8"))
+# 第一フェーズのリクエスト数の上限（0 なら無制限）
+CRAWL_BUDGET = int(os.environ.get("CRAWL_BUDGET", "0")) or None
 
 # スペシャル巻用のキーワード
 SPECIAL_KEYWORDS = ["イラスト集", "ガイドブック", "公式キャラクターブック", "外伝", "小説", "ノベル", "公式ファンブック", "画集", "設定資料", "コンプリート", "アンソロジー", "キャラクターズ", "ファンブック", "ガイド", "Special", "公式アニメ"]
 
 def get_series_info(title, author):
-    # タイトルを正規化
-    title = clean_title(title)
-    # スペシャル巻判定
-    is_special = any(sk in title for sk in SPECIAL_KEYWORDS)
-    # 巻数抽出
-    base_search_title = re.sub(r'[!！?？:：\s]', '', title)
-    vol_match = re.search(r'(\d+)$', base_search_title)
-    vol_num = vol_match.group(1) if vol_match else "1"
-    # 【重要】コア・シリーズ名の抽出
-    core_title = title
-    for sk in SPECIAL_KEYWORDS:
-        core_title = re.sub(sk, '', core_title, flags=re.IGNORECASE).strip()
-    # 巻数（末尾の数字）を除去
-    core_title = re.sub(r'\s*\d+$', '', core_title).strip()
-    # 記号を再度除去して ID 生成用のキーにする
-    normalized_core_name = re.sub(r'[!！?？:：\s]', '', core_title)
-    # レジェンダリータイトルがあれば優先
-    for lt in LEGENDARY_TITLES:
-        norm_lt = re.sub(r'[!！?？:：\s]', '', lt)
-        if normalized_core_name.startswith(norm_lt) or norm_lt.startswith(normalized_core_name):
-            normalized_core_name = norm_lt
-            core_title = lt
-            break
-    if not normalized_core_name: normalized_core_name = "unknown"
-    series_id = hashlib.md5((normalized_core_name + author).encode()).hexdigest()[:12]
-    return series_id, core_title, vol_num, is_special
+    # 正規化・ID生成は事前コンパイル済みの NORMALIZER に委譲
+    return NORMALIZER.series_info(title, author)
 
 # ターゲット件数
 TARGET_COUNT = 5000
 
+# 出力先: 全件JSON（カタログDBの書き出し）・事前計算インデックスと、フロントがページ単位で取得するシャード分割データ
+DATA_FILE = 'src/data/mangaData.json'
+# カタログの正本（SQLite）。mangaData.json・シャードはここからの書き出し
+CATALOG_DB = 'src/data/catalog.sqlite3'
+SHARD_DIR = 'public/data/manga'
+INDEX_DIR = 'src/data/index'
+# サイトマップ: インデックス・シャード・URLごとの内容ハッシュ（lastmod 判定用、CIでコミットして引き継ぐ）
+SITEMAP_INDEX = 'public/sitemap.xml'
+SITEMAP_DIR = 'public/sitemaps'
+SITEMAP_LASTMOD_DB = 'src/data/sitemap_lastmod.db'
+# 事前圧縮（.gz / .br）の対象と、元ファイルの内容ハッシュ（変更のないファイルは圧縮し直さない）
+# public/sitemaps のシャードは最初から gzip なので含めない
+# asset-manifest.json: データシャードの論理パス -> 内容ハッシュ付きのファイル名（フロントはこれを引いて取得する）
+ASSET_MANIFEST = 'public/asset-manifest.json'
+COMPRESS_TARGETS = ['public/manga', 'public/series', 'public/data', SITEMAP_INDEX, ASSET_MANIFEST]
+COMPRESS_MANIFEST_PATH = os.path.join(CACHE_DIR, "compress_manifest.json")
+# Service Worker（事前キャッシュのマニフェストをビルド時に書き換える）と、事前キャッシュする先頭シリーズのページ数
+SERVICE_WORKER = 'public/sw.js'
+PRECACHE_SERIES = 30
+
+# 取得対象のジャンル（少年・少女・青年・レディース等）
+BOOK_GENRES = ["001001001", "001001002", "001001003", "001001004", "001001006", "001001007", "001001008"]
+# Kobo は漫画（コミック）全体をジャンル×ソートの列にする
+KOBO_GENRES = [KOBO_COMIC_GENRE]
+
 # 主要作品のボリューム別ハイライト（リサーチ済みデータ）
 VOLUME_HIGHLIGHTS = {
     "キングダム": {
@@ -89,98 +162,23 @@ VOLUME_HIGHLIGHTS = {
     }
 }
 
-class NaturalSentenceBuilder:
-    def __init__(self, title, author, description, vol_num):
-        self.title = title
-        self.author = author
-        self.desc = description
-        self.vol_num = vol_num
-        self.keywords = self._extract_keywords()
-        
-    def _extract_keywords(self):
-        # 意味のあるカタカナ語や漢字の固有名詞を抽出
-        if not self.desc: return []
-        potential = re.findall(r'[\u4E00-\u9FFF]{2,}|[\u30A1-\u30F6]{2,}', self.desc)
-        ignore = ["物語", "世界", "登場", "展開", "魅力", "作品", "連載", "発売", "本作", "収録", "真相", "事件"]
-        k = [p for p in potential if p not in ignore]
-        return list(dict.fromkeys(k))[:3]
-
-    def build(self, is_legend):
-        highlight = ""
-        for series_name, volumes in VOLUME_HIGHLIGHTS.items():
-            if series_name in self.title:
-                highlight = volumes.get(self.vol_num, "")
-                break
-        
-        # 導入
-        intro_patterns = [
-            f"『{self.title}』は、{self.author}先生が放つ渾身のエンターテインメント作品です。",
-            f"今、マンガファンの間で絶大な支持を集めている『{self.title}』（{self.author}著）は、一読の価値がある傑作です。",
-            f"{self.author}先生の圧倒的な筆力で描かれる『{self.title}』。読者の心を一気に掴んで離さない魅力的な一冊です。"
-        ]
-        
-        # 巻数・リサーチ情報
-        vol_info = ""
-        if highlight:
-            vol_info = f"特に第{self.vol_num}巻である本作では、{highlight} "
-        elif self.vol_num:
-            vol_info = f"物語が大きな転換点を迎える第{self.vol_num}巻。前巻からの伏線が回収され、次なる嵐を予感させる重要な局面が描かれています。"
-            
-        # ストーリー・描写
-        kw_text = "や".join(self.keywords) if self.keywords else "独自の重厚な世界観"
-        story_patterns = [
-            f"本作の核となるのは、{kw_text}を中心とした緻密なストーリー構成です。予測不可能な展開に、ページをめくる手が止まりません。",
-            f"緻密な世界観設定が本作の魅力。物語が進むにつれて{kw_text}にまつわる謎が明かされていく様は圧巻です。",
-            f"テンポの良い掛け合いと思わず唸るような独創的なアイデアが満載。{kw_text}を主軸とした迫力ある描写から目が離せません。"
-        ]
-        
-        # 作画・構成
-        art_patterns = [
-            "作画のクオリティも非常に高く、背景の細部まで徹底的に描き込まれています。キャラクターの表情一つひとつに宿る感情が、ドラマをより一層引き立てます。",
-            "独特で洗練された絵のタッチが、作品の世界を鮮やかに彩っています。特に勝負所での演出センスは抜群で、視覚的なインパクトが非常に強いのが特徴です。",
-            "キャラクターの躍動感が素晴らしく、紙面から飛び出してきそうな迫力があります。繊細さと鋭さを兼ね備えた描写力は、まさに芸術的です。"
-        ]
-        
-        # 結び
-        conclusion = random.choice([
-            "全マンガファンに自信を持っておすすめできる、最高峰のエンターテインメント体験をお楽しみください。",
-            "あなたのマンガライフをより彩り豊かにしてくれること間違いなしの、珠玉の一冊です。",
-            "ジャンルの枠を超えた普遍的な感動があり、何度でも読み返したくなる不思議な魔力に満ちています。"
-        ])
-
-        paragraphs = [
-            random.choice(intro_patterns),
-            vol_info,
-            random.choice(story_patterns),
-            random.choice(art_patterns),
-            conclusion
-        ]
-        if is_legend:
-            paragraphs.insert(0, f"漫画史に名を刻むレジェンド作品『{self.title}』。{kw_text}という革新的なテーマを世に知らしめた、まさに「必読」の一冊です。")
-            
-        return "\n\n".join([p for p in paragraphs if p])
+# 解説文エンジン（id でシードした決定的な生成 + 生成結果の永続キャッシュ）
+COMMENTARY = CommentaryEngine(VOLUME_HIGHLIGHTS, CommentaryCache(os.path.join(CACHE_DIR, "commentary.sqlite3")))
 
-def generate_commentary(title, author, is_legendary, description=""):
-    vol_match = re.search(r'(\d+)\s*(巻|vol)', title)
-    if not vol_match:
-        vol_match = re.search(r'\s(\d+)$', title)
-    vol_num = vol_match.group(1) if vol_match else ""
-    
-    builder = NaturalSentenceBuilder(title, author, description, vol_num)
-    return builder.build(is_legendary)
+def generate_commentary(title, author, is_legendary, description="", item_id=None):
+    # item_id を省略した場合は作品 id と同じ タイトル+著者 の MD5 を使う
+    if item_id is None:
+        item_id = hashlib.md5((title + author).encode()).hexdigest()[:12]
+    with METRICS.phase("commentary"):
+        return COMMENTARY.generate(item_id, title, author, is_legendary, description)
 
 def zen_to_han(text):
     # 全角数字を半角に変換
-    return text.translate(str.maketrans('０１２３４５６７８９', '0123456789'))
+    return TitleNormalizer.zen_to_han(text)
 
 def clean_title(title):
-    # 全角数字を半角に、また表記を統一
-    title = zen_to_han(title)
-    # 余計な記号や括弧を削除
-    cleaned = re.sub(r'\(.*?\)|（.*?）', '', title)
-    cleaned = re.sub(r'【.*?】|\[.*?\]', '', cleaned)
-    cleaned = re.sub(r'[\(\)（）]', '', cleaned).strip()
-    return cleaned
+    # 全角数字を半角に、また表記を統一し、余計な記号や括弧を削除
+    return TitleNormalizer.clean_title(title)
 
 # ... (その他の既存の関数は維持、または微調整) ...
 NEGATIVE_KEYWORDS = [
@@ -194,32 +192,50 @@ NEGATIVE_KEYWORDS = [
 ]
 
 def is_manga(title, description, genre_id):
-    if genre_id and not genre_id.startswith("001001"): return False
-    # 有名作品リストに含まれていれば通過
-    LEGENDARY_UPPER = [lt.upper() for lt in LEGENDARY_TITLES]
-    TITLE_UPPER = title.upper()
-    if any(lt in TITLE_UPPER for lt in LEGENDARY_UPPER): return True
-    if re.search(r'\d{4}年\s*\d+号', title) or re.search(r'\d+号$', title): return False
-    text = (title + " " + (description or "")).lower()
-    if any(nk.lower() in text for nk in NEGATIVE_KEYWORDS): return False
-    return True
+    return NORMALIZER.is_manga(title, description, genre_id)
+
+def source_url(name):
+    # 取得元のエンドポイントURL（実行時に読むのでテスト・ベンチマークで差し替えられる）
+    return {"books": BOOKS_BASE_URL, "ebook": BOOKS_EBOOK_URL, "kobo": KOBO_BASE_URL}[name]
+
+def source_genres(name, book_genres):
+    return KOBO_GENRES if SOURCES[name].genre_param == "koboGenreId" else book_genres
+
+def fetch_source_page(source="books", genre_id=None, keyword=None, sort_method="reviewCount", page=1):
+    # レスポンス全体を返す（Items は BooksBook の形に正規化済み）
+    # キャッシュになければ3回まで再試行（指数バックオフ）し、それでも失敗したら例外を送出
+    src = SOURCES[source]
+    params = src.params(APP_ID, genre_id, keyword, sort_method, page)
+    url = f"{source_url(source)}?{urllib.parse.urlencode(params)}"
+    data = src.normalize_page(RESPONSE_CACHE.fetch_json(HTTP_CLIENT, src.endpoint, params, url))
+    received = len(data.get("Items", []))
+    METRICS.incr("rakuten.pages")
+    METRICS.incr("rakuten.items", received)
+    METRICS.incr(f"sources.{source}.pages")
+    METRICS.incr(f"sources.{source}.items", received)
+    return data
 
+def fetch_rakuten_page(genre_id=None, keyword=None, sort_method="reviewCount", page=1):
+    return fetch_source_page("books", genre_id, keyword, sort_method, page)
+
+def fetch_rakuten_items(**kwargs):
+    # クロール用: 失敗は例外のまま上げて、空ページ（列の終端）と区別する
+    return fetch_rakuten_page(**kwargs).get("Items", [])
+
+@METRICS.phase("fetch_rakuten_data")
 def fetch_rakuten_data(genre_id=None, keyword=None, sort_method="reviewCount", page=1):
-    params = {
-        "format": "json", "applicationId": APP_ID, "hits": 30, "page": page,
-        "sort": sort_method, "imageFlag": 1, "booksGenreId": genre_id or "001001"
-    }
-    if keyword: params["title"] = keyword
-    url = f"{BOOKS_BASE_URL}?{urllib.parse.urlencode(params)}"
-    for _ in range(3):
-        try:
-            req = urllib.request.Request(url, headers={'User-Agent': 'Mozilla/5.0'})
-            with urllib.request.urlopen(req) as response:
-                time.sleep(0.3)
-                data = json.loads(response.read().decode('utf-8'))
-                return data.get("Items", [])
-        except Exception: time.sleep(2)
-    return []
+    try:
+        return fetch_rakuten_items(genre_id=genre_id, keyword=keyword, sort_method=sort_method, page=page)
+    except Exception:
+        METRICS.incr("rakuten.fetch_failed")
+        return []
+
+def record_classification(records, received):
+    # 判定結果の内訳を計測に記録する（キーワード不一致で判定対象外になった分も数える）
+    METRICS.incr("items.received", received)
+    METRICS.incr("items.keyword_mismatch", received - len(records))
+    for r in records:
+        METRICS.incr(f"items.rejected.{r['reason']}" if r["reason"] else "items.accepted")
 
 # 伝説的なタイトル (リサーチ対象含む)
 LEGENDARY_TITLES = [
@@ -231,98 +247,242 @@ LEGENDARY_TITLES = [
     "ジョジョの奇妙な冒険", "SPY×FAMILY", "推しの子", "BORUTO"
 ]
 
-def generate_manga_data():
+# キーワード群をまとめてコンパイルした正規化エンジン
+NORMALIZER = TitleNormalizer(SPECIAL_KEYWORDS, NEGATIVE_KEYWORDS, LEGENDARY_TITLES)
+
+def journal_items(journal, phase):
+    # ジャーナルに記録済みのページ {(列, ページ): [(id, ItemRecord)]}
+    return {key: [(m_id, ItemRecord.from_json(data)) for m_id, data in items] for key, items in journal.phase_pages(phase).items()}
+
+@METRICS.phase("crawl_catalog")
+def crawl_catalog(genres=None, workers=None, journal=None, on_items=None, sources=None):
+    # 第一フェーズ: 取得元×ジャンル×ソート順の列を CrawlPlanner でページング
+    # 各列の1ページ目で pageCount を読み、以降は新規 id の取れ高が高い列にリクエストを回し、飽和した列は打ち切る
+    # レート上限は取得元（エンドポイント）ごとなので、プランナーの経路を取得元で分けて各取得元を並行に進める
+    # 取得結果は (列, ページ) ごとに保持し、最後に決まった順序でマージする（実行ごとの揺れを防ぐ）
+    # 取得元をまたいだ重複は DedupIndex（ISBN、無ければ id）で除く。マージは列の番号順なので、先に書いた取得元のものが残る
+    # 保持するのは API の Item そのものではなく、使う項目だけの ItemRecord
+    # 各ページはジャーナルに追記され、途中で落ちても次回は続きのページから再開する
+    # on_items: 新しく受け入れたアイテム [(id, ItemRecord)] をページごとに受け取るコールバック（ジャーナルから復元した分も渡す）
+    genres = genres or BOOK_GENRES
+    sources = sources or CRAWL_SOURCES
+    journal = journal or CrawlJournal(JOURNAL_PATH).load()
+    if journal.completed:
+        journal.reset()
+    if journal.resumed:
+        print(f"Resuming crawl from {journal.path}...", flush=True)
+    phase1_pages = journal_items(journal, 1)
+    # クロール中の新規判定用（取得順に登録するので、どの id が残るかはマージ側で決める）
+    live = DedupIndex()
+
+    def accept(stream, page, records, phase, pages):
+        # 受け入れたアイテムを保持・記録し、プランナーに渡す id（重複は既知の id に寄せたもの）を返す
+        source = stream.params["source"]
+        accepted = [(r["id"], ItemRecord.from_api(r["item"])) for r in records if r["is_manga"]]
+        pages[(stream.key, page)] = accepted
+        journal.record_page(phase, stream.key, page, [(m_id, rec.to_json()) for m_id, rec in accepted])
+        resolved = [live.resolve(m_id, rec.isbn) for m_id, rec in accepted]
+        fresh = [pair for pair, (_, new) in zip(accepted, resolved) if new]
+        METRICS.incr(f"sources.{source}.accepted", len(accepted))
+        METRICS.incr(f"sources.{source}.new", len(fresh))
+        if on_items: on_items(fresh)
+        return [m_id for m_id, _ in resolved]
+
+    streams = []
+    for source in sources:
+        for gid in source_genres(source, genres):
+            for sort_m in SOURCES[source].crawl_sorts:
+                key = source_key((len(streams), gid, sort_m), source)
+                streams.append(CrawlStream(key, {"source": source, "genre_id": gid, "sort_method": sort_m}, 100,
+                                           journal.next_page(1, key)))
+    if 1 in journal.phases_done:
+        streams = []
+    streams = [s for s in streams if not journal.is_done(1, s.key)]
+    planner = CrawlPlanner(fetch_source_page, streams, batch=CRAWL_BATCH, workers=workers or CRAWL_WORKERS,
+                           min_yield=0.1, patience=2, target=TARGET_COUNT, budget=CRAWL_BUDGET,
+                           lane=lambda s: s.params["source"])
+    replay_pages(planner, phase1_pages, live, on_items)
+
+    def on_genre_page(stream, page, items):
+        records = NORMALIZER.classify_page(items, series=False)
+        record_classification(records, len(items))
+        if page == 1:
+            print(f"Fetching {stream.params['source']} genre {stream.params['genre_id']} "
+                  f"(Sort: {stream.params['sort_method']})...", flush=True)
+        if page % 10 == 0:
+            print(f"  Current unique items: {len(planner.seen)}", flush=True)
+        return accept(stream, page, records, 1, phase1_pages)
+
+    with METRICS.phase("phase1"):
+        planner.run(on_genre_page, lambda stream: journal.record_done(1, stream.key))
+    record_plan(planner, "phase1")
+    if planner.stopped or all(journal.is_done(1, s.key) for s in streams):
+        journal.record_phase_done(1)
+
+    merged = DedupIndex()
     series_map = {}
-    sort_methods = ["reviewCount", "sales", "standard"]
-    
-    for gid in BOOK_GENRES:
-        for sort_m in sort_methods:
-            print(f"Fetching genre {gid} (Sort: {sort_m})...", flush=True)
-            for page in range(1, 101):
-                items = fetch_rakuten_data(genre_id=gid, page=page, sort_method=sort_m)
-                if not items: break
-                for item in items:
-                    v = item.get("Item", {})
-                    title = clean_title(v.get("title", ""))
-                    if is_manga(title, v.get("itemCaption", ""), v.get("booksGenreId", "")):
-                        author = v.get("author", "不明")
-                        m_id = hashlib.md5((title + author).encode()).hexdigest()[:12]
-                        if m_id not in series_map:
-                            series_map[m_id] = v
-                
-                if page % 10 == 0:
-                    print(f"  Current unique items: {len(series_map)}", flush=True)
-                
-                time.sleep(0.1)
-                if len(series_map) >= TARGET_COUNT: break
-            if len(series_map) >= TARGET_COUNT: break
-        if len(series_map) >= TARGET_COUNT: break
-
-    # 第二フェーズ: 重要作品の「全巻スイープ」
+    merge_pages(series_map, phase1_pages, merged)
+
+    # 第二フェーズ: 重要作品の「全巻スイープ」（取得元ごと）
+    # 第一フェーズで既に取れている巻は新規に数えず、2ページ目以降で新規なしのページが2回続いたら打ち切る（検索深度は20ページまで）
     print(f"\nPhase 2: Deep sweeping for {len(LEGENDARY_TITLES)} legendary titles to ensure full coverage...", flush=True)
-    for title_kw in LEGENDARY_TITLES:
-        print(f"  Sweeping: {title_kw}...", flush=True)
-        # 検索深度を強化（20ページまで）
-        for page in range(1, 21):
-            items = fetch_rakuten_data(keyword=title_kw, page=page, sort_method="standard")
-            if not items: break
-            found_new = False
-            for item in items:
-                v = item.get("Item", {})
-                full_title = clean_title(v.get("title", ""))
-                # 作品名が含まれているかチェック
-                if title_kw.lower() in full_title.lower():
-                    if not is_manga(full_title, v.get("itemCaption", ""), v.get("booksGenreId", "")):
-                        continue
-                    author = v.get("author", "不明")
-                    m_id = hashlib.md5((full_title + author).encode()).hexdigest()[:12]
-                    if m_id not in series_map:
-                        series_map[m_id] = v
-                        found_new = True
-            if not found_new and page > 1: break # 若干の余裕
-            time.sleep(0.1)
-    
-    print(f"Deep sweep completed. Total unique items: {len(series_map)}", flush=True)
+    phase2_pages = journal_items(journal, 2)
+    streams = []
+    for source in sources:
+        for title_kw in LEGENDARY_TITLES:
+            key = source_key((len(streams), title_kw), source)
+            streams.append(CrawlStream(key, {"source": source, "keyword": title_kw, "sort_method": "standard"}, 20,
+                                       journal.next_page(2, key)))
+    streams = [s for s in streams if not journal.is_done(2, s.key)]
+    planner = CrawlPlanner(fetch_source_page, streams, seen=set(planner.seen), batch=CRAWL_BATCH,
+                           workers=workers or CRAWL_WORKERS, min_yield=0.01, patience=2,
+                           lane=lambda s: s.params["source"])
+    replay_pages(planner, phase2_pages, live, on_items)
 
-    series_groups = {} # series_id -> list of items
+    def on_keyword_page(stream, page, items):
+        title_kw = stream.params["keyword"]
+        if page == 1:
+            print(f"  Sweeping: {title_kw} ({stream.params['source']})...", flush=True)
+        # 作品名がタイトルに含まれるものだけを判定対象にする
+        records = NORMALIZER.classify_page(items, keyword=title_kw, series=False)
+        record_classification(records, len(items))
+        return accept(stream, page, records, 2, phase2_pages)
 
-    print(f"Grouping into series and generating commentaries for {len(series_map)} items...", flush=True)
-    
+    with METRICS.phase("phase2"):
+        planner.run(on_keyword_page, lambda stream: journal.record_done(2, stream.key))
+    record_plan(planner, "phase2")
+    if all(journal.is_done(2, s.key) for s in streams):
+        journal.record_phase_done(2)
+
+    merge_pages(series_map, phase2_pages, merged)
+
+    journal.flush()
+    METRICS.incr("items.unique", len(series_map))
+    METRICS.incr("dedup.isbn", merged.duplicates["isbn"])
+    METRICS.incr("dedup.id", merged.duplicates["id"])
+    print(f"Deep sweep completed. Total unique items: {len(series_map)} "
+          f"(duplicates: {merged.duplicates['isbn']} by ISBN, {merged.duplicates['id']} by title+author)", flush=True)
+    return series_map
+
+def source_key(key, source):
+    # 列のキー。BooksBook の列は従来と同じキー（取得元を足す前のジャーナルもそのまま再開できる）
+    return key if source == "books" else key + (source,)
+
+def replay_pages(planner, pages, index, on_items=None):
+    # ジャーナルから復元したページを、ラウンドの処理順（ページ順・列順）でプランナーに反映する
+    for stream_key, page in sorted(pages, key=lambda k: (k[1], k[0])):
+        accepted = pages[(stream_key, page)]
+        resolved = [index.resolve(m_id, rec.isbn) for m_id, rec in accepted]
+        planner.replay(stream_key, page, [m_id for m_id, _ in resolved])
+        if on_items: on_items([pair for pair, (_, new) in zip(accepted, resolved) if new])
+
+def merge_pages(series_map, pages, index):
+    # (列, ページ) の順に1つにまとめる。重複は先に出てきたもの（列の番号が小さい＝先に書いた取得元）を残す
+    for key in sorted(pages):
+        for m_id, v in pages[key]:
+            m_id, new = index.resolve(m_id, v.isbn)
+            if new:
+                series_map[m_id] = v
+
+def record_plan(planner, phase):
+    stats = planner.summary()
+    for k in ("requests", "exhausted", "saturated", "failed", "budget"):
+        METRICS.incr(f"crawl.{phase}.{k}", stats[k])
+    print(f"  Crawl plan ({phase}): {stats['requests']} requests, {stats['unique']} unique, "
+          f"{stats['saturated']}/{stats['streams']} streams saturated", flush=True)
+
+def build_manga_item(m_id, v):
+    # クロール結果の1件（ItemRecord）から掲載用のレコード（解説文つき）を作る。表紙が無いものは None
+    # シリーズ内で同じ値になる文字列は intern して巻ごとに複製しない
+    raw_title = v.title
+    author = v.author
+
+    # 共通関数で情報を取得
+    series_id, core_title, vol_num, is_special = get_series_info(raw_title, author)
+    series_id, core_title, vol_num = sys.intern(series_id), sys.intern(core_title), sys.intern(vol_num)
+
+    title = clean_title(raw_title)
+    is_legend = NORMALIZER.is_legendary(core_title)
+    desc = v.caption
+    if not desc: desc = f"『{title}』が贈る圧倒的な世界観。物語の神髄を美麗な書影と共にお楽しみください。"
+
+    gid = v.genre_id
+    cover = v.image + "?_ex=300x420"
+    if not cover or "noimage" in cover.lower():
+        METRICS.incr("items.rejected.noimage")
+        return None
+
+    return {
+        "id": m_id,
+        "title": title,
+        "seriesId": series_id,
+        "seriesTitle": core_title,
+        "volumeNumber": vol_num,
+        "isSpecial": is_special,
+        "description": desc,
+        "commentary": generate_commentary(title, author, is_legend, desc, item_id=m_id),
+        "tags": list(dict.fromkeys([author, "漫画", core_title])),
+        "author": author,
+        "rating": stable_rating(m_id, 4.5, 5.0),
+        "cover": cover, "genreId": gid, "isLegendary": is_legend
+    }
+
+@METRICS.phase("grouping")
+def group_series(series_map, prepared=None):
+    # クロール結果（id -> ItemRecord）をシリーズ単位にまとめる
+    # prepared: クロール中に作成済みのレコード {id: (元の ItemRecord, レコード)}。元が同じものはそのまま使う
+    series_groups = {} # series_id -> list of items
     for m_id, v in series_map.items():
-        raw_title = v.get("title", "")
-        author = v.get("author", "不明")
-        
-        # 共通関数で情報を取得
-        series_id, core_title, vol_num, is_special = get_series_info(raw_title, author)
-        
-        title = clean_title(raw_title)
-        is_legend = any(lt.lower() in core_title.lower() for lt in LEGENDARY_TITLES)
-        desc = v.get("itemCaption", "")
-        if not desc: desc = f"『{title}』が贈る圧倒的な世界観。物語の神髄を美麗な書影と共にお楽しみください。"
-        
-        gid = v.get("booksGenreId", "001001")
-        cover = v.get("largeImageUrl", "").split("?")[0] + "?_ex=300x420"
-        if not cover or "noimage" in cover.lower(): continue
-
-        manga_item = {
-            "id": m_id,
-            "title": title,
-            "seriesId": series_id,
-            "seriesTitle": core_title,
-            "volumeNumber": vol_num,
-            "isSpecial": is_special,
-            "description": desc,
-            "commentary": generate_commentary(title, author, is_legend, desc),
-            "tags": list(set([author, "漫画", core_title])),
-            "author": author,
-            "rating": round(random.uniform(4.5, 5.0), 1),
-            "cover": cover, "genreId": gid, "isLegendary": is_legend
-        }
-        
-        if series_id not in series_groups:
-            series_groups[series_id] = []
-        series_groups[series_id].append(manga_item)
+        done = prepared.get(m_id) if prepared else None
+        manga_item = done[1] if done is not None and done[0] == v else build_manga_item(m_id, v)
+        if manga_item is None:
+            continue
+        if manga_item["seriesId"] not in series_groups:
+            series_groups[manga_item["seriesId"]] = []
+        series_groups[manga_item["seriesId"]].append(manga_item)
+    return series_groups
+
+@METRICS.phase("series_merge")
+def merge_series_groups(series_groups):
+    # 新装版・副題つき・表記違いで別の seriesId になったシリーズを統合し、記録を SERIES_MERGES_PATH に書く
+    # 戻り値: seriesId を付け替えた巻の id
+    merges = merge_series(series_groups)
+    moved = [m_id for merge in merges for s in merge["merged"] for m_id in s["items"]]
+    METRICS.incr("series.merged", sum(len(merge["merged"]) for merge in merges))
+    METRICS.incr("series.merged_volumes", len(moved))
+    atomic_write(SERIES_MERGES_PATH, json.dumps(merges, ensure_ascii=False, indent=1).encode("utf-8"))
+    update_series_aliases(merges, set(series_groups))
+    print(f"Merged {len(moved)} volumes of {sum(len(merge['merged']) for merge in merges)} series "
+          f"into {len(merges)} series (see {SERIES_MERGES_PATH}).", flush=True)
+    return moved
+
+def load_series_aliases():
+    if not os.path.exists(SERIES_ALIASES_PATH):
+        return {}
+    with open(SERIES_ALIASES_PATH, 'r', encoding='utf-8') as f:
+        return json.load(f)
 
+def update_series_aliases(merges, live_ids):
+    # 統合された seriesId を統合先に向けて SERIES_ALIASES_PATH に保存する
+    # いま存在するシリーズの id は別名から外し、別名の連鎖（A→B のあと B→C）は最終的な統合先にたどる
+    aliases = load_series_aliases()
+    for merge in merges:
+        for s in merge["merged"]:
+            aliases[s["seriesId"]] = merge["into"]
+    aliases = {old: new for old, new in aliases.items() if old not in live_ids}
+    resolved = {}
+    for old, new in aliases.items():
+        seen = {old}
+        while new in aliases and new not in seen:
+            seen.add(new)
+            new = aliases[new]
+        resolved[old] = new
+    data = json.dumps(dict(sorted(resolved.items())), ensure_ascii=False, indent=1) + "\n"
+    atomic_write(SERIES_ALIASES_PATH, data.encode("utf-8"))
+    return resolved
+
+@METRICS.phase("sorting")
+def order_series(series_groups):
     # 最終的なリスト生成
     final_list = []
     # 重要作品を優先的に前に持ってくるためのソート
@@ -339,105 +499,330 @@ def generate_manga_data():
             
         series_groups[s_id].sort(key=sort_key)
         final_list.extend(series_groups[s_id])
+    return final_list
+
+def stream_volume_pages(writer):
+    # クロールと並行して動く処理段: 受け入れたアイテムから掲載用レコード（解説文つき）を作り、巻ページを書き出して圧縮版も置く
+    # 戻り値: (BackgroundStage, prepared {id: (元の ItemRecord, レコード。表紙が無ければ None)}, compressed {パス: 内容ハッシュ})
+    template = PageTemplate.from_file("index.html")
+    prepared = {}
+    compressed = {}
+
+    def handle(pairs):
+        with METRICS.phase("stream_volume_pages"):
+            for m_id, rec in pairs:
+                if m_id in prepared:
+                    continue
+                item = build_manga_item(m_id, rec)
+                prepared[m_id] = (rec, item)
+                if item is not None:
+                    path, values = manga_page(item)
+                    if writer.write(path, template.render(**values)):
+                        compressed[path] = compress_file(path)[0]
+
+    return BackgroundStage(handle, maxsize=STREAM_QUEUE_PAGES, name="volume-pages"), prepared, compressed
+
+@METRICS.phase("generate_manga_data")
+def generate_manga_data():
+    journal = CrawlJournal(JOURNAL_PATH).load()
+    # 巻ページまではクロールと並行して作り（ネットワーク待ちの間に CPU・ディスクを使う）、
+    # シリーズ単位の出力（並び順・件数制限・シリーズページ・インデックス等）はクロール後に確定する
+    writer = IncrementalWriter(SSG_MANIFEST_PATH)
+    stage, prepared, compressed = stream_volume_pages(writer) if STREAM_VOLUME_PAGES else (None, None, None)
+    try:
+        series_map = crawl_catalog(journal=journal, on_items=stage.submit if stage else None)
+    finally:
+        if stage: stage.close()
+
+    streamed = set()
+    if prepared is not None:
+        # 同じ id でもマージで採られたのと別のアイテムから作ったものは、後で作り直す
+        streamed = {m_id for m_id, v in series_map.items() if m_id in prepared and prepared[m_id][0] == v}
+        METRICS.incr("pipeline.streamed_items", len(streamed))
+        METRICS.incr("pipeline.backpressure_waits", stage.waits)
+        print(f"Prepared {len(streamed)} items and their pages during the crawl "
+              f"(busy {stage.busy_seconds:.1f}s, {stage.waits} backpressure waits).", flush=True)
+
+    print(f"Grouping into series and generating commentaries for {len(series_map)} items...", flush=True)
+    series_groups = group_series(series_map, prepared)
+    # クロール結果はここで不要になる（以降は掲載用のレコードだけを持つ）
+    del series_map, prepared
+    if MERGE_SERIES:
+        # 付け替えた巻はページに埋め込んだシリーズ情報が変わるので、クロール中に書いたものも作り直す
+        streamed.difference_update(merge_series_groups(series_groups))
 
-    # 件数制限
+    COMMENTARY.cache.flush()
+    print(f"Commentary: {COMMENTARY.cache.hits} cached, {COMMENTARY.cache.misses} generated.", flush=True)
+
+    final_list = order_series(series_groups)
+
+    # 件数制限（クロール中に書いた巻ページのうち外れたものは generate_ssg で削除される）
     final_list = final_list[:TARGET_COUNT]
+    METRICS.incr("items.output", len(final_list))
     
-    with open('src/data/mangaData.json', 'w', encoding='utf-8') as f:
-        json.dump(final_list, f, ensure_ascii=False, indent=2)
+    save_manga_data(final_list)
+    save_catalog_index(final_list)
     
     generate_sitemap(final_list)
-    generate_ssg(final_list)
+    generate_ssg(final_list, writer=writer, streamed=streamed)
+    compress_artifacts(known=compressed)
+    generate_service_worker(final_list)
+    # 出力まで完了したらジャーナルを閉じる（次回は新規クロール）
+    journal.finish()
     print(f"DONE. Total: {len(final_list)} items in {len(series_groups)} series.")
 
-def generate_ssg(manga_list):
-    print(f"Generating SSG for {len(manga_list)} items...")
-    
-    # テンプレート読み込み
-    with open("index.html", "r", encoding="utf-8") as f:
-        template = f.read()
+def manga_page(m):
+    # 個別巻ページ (manga/[id]) の (出力パス, スロット値)
+    m_id = m["id"]
+    title = m["title"]
+    author = m["author"]
+    cover = m["cover"]
+
+    return os.path.join("public/manga", m_id, "index.html"), {
+        "title": f"{title} - Manga Reach",
+        "description": f"{title}（{author}）のあらすじ、詳細データ、購入リンク。",
+        "og_title": f"{title} - Manga Reach",
+        "og_image": cover,
+        "canonical": f"https://manga-reach.com/manga/{m_id}",
+        "body": prerender_manga(m)
+    }
+
+def ssg_pages(manga_list, skip_manga=()):
+    # 生成する全ページを (出力パス, スロット値) の順に1ページずつ返す（全ページ分の値を同時に持たない）
+    # body はファーストビューの事前描画とそのページのデータ（ssg_template.prerender_*）
+    # skip_manga: 巻ページを書き出し済みの id（クロール中に書いたもの）。シリーズページの巻リストには含める
+    # シリーズページ用: seriesId -> {id: 巻}（catalog_index.series_index と同じく id の重複は先頭を採る）
+    series_volumes = {}
 
-    # 既存のmangaディレクトリをクリーンアップ（必要なら）
-    manga_base_dir = "public/manga"
-    
     # --- 1. 個別巻ページ生成 (manga/[id]) ---
     for m in manga_list:
-        m_id = m["id"]
-        title = m["title"]
-        desc = m["description"]
-        author = m["author"]
-        cover = m["cover"]
-        
-        page_html = template
-        page_html = re.sub(r'<title>.*?</title>', f'<title>{title} - Manga Reach</title>', page_html)
-        descript_text = f"{title}（{author}）のあらすじ、詳細データ、購入リンク。"
-        page_html = re.sub(r'<meta name="description" content=".*?" />', f'<meta name="description" content="{descript_text}" />', page_html)
-        page_html = re.sub(r'<meta property="og:title" content=".*?" />', f'<meta property="og:title" content="{title} - Manga Reach" />', page_html)
-        page_html = re.sub(r'<meta property="og:image" content=".*?" />', f'<meta property="og:image" content="{cover}" />', page_html)
-        page_html = re.sub(r'<link rel="canonical" href=".*?" />', f'<link rel="canonical" href="https://manga-reach.com/manga/{m_id}" />', page_html)
-
-        dir_path = os.path.join(manga_base_dir, m_id)
-        os.makedirs(dir_path, exist_ok=True)
-        with open(os.path.join(dir_path, "index.html"), "w", encoding="utf-8") as f:
-            f.write(page_html)
+        series_volumes.setdefault(m["seriesId"], {}).setdefault(m["id"], m)
+        if m["id"] not in skip_manga:
+            yield manga_page(m)
 
     # --- 2. シリーズ詳細ページ生成 (series/[id]) ---
     series_base_dir = "public/series"
-    # シリーズ単位でまとめる
-    series_map = {}
-    for m in manga_list:
-        sid = m["seriesId"]
-        if sid not in series_map:
-            series_map[sid] = m
-            
-    for sid, s in series_map.items():
+    for sid, vols in series_volumes.items():
+        # メタタグは従来どおり最初に出てきた巻から、事前描画は SeriesDetail と同じ巻数順の先頭巻から
+        s = next(iter(vols.values()))
         title = s["seriesTitle"]
         author = s["author"]
         cover = s["cover"]
+        series = series_summary(sid, sorted(vols.values(), key=lambda v: parse_int(v.get("volumeNumber"))))
         
-        page_html = template
-        page_html = re.sub(r'<title>.*?</title>', f'<title>{title} シリーズ一覧 - Manga Reach</title>', page_html)
-        descript_text = f"{title}（{author}）の全巻リスト。1巻から最新刊までの詳細情報を網羅。"
-        page_html = re.sub(r'<meta name="description" content=".*?" />', f'<meta name="description" content="{descript_text}" />', page_html)
-        page_html = re.sub(r'<meta property="og:title" content=".*?" />', f'<meta property="og:title" content="{title} シリーズ一覧 - Manga Reach" />', page_html)
-        page_html = re.sub(r'<meta property="og:image" content=".*?" />', f'<meta property="og:image" content="{cover}" />', page_html)
-        page_html = re.sub(r'<link rel="canonical" href=".*?" />', f'<link rel="canonical" href="https://manga-reach.com/series/{sid}" />', page_html)
+        yield os.path.join(series_base_dir, sid, "index.html"), {
+            "title": f"{title} シリーズ一覧 - Manga Reach",
+            "description": f"{title}（{author}）の全巻リスト。1巻から最新刊までの詳細情報を網羅。",
+            "og_title": f"{title} シリーズ一覧 - Manga Reach",
+            "og_image": cover,
+            "canonical": f"https://manga-reach.com/series/{sid}",
+            "body": prerender_series(series)
+        }
 
-        dir_path = os.path.join(series_base_dir, sid)
-        os.makedirs(dir_path, exist_ok=True)
-        with open(os.path.join(dir_path, "index.html"), "w", encoding="utf-8") as f:
-            f.write(page_html)
+def write_ssg_chunk(template, pages, manifest, force):
+    # ワーカー側: 担当分のページを描画して書き込み、マニフェスト差分と計測値を返す
+    start, cpu_start = time.perf_counter(), time.process_time()
+    writer = IncrementalWriter(force=force)
+    writer.manifest = manifest
+    count = 0
+    for path, values in pages:
+        writer.write(path, template.render(**values))
+        count += 1
+    return {
+        "pid": os.getpid(), "pages": count, "written": writer.written, "unchanged": writer.unchanged,
+        "seconds": time.perf_counter() - start, "cpu_seconds": time.process_time() - cpu_start,
+        "manifest": writer.manifest
+    }
+
+def open_catalog(bootstrap=True):
+    # カタログDBを開く。空なら既存の書き出し（シャード / mangaData.json）から取り込む
+    catalog = CatalogDB(CATALOG_DB)
+    if bootstrap and catalog.count() == 0:
+        data = load_exported_data()
+        if data:
+            catalog.replace_all(data)
+            print(f"Imported {catalog.count()} items into {CATALOG_DB}.", flush=True)
+    return catalog
+
+@METRICS.phase("save_manga_data")
+def save_manga_data(manga_list):
+    # カタログDBを全件置き換え、mangaData.json（1行1件）とフロント用のシャード分割データを書き出す
+    with open_catalog(bootstrap=False) as catalog:
+        changed, removed = catalog.replace_all(manga_list)
+        catalog.export_json(DATA_FILE)
+    shards = ShardedStore(SHARD_DIR).write_all(manga_list)
+    print(f"Saved {len(manga_list)} items to {CATALOG_DB} ({changed} changed, {removed} removed), "
+          f"{DATA_FILE} and {SHARD_DIR} ({shards} shards updated).", flush=True)
+
+@METRICS.phase("save_catalog_index")
+def save_catalog_index(manga_list):
+    # フロント用の検索・関連作品インデックス（tags / authors / related / series）を書き出す
+    counts = write_indexes(INDEX_DIR, manga_list)
+    # 検索用の Fuse.js インデックス（ブラウザでの索引作成を省く）
+    docs, size = write_search_index(os.path.join(INDEX_DIR, "search.json"), manga_list)
+    print(f"Saved catalog index to {INDEX_DIR} ({counts['tags']} tags, {counts['related']} related lists, "
+          f"search index {docs} docs / {size // 1024} KB).", flush=True)
+
+def load_exported_data():
+    # カタログDBが無いときの取り込み元。シャードがあればそちらから、無ければ mangaData.json から読む
+    store = ShardedStore(SHARD_DIR)
+    if store.exists():
+        return store.read_all()
+    if not os.path.exists(DATA_FILE):
+        return None
+    with open(DATA_FILE, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def load_manga_data():
+    # カタログDBの全件（並び順どおり）。データが何も無ければ None
+    with open_catalog() as catalog:
+        return catalog.all() if catalog.count() else None
+
+def add_manga_data(new_items):
+    # 追加分だけを書き込む（カタログDBは upsert、mangaData.json は末尾に追記、シャードは該当分と index.json のみ更新）
+    with open_catalog() as catalog:
+        catalog.upsert(new_items)
+        append_json_array(DATA_FILE, new_items)
+        store = ShardedStore(SHARD_DIR)
+        if store.exists():
+            store.upsert(new_items)
+        else:
+            # シャードがまだ無ければ（導入直後）カタログ全件から一度だけ作る
+            store.write_all(catalog.all())
+
+@METRICS.phase("generate_ssg")
+def generate_ssg(manga_list, incremental=True, workers=None, writer=None, streamed=()):
+    # writer / streamed: クロール中に巻ページを書いた IncrementalWriter と、その書き出し済みの id（stream_volume_pages）
+    # 書き出し済みの巻ページは描画し直さず、シリーズページと削除・マニフェストの保存だけを行う
+    workers = workers or SSG_WORKERS
+    print(f"Generating SSG for {len(manga_list)} items...")
+    
+    # テンプレートを一度だけ解析（固定部分 + スロット）
+    template = PageTemplate.from_file("index.html")
+
+    # 内容が変わったページだけを書き換える（incremental=False なら全ページ書き直し）
+    writer = writer or IncrementalWriter(SSG_MANIFEST_PATH, force=not incremental)
+    series_ids = {m["seriesId"] for m in manga_list}
+    pages = ssg_pages(manga_list, streamed)
+
+    if workers <= 1:
+        results = [write_ssg_chunk(template, pages, writer.manifest, writer.force)]
+    else:
+        # ページを小分けにしてプロセスプールで並列に描画・書き込み（ワーカー間の負荷を均すため workers の4倍に分割）
+        # チャンクは必要になった分だけ作り、投入済みで未完了のものは workers の2倍までに抑える
+        chunk_size = max(1, -(-(len(manga_list) + len(series_ids)) // (workers * 4)))
+        results = []
+        pending = deque()
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for chunk in iter(lambda: list(islice(pages, chunk_size)), []):
+                if len(pending) >= workers * 2:
+                    results.append(pending.popleft().result())
+                pending.append(executor.submit(write_ssg_chunk, template, chunk,
+                                               {p: writer.manifest[p] for p, _ in chunk if p in writer.manifest}, writer.force))
+            results.extend(f.result() for f in pending)
+
+    # ワーカーごとの集計
+    per_worker = {}
+    for r in results:
+        writer.manifest.update(r["manifest"])
+        writer.written += r["written"]
+        writer.unchanged += r["unchanged"]
+        w = per_worker.setdefault(r["pid"], {"pid": r["pid"], "chunks": 0, "pages": 0, "written": 0, "seconds": 0.0, "cpu_seconds": 0.0})
+        w["chunks"] += 1
+        for k in ("pages", "written", "seconds", "cpu_seconds"):
+            w[k] += r[k]
+    writer.worker_stats = sorted(per_worker.values(), key=lambda w: w["pid"])
+    if workers > 1:
+        for w in writer.worker_stats:
+            print(f"  worker {w['pid']}: {w['pages']} pages ({w['written']} written) in {w['seconds']:.2f}s", flush=True)
 
-    print(f"SSG completed. Generated {len(manga_list)} manga and {len(series_map)} series pages.")
+    # 統合で消えたシリーズのページは統合先への転送ページにする（検索エンジンに登録済みのURLを切らさない）
+    aliases = {old: new for old, new in load_series_aliases().items() if old not in series_ids and new in series_ids}
+    for old, new in aliases.items():
+        writer.write(os.path.join("public/series", old, "index.html"),
+                     redirect_page(f"https://manga-reach.com/series/{new}", f"/series/{new}"))
 
+    # 既に存在しない作品・シリーズのページを削除
+    writer.prune("public/manga", {m["id"] for m in manga_list})
+    writer.prune("public/series", series_ids | set(aliases))
+    writer.save()
+    METRICS.incr("ssg.pages_written", writer.written)
+    METRICS.incr("ssg.pages_unchanged", writer.unchanged)
+    METRICS.incr("ssg.pages_deleted", writer.deleted)
+    METRICS.incr("ssg.worker_cpu_seconds", round(sum(w["cpu_seconds"] for w in writer.worker_stats), 3))
+    print(f"SSG completed. Generated {len(manga_list)} manga and {len(series_ids)} series pages, "
+          f"{len(aliases)} merged-series redirects ({writer.summary()}).")
+    return writer
+
+def report_extra():
+    # レポートに添えるキャッシュの命中状況
+    return {
+        "response_cache": {"mode": RESPONSE_CACHE.mode, "hits": RESPONSE_CACHE.hits, "misses": RESPONSE_CACHE.misses,
+                           "revalidated": RESPONSE_CACHE.revalidated},
+        "commentary_cache": {"hits": COMMENTARY.cache.hits, "misses": COMMENTARY.cache.misses},
+    }
+
+def run_with_report(command, func, report_path=None, profile=False, **kwargs):
+    # 計測つきで実行し、JSON レポート（profile=True なら cProfile の統計も）を REPORT_DIR に書き出す
+    report_path = report_path or os.path.join(REPORT_DIR, f"{command}.json")
+    profile_path = os.path.join(REPORT_DIR, f"{command}.prof") if profile else None
+    with instrumented_run(METRICS, command, report_path, profile_path, extra=report_extra):
+        return func(**kwargs)
+
+@METRICS.phase("generate_sitemap")
 def generate_sitemap(manga_list):
+    # サイトマップインデックス + セクション別の gzip シャード。lastmod は内容が変わったURLだけ更新する
     print(f"Generating sitemap for {len(manga_list)} items...")
-    today = time.strftime("%Y-%m-%d")
-    xml = ['<?xml version="1.0" encoding="UTF-8"?>',
-           '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">']
-    
-    base_url = "https://manga-reach.com"
-    for path, priority in [("/", "1.0"), ("/about", "0.5"), ("/privacy", "0.5")]:
-        xml.append(f'  <url><loc>{base_url}{path}</loc><lastmod>{today}</lastmod><changefreq>daily</changefreq><priority>{priority}</priority></url>')
-    
-    # シリーズページ
-    seen_series = set()
-    for m in manga_list:
-        sid = m["seriesId"]
-        if sid not in seen_series:
-            xml.append(f'  <url><loc>{base_url}/series/{sid}</loc><lastmod>{today}</lastmod><changefreq>daily</changefreq><priority>0.9</priority></url>')
-            seen_series.add(sid)
-            
-    # 個別巻ページ
+    stats = write_sitemaps(manga_list, SITEMAP_INDEX, SITEMAP_DIR, SITEMAP_LASTMOD_DB)
+    METRICS.incr("sitemap.urls", stats["urls"])
+    METRICS.incr("sitemap.urls_changed", stats["urls_changed"])
+    METRICS.incr("sitemap.shards_written", stats["shards_written"])
+    print(f"Sitemap generated: {stats['urls']} URLs in {stats['shards']} shards "
+          f"({stats['shards_written']} rewritten, {stats['urls_changed']} URLs changed).")
+
+@METRICS.phase("compress_artifacts")
+def compress_artifacts(workers=None, known=None):
+    # ビルド後段: データシャードに内容ハッシュ付きのコピーとマニフェストを作り、生成物の圧縮版を隣に置く
+    # （mangaData.json はフロントが読まないカタログDBの書き出しなので、ここでは扱わない）
+    # known: 既に圧縮版を置いたファイル {パス: 内容ハッシュ}（stream_volume_pages）
+    assets = fingerprint(SHARD_DIR, "/", ASSET_MANIFEST)
+    stats = precompress(COMPRESS_TARGETS, COMPRESS_MANIFEST_PATH, workers or SSG_WORKERS, known=known)
+    for k in ("files", "compressed", "unchanged", "removed", "bytes", "gz_bytes", "br_bytes"):
+        METRICS.incr(f"compress.{k}", stats[k])
+    ratio = stats["gz_bytes"] / stats["bytes"] if stats["bytes"] else 1
+    print(f"Compressed artifacts: {stats['compressed']} of {stats['files']} files recompressed "
+          f"({stats['unchanged']} unchanged, {stats['removed']} stale removed), gzip {ratio:.0%} of original; "
+          f"{assets['files']} hashed data files in {ASSET_MANIFEST}.", flush=True)
+    return stats
+
+@METRICS.phase("generate_service_worker")
+def generate_service_worker(manga_list):
+    # 事前キャッシュ: 掲載順で先頭の（人気の）シリーズページ（アプリが実際に開くものだけ。データはバンドルのチャンクを実行時に cache-first で持つ）
+    series_ids = []
     for m in manga_list:
-        xml.append(f'  <url><loc>{base_url}/manga/{m["id"]}</loc><lastmod>{today}</lastmod><changefreq>weekly</changefreq><priority>0.7</priority></url>')
-    
-    xml.append('</urlset>')
-    
-    with open('public/sitemap.xml', 'w', encoding='utf-8') as f:
-        f.write('\n'.join(xml))
-    print("Sitemap generated.")
+        if len(series_ids) >= PRECACHE_SERIES:
+            break
+        if m["seriesId"] not in series_ids:
+            series_ids.append(m["seriesId"])
+    # 末尾の / つきで取得する（ディレクトリへのリダイレクトを挟まない）
+    files = [(f"/series/{sid}/", os.path.join("public/series", sid, "index.html")) for sid in series_ids]
+    stats = write_service_worker(SERVICE_WORKER, precache_entries(files))
+    METRICS.incr("service_worker.precache_entries", stats["entries"])
+    print(f"Service worker: {stats['entries']} precache entries, cache {stats['cache_name']}"
+          f"{'' if stats['changed'] else ' (unchanged)'}.", flush=True)
+    return stats
 
 if __name__ == "__main__":
-    BOOK_GENRES = ["001001001", "001001002", "001001003", "001001004", "001001006", "001001007", "001001008"]
-    generate_manga_data()
+    import argparse
+    parser = argparse.ArgumentParser(description="Rakuten Books から漫画データを取得し、JSON・サイトマップ・SSGページを生成する")
+    parser.add_argument("--status", action="store_true", help="チェックポイントからクロールの進捗を表示して終了")
+    parser.add_argument("--fresh", action="store_true", help="チェックポイントを破棄して最初からクロールする")
+    parser.add_argument("--report", default=None, help=f"実行レポート(JSON)の出力先（既定 {REPORT_DIR}/generate_data.json）")
+    parser.add_argument("--profile", action="store_true", help="cProfile で計測し、統計を実行レポートと同じ場所に保存する")
+    args = parser.parse_args()
+    if args.status:
+        CrawlJournal(JOURNAL_PATH).load().print_status()
+    else:
+        if args.fresh:
+            CrawlJournal(JOURNAL_PATH).reset()
+        run_with_report("generate_data", generate_manga_data, args.report, args.profile)
@@ -0,0 +1,155 @@
+import gzip
+import http.client
+import json
+import random
+import ssl
+import threading
+import time
+import urllib.parse
+from collections import namedtuple
+
+# キープアライブ接続を使い回すHTTPクライアント
+# 同一ホストへの接続をプールし、TCP/TLSハンドシェイクをリクエストごとに繰り返さない
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0",
+    "Accept-Encoding": "gzip",
+    "Connection": "keep-alive",
+}
+
+
+# 再試行するステータス（レート制限と 5xx）。それ以外の 4xx はリクエスト自体の誤りなので即座に失敗させる
+RETRY_STATUSES = (429,)
+
+
+def is_retryable(status):
+    return status in RETRY_STATUSES or status >= 500
+
+
+# status: ステータスコード, headers: 小文字キーのヘッダー辞書, body: 展開済みボディ(bytes)
+Response = namedtuple("Response", ["status", "headers", "body"])
+
+
+class HTTPStatusError(Exception):
+    def __init__(self, status, url):
+        super().__init__(f"HTTP {status}: {url}")
+        self.status = status
+
+
+class HTTPClient:
+    def __init__(self, limiter=None, max_per_host=8, timeout=30, retries=3,
+                 backoff=1.0, max_backoff=30.0, ssl_context=None, metrics=None, limiters=None):
+        self.limiter = limiter
+        # エンドポイントごとのリミッタ {URLパスの前方一致: リミッタ}。どれにも当たらなければ limiter を使う
+        self.limiters = limiters or {}
+        # 計測（run_metrics.RunMetrics）。遅延分布・再試行・受信バイト数などを記録する
+        self.metrics = metrics
+        self.max_per_host = max_per_host
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.ssl_context = ssl_context or ssl.create_default_context()
+        self._pool = {}
+        self._lock = threading.Lock()
+
+    def _new_connection(self, key):
+        scheme, host, port = key
+        if scheme == "https":
+            return http.client.HTTPSConnection(host, port, timeout=self.timeout, context=self.ssl_context)
+        return http.client.HTTPConnection(host, port, timeout=self.timeout)
+
+    def _checkout(self, key):
+        with self._lock:
+            idle = self._pool.get(key)
+            if idle:
+                return idle.pop()
+        return self._new_connection(key)
+
+    def _checkin(self, key, conn):
+        with self._lock:
+            idle = self._pool.setdefault(key, [])
+            if len(idle) < self.max_per_host:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def close(self):
+        with self._lock:
+            pools, self._pool = self._pool, {}
+        for idle in pools.values():
+            for conn in idle:
+                conn.close()
+
+    def limiter_for(self, path):
+        for prefix, limiter in self.limiters.items():
+            if path.startswith(prefix):
+                return limiter
+        return self.limiter
+
+    def _backoff_delay(self, attempt):
+        # 指数バックオフ + ジッター（複数スレッドの再試行が同時に集中しないように）
+        delay = min(self.max_backoff, self.backoff * (2 ** attempt))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def request(self, url, headers=None, ok_statuses=(200,)):
+        # 通信エラー・429・5xx は再試行し、最後まで失敗したら例外を送出する。ok_statuses 以外のその他のステータスは再試行しない
+        parts = urllib.parse.urlsplit(url)
+        key = (parts.scheme, parts.hostname, parts.port or (443 if parts.scheme == "https" else 80))
+        path = parts.path + ("?" + parts.query if parts.query else "")
+        request_headers = dict(DEFAULT_HEADERS, **(headers or {}))
+        limiter = self.limiter_for(parts.path)
+
+        metrics = self.metrics
+        last_error = None
+        for attempt in range(self.retries):
+            if attempt:
+                if metrics:
+                    metrics.incr("http.retries")
+                time.sleep(self._backoff_delay(attempt - 1))
+            if limiter:
+                limiter.acquire()
+            conn = self._checkout(key)
+            # 遅延はレートリミッタの待ち時間を除いた、リクエスト送信からボディ受信までの時間
+            start = time.perf_counter()
+            try:
+                conn.request("GET", path, headers=request_headers)
+                response = conn.getresponse()
+                body = response.read()
+            except (http.client.HTTPException, OSError) as e:
+                # 切断済みのキープアライブ接続などは捨てて再試行
+                conn.close()
+                last_error = e
+                if metrics:
+                    metrics.incr(f"http.errors.{type(e).__name__}")
+                continue
+            if metrics:
+                metrics.incr("http.requests")
+                metrics.incr("http.bytes_received", len(body))
+                metrics.observe("http.latency_ms", (time.perf_counter() - start) * 1000)
+            if response.will_close:
+                conn.close()
+            else:
+                self._checkin(key, conn)
+            if response.status not in ok_statuses:
+                last_error = HTTPStatusError(response.status, url)
+                if metrics:
+                    metrics.incr(f"http.errors.status_{response.status}")
+                if not is_retryable(response.status):
+                    break
+                continue
+            response_headers = {k.lower(): v for k, v in response.getheaders()}
+            if response_headers.get("content-encoding", "").lower() == "gzip":
+                body = gzip.decompress(body)
+            return Response(response.status, response_headers, body)
+        if metrics:
+            metrics.incr("http.failures")
+        raise last_error
+
+    def get(self, url, headers=None):
+        # レスポンスボディ(bytes)を返す。gzip の場合は展開済み
+        return self.request(url, headers).body
+
+    def get_json(self, url, headers=None):
+        # bytes のまま json.loads に渡す（str へのデコードを挟まない）
+        return json.loads(self.get(url, headers))
@@ -0,0 +1,93 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+# 生成物をインクリメンタルに書き出すライター
+# 出力パスごとの内容ハッシュをマニフェストに記録し、内容が変わらないファイルは書き込まない
+# 書き込みは一時ファイル + rename で原子的に行う（途中で落ちても壊れたページが残らない）
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def atomic_write(path, data):
+    dir_path = os.path.dirname(path) or "."
+    os.makedirs(dir_path, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=dir_path, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+class IncrementalWriter:
+    def __init__(self, manifest_path=None, force=False):
+        self.manifest_path = manifest_path
+        # force=True なら内容に関わらず全ファイルを書き直す（フルビルド）
+        self.force = force
+        self.manifest = {}
+        self.written = 0
+        self.unchanged = 0
+        self.deleted = 0
+        # 並列書き込み時のワーカーごとの計測値
+        self.worker_stats = []
+        if manifest_path and os.path.exists(manifest_path):
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                self.manifest = json.load(f)
+
+    def _current_hash(self, path):
+        # マニフェストに無い（CIの新規チェックアウト等）場合はディスク上のファイルと比較する
+        if path in self.manifest and os.path.exists(path):
+            return self.manifest[path]
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                return content_hash(f.read())
+        return None
+
+    def write(self, path, data):
+        # 書き込んだら True、内容が同じでスキップしたら False
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        digest = content_hash(data)
+        if not self.force and self._current_hash(path) == digest:
+            self.manifest[path] = digest
+            self.unchanged += 1
+            return False
+        atomic_write(path, data)
+        self.manifest[path] = digest
+        self.written += 1
+        return True
+
+    def prune(self, base_dir, keep_names):
+        # base_dir 直下のディレクトリのうち keep_names に無いものを削除する（消えた作品のページ）
+        if not os.path.isdir(base_dir):
+            return 0
+        removed = 0
+        for name in os.listdir(base_dir):
+            dir_path = os.path.join(base_dir, name)
+            if name in keep_names or not os.path.isdir(dir_path):
+                continue
+            shutil.rmtree(dir_path)
+            prefix = dir_path + os.sep
+            for path in [p for p in self.manifest if p.startswith(prefix)]:
+                del self.manifest[path]
+            removed += 1
+        self.deleted += removed
+        return removed
+
+    def save(self):
+        if not self.manifest_path:
+            return
+        data = json.dumps(self.manifest, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+        atomic_write(self.manifest_path, data.encode("utf-8"))
+
+    def summary(self):
+        return f"{self.written} written, {self.unchanged} unchanged, {self.deleted} removed"
@@ -0,0 +1,47 @@
+import sys
+
+# クロール結果の1アイテム
+# API の Item（価格・URL・複数サイズの画像など数十項目の dict）から、パイプラインで使う項目だけを取り出して持つ。
+# __slots__ でインスタンスごとの dict を持たず、著者・ジャンルは intern して同じ文字列を共有する。
+# 表紙はサイズ指定のクエリを除いたURL（掲載時に ?_ex=300x420 を付ける）。isbn は取得元をまたいだ重複判定用（無ければ ""）
+
+
+class ItemRecord:
+    __slots__ = ("title", "author", "caption", "genre_id", "image", "isbn")
+
+    def __init__(self, title, author, caption, genre_id, image, isbn=""):
+        self.title = title
+        self.author = author
+        self.caption = caption
+        self.genre_id = genre_id
+        self.image = image
+        self.isbn = isbn
+
+    @classmethod
+    def from_api(cls, item):
+        # 欠けている項目の既定値は従来の v.get(...) と同じ
+        return cls(
+            item.get("title", ""),
+            sys.intern(item.get("author", "不明")),
+            item.get("itemCaption", ""),
+            sys.intern(item.get("booksGenreId", "001001")),
+            item.get("largeImageUrl", "").split("?")[0],
+            item.get("isbn", ""),
+        )
+
+    @classmethod
+    def from_json(cls, data):
+        # ジャーナルの配列形式から復元する。旧形式（API の Item をそのまま記録したもの・isbn の無い5項目）も読める
+        if isinstance(data, dict):
+            return cls.from_api(data)
+        title, author, caption, genre_id, image = data[:5]
+        return cls(title, sys.intern(author), caption, sys.intern(genre_id), image, data[5] if len(data) > 5 else "")
+
+    def to_json(self):
+        return [self.title, self.author, self.caption, self.genre_id, self.image, self.isbn]
+
+    def __eq__(self, other):
+        return isinstance(other, ItemRecord) and self.to_json() == other.to_json()
+
+    def __repr__(self):
+        return f"ItemRecord({self.title!r}, {self.author!r})"
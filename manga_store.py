@@ -0,0 +1,217 @@
+import hashlib
+import json
+import os
+import tempfile
+
+from incremental_writer import atomic_write
+
+# 漫画データのシャード分割ストア
+#   <root>/index.json     件数・シャード一覧・id→シャード対応（順序は全体の並び順）
+#   <root>/<key>.json     seriesId の先頭 PREFIX_LENGTH 文字ごとのシャード（同一シリーズは必ず同じシャード）
+# シャードは1件ずつ直列化して書き出し、全件の文字列をメモリに溜めない。
+# 1件の追加・更新では該当シャードと index.json だけを書き換える。
+
+PREFIX_LENGTH = 2
+INDEX_VERSION = 1
+
+
+def _dumps(item):
+    return json.dumps(item, ensure_ascii=False, separators=(",", ":"))
+
+
+class _StreamingJSONArray:
+    # 一時ファイルに [ 要素, 要素 ... ] を1行1要素で書き、SHA-256を計算しながら最後に rename する
+    def __init__(self, path):
+        self.path = path
+        dir_path = os.path.dirname(path) or "."
+        os.makedirs(dir_path, exist_ok=True)
+        fd, self.tmp = tempfile.mkstemp(dir=dir_path, prefix=".tmp-")
+        self.f = os.fdopen(fd, "w", encoding="utf-8", newline="\n")
+        self.sha = hashlib.sha256()
+        self.count = 0
+        self._write("[")
+
+    def _write(self, s):
+        self.f.write(s)
+        self.sha.update(s.encode("utf-8"))
+
+    def append(self, item):
+        self._write(("\n" if self.count == 0 else ",\n") + _dumps(item))
+        self.count += 1
+
+    def commit(self, previous_sha=None):
+        # 内容が前回と同じならファイルを置き換えない。戻り値: (sha256, 書き換えたか)
+        self._write("\n]\n")
+        self.f.close()
+        digest = self.sha.hexdigest()
+        if digest == previous_sha and os.path.exists(self.path):
+            os.remove(self.tmp)
+            return digest, False
+        os.chmod(self.tmp, 0o644)
+        os.replace(self.tmp, self.path)
+        return digest, True
+
+    def abort(self):
+        self.f.close()
+        if os.path.exists(self.tmp):
+            os.remove(self.tmp)
+
+
+def write_json_array(path, items):
+    # 1行1件のコンパクトなJSON配列としてストリーミングで書き出す（差分が1件1行になる）
+    out = _StreamingJSONArray(path)
+    try:
+        for item in items:
+            out.append(item)
+    except BaseException:
+        out.abort()
+        raise
+    return out.commit()[0]
+
+
+def append_json_array(path, items):
+    # write_json_array で書いた配列の末尾に追記する（ファイル全体を書き直さない）
+    if not os.path.exists(path):
+        return write_json_array(path, items)
+    with open(path, "rb+") as f:
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+        f.seek(max(0, end - 16))
+        tail = f.read()
+        cut = tail.rstrip().rfind(b"]")
+        if cut < 0:
+            raise ValueError(f"{path} is not a JSON array")
+        before = tail[:cut].rstrip()
+        empty = before.endswith(b"[")
+        chunk = "".join(("\n" if empty and i == 0 else ",\n") + _dumps(item) for i, item in enumerate(items))
+        f.seek(end - len(tail) + len(before))
+        f.truncate()
+        f.write(chunk.encode("utf-8") + b"\n]\n")
+
+
+class ShardedStore:
+    def __init__(self, root, prefix_length=PREFIX_LENGTH):
+        self.root = root
+        self.prefix_length = prefix_length
+        self._index = None
+
+    @property
+    def index_path(self):
+        return os.path.join(self.root, "index.json")
+
+    def shard_key(self, item):
+        return item["seriesId"][:self.prefix_length]
+
+    def shard_path(self, key):
+        return os.path.join(self.root, f"{key}.json")
+
+    def exists(self):
+        return os.path.exists(self.index_path)
+
+    # --- 読み込み ---
+    def index(self):
+        if self._index is None:
+            if self.exists():
+                with open(self.index_path, "r", encoding="utf-8") as f:
+                    self._index = json.load(f)
+            else:
+                self._index = {"version": INDEX_VERSION, "count": 0, "prefixLength": self.prefix_length,
+                               "shards": {}, "ids": {}}
+        return self._index
+
+    def ids(self):
+        return self.index()["ids"].keys()
+
+    def read_shard(self, key):
+        path = self.shard_path(key)
+        if not os.path.exists(path):
+            return []
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def get(self, m_id):
+        key = self.index()["ids"].get(m_id)
+        if key is None:
+            return None
+        return next((m for m in self.read_shard(key) if m["id"] == m_id), None)
+
+    def series(self, series_id):
+        return [m for m in self.read_shard(series_id[:self.prefix_length]) if m["seriesId"] == series_id]
+
+    def read_all(self):
+        # index の ids の並び（=生成時の全体順）で返す
+        by_id = {}
+        for key in self.index()["shards"]:
+            for m in self.read_shard(key):
+                by_id[m["id"]] = m
+        return [by_id[m_id] for m_id in self.index()["ids"] if m_id in by_id]
+
+    # --- 書き込み ---
+    def _write_shard(self, key, items):
+        out = _StreamingJSONArray(self.shard_path(key))
+        try:
+            for m in items:
+                out.append(m)
+        except BaseException:
+            out.abort()
+            raise
+        previous = self.index()["shards"].get(key, {}).get("sha256")
+        digest, changed = out.commit(previous)
+        self.index()["shards"][key] = {"count": out.count, "sha256": digest}
+        return changed
+
+    def _save_index(self):
+        index = self.index()
+        index["count"] = len(index["ids"])
+        index["shards"] = dict(sorted(index["shards"].items()))
+        data = json.dumps(index, ensure_ascii=False, separators=(",", ":")) + "\n"
+        atomic_write(self.index_path, data.encode("utf-8"))
+
+    def write_all(self, items):
+        # 全件をシャードへ書き出す。戻り値: 書き換えたシャード数
+        os.makedirs(self.root, exist_ok=True)
+        groups = {}
+        ids = {}
+        for m in items:
+            key = self.shard_key(m)
+            groups.setdefault(key, []).append(m)
+            ids[m["id"]] = key
+        index = self.index()
+        changed = sum(self._write_shard(key, groups[key]) for key in sorted(groups))
+        # 使われなくなったシャードを削除
+        for key in [k for k in index["shards"] if k not in groups]:
+            if os.path.exists(self.shard_path(key)):
+                os.remove(self.shard_path(key))
+            del index["shards"][key]
+            changed += 1
+        index["ids"] = ids
+        self._save_index()
+        return changed
+
+    def upsert(self, items):
+        # 指定アイテムを追加・更新する。該当シャードと index だけを書き換える
+        index = self.index()
+        by_key = {}
+        moved = {}
+        for m in items:
+            key = self.shard_key(m)
+            by_key.setdefault(key, []).append(m)
+            old_key = index["ids"].get(m["id"])
+            if old_key is not None and old_key != key:
+                moved.setdefault(old_key, set()).add(m["id"])
+        # シリーズが変わってシャードを移るアイテムは元のシャードから外す
+        for key, ids in moved.items():
+            self._write_shard(key, [m for m in self.read_shard(key) if m["id"] not in ids])
+        for key, new_items in by_key.items():
+            shard = self.read_shard(key)
+            positions = {m["id"]: i for i, m in enumerate(shard)}
+            for m in new_items:
+                if m["id"] in positions:
+                    shard[positions[m["id"]]] = m
+                else:
+                    positions[m["id"]] = len(shard)
+                    shard.append(m)
+                index["ids"][m["id"]] = key
+            self._write_shard(key, shard)
+        self._save_index()
+        return len(by_key) + len(moved)
@@ -0,0 +1,59 @@
+import queue
+import threading
+import time
+
+# 有界キューでつないだバックグラウンドの処理段
+# 生産側（クロールのコールバック等）は submit で渡すだけで先へ進み、handler は別スレッドで受け取り順に処理する。
+# キューが一杯なら submit は空くまで待つ（背圧）ので、処理が追いつかなくてもメモリは maxsize 件分で頭打ちになる。
+# handler の例外は close() で送出する。例外のあとも生産側が詰まらないよう、残りは読み捨てる
+
+
+class BackgroundStage:
+    def __init__(self, handler, maxsize=64, name="stage"):
+        self.handler = handler
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.error = None
+        self.processed = 0
+        # submit が待たされた回数と合計時間（処理段が律速になっているかの目安）
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.busy_seconds = 0.0
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, item):
+        if self._closed:
+            raise RuntimeError("stage is closed")
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            start = time.perf_counter()
+            self.queue.put(item)
+            self.waits += 1
+            self.wait_seconds += time.perf_counter() - start
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            if self.error is not None:
+                continue
+            start = time.perf_counter()
+            try:
+                self.handler(item)
+                self.processed += 1
+            except BaseException as e:
+                self.error = e
+            self.busy_seconds += time.perf_counter() - start
+
+    def close(self):
+        # 残りを処理し終えるまで待つ。戻り値: 処理した件数
+        if not self._closed:
+            self._closed = True
+            self.queue.put(None)
+            self._thread.join()
+        if self.error is not None:
+            raise self.error
+        return self.processed
@@ -0,0 +1,184 @@
+import gzip
+import hashlib
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+from incremental_writer import atomic_write, content_hash
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# 生成物の事前圧縮と内容ハッシュ付きファイル名のマニフェスト
+# 静的ホストが配信のたびに圧縮しなくて済むよう、各ファイルの隣に .gz（brotli があれば .br も）を置く。
+# 元ファイルの内容ハッシュをマニフェストに記録し、変わっていないファイルは圧縮し直さない。
+# gzip はヘッダの時刻・ファイル名を固定するので、同じ内容からは常に同じバイト列になる
+
+COMPRESSIBLE = (".html", ".json", ".xml", ".txt", ".js", ".css", ".svg")
+# これより小さいファイルは圧縮しても得がない
+MIN_SIZE = 256
+MANIFEST_VERSION = 1
+# name.<ハッシュ10桁>.json
+HASHED_NAME_RE = re.compile(r"\.[0-9a-f]{10}\.[a-z]+$")
+
+
+def gzip_bytes(data):
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def brotli_bytes(data):
+    return brotli.compress(data, quality=11)
+
+
+def encodings():
+    return [(".gz", gzip_bytes)] + ([(".br", brotli_bytes)] if brotli else [])
+
+
+def is_compressible(path):
+    return path.endswith(COMPRESSIBLE)
+
+
+def walk_files(targets):
+    # targets（ファイルまたはディレクトリ）以下の圧縮対象を決まった順に返す
+    for target in targets:
+        if os.path.isfile(target):
+            if is_compressible(target):
+                yield target
+            continue
+        for dirpath, dirnames, names in os.walk(target):
+            dirnames.sort()
+            for name in sorted(names):
+                if is_compressible(name) and not name.startswith(".tmp-"):
+                    yield os.path.join(dirpath, name)
+
+
+def up_to_date(path, data, digest, previous_hash):
+    # 前回と同じ内容で圧縮版も揃っているか
+    # マニフェストに無い場合（CIの新規チェックアウト等）はディスク上の .gz を展開して比べる
+    if not all(os.path.exists(path + ext) for ext, _ in encodings()):
+        return False
+    if previous_hash is not None:
+        return previous_hash == digest
+    try:
+        with open(path + ".gz", "rb") as f:
+            return gzip.decompress(f.read()) == data
+    except OSError:
+        return False
+
+
+def compress_file(path, previous_hash=None):
+    # 戻り値: (内容ハッシュ, 元のサイズ, {拡張子: 圧縮後のサイズ} または None（変更なしでスキップ）)
+    with open(path, "rb") as f:
+        data = f.read()
+    digest = content_hash(data)
+    small = len(data) < MIN_SIZE
+    if (previous_hash == digest) if small else up_to_date(path, data, digest, previous_hash):
+        return digest, len(data), None
+    sizes = {}
+    for ext, compress in encodings():
+        out = None if small else compress(data)
+        if out is not None and len(out) < len(data):
+            atomic_write(path + ext, out)
+            sizes[ext] = len(out)
+        elif os.path.exists(path + ext):
+            # 小さすぎる・圧縮しても小さくならないものは圧縮版を置かない
+            os.remove(path + ext)
+    return digest, len(data), sizes
+
+
+def compress_chunk(jobs):
+    # ワーカー側: [(パス, 前回のハッシュ)] を処理して [(パス, 結果)] を返す
+    return [(path, compress_file(path, previous)) for path, previous in jobs]
+
+
+def remove_stale(manifest, current):
+    # 元ファイルが無くなったものの圧縮版を消す（この処理で作ったものだけ）
+    removed = 0
+    for path in [p for p in manifest if p not in current]:
+        for ext in (".gz", ".br"):
+            if os.path.exists(path + ext):
+                os.remove(path + ext)
+                removed += 1
+        del manifest[path]
+    return removed
+
+
+def precompress(targets, manifest_path, workers=1, chunk_size=256, known=None):
+    # known: このビルド中に compress_file 済みのファイル {パス: 内容ハッシュ}（クロール中に書いた巻ページ等）
+    manifest = {}
+    if manifest_path and os.path.exists(manifest_path):
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    if manifest.get("encodings") != [ext for ext, _ in encodings()]:
+        # brotli の有無が変わったら全件作り直す
+        manifest = {}
+    files = manifest.get("files", {})
+    files.update(known or {})
+    paths = list(walk_files(targets))
+    jobs = [(p, files.get(p)) for p in paths]
+    chunks = [jobs[i:i + chunk_size] for i in range(0, len(jobs), chunk_size)]
+    if workers <= 1 or len(chunks) <= 1:
+        results = [compress_chunk(c) for c in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(compress_chunk, chunks))
+
+    stats = {"files": len(paths), "compressed": 0, "unchanged": 0, "removed": 0, "bytes": 0,
+             "gz_bytes": 0, "br_bytes": 0}
+    for chunk in results:
+        for path, (digest, size, sizes) in chunk:
+            files[path] = digest
+            stats["bytes"] += size
+            if sizes is None:
+                stats["unchanged"] += 1
+                sizes = {ext: os.path.getsize(path + ext) for ext, _ in encodings() if os.path.exists(path + ext)}
+            else:
+                stats["compressed"] += 1
+            stats["gz_bytes"] += sizes.get(".gz", size)
+            stats["br_bytes"] += sizes.get(".br", size) if brotli else 0
+    stats["removed"] = remove_stale(files, set(paths))
+    if manifest_path:
+        data = {"version": MANIFEST_VERSION, "encodings": [ext for ext, _ in encodings()], "files": files}
+        atomic_write(manifest_path, json.dumps(data, ensure_ascii=False, sort_keys=True).encode("utf-8"))
+    return stats
+
+
+def hashed_name(path, data):
+    base, ext = os.path.splitext(path)
+    return f"{base}.{hashlib.sha256(data).hexdigest()[:10]}{ext}"
+
+
+def fingerprint(root, url_prefix, manifest_path, site_root="public"):
+    # root 以下の JSON に内容ハッシュ入りのコピー（name.<hash>.json）を作り、
+    # 論理パス -> ハッシュ付きパスの対応を manifest_path に書く。ハッシュ付きのほうは内容が変わると名前も変わるので
+    # immutable な長期キャッシュで配信できる。参照されなくなった古いコピーは消す
+    files = {}
+    keep = set()
+    for path in walk_files([root]):
+        if not path.endswith(".json") or HASHED_NAME_RE.search(path):
+            continue
+        with open(path, "rb") as f:
+            data = f.read()
+        hashed = hashed_name(path, data)
+        if not os.path.exists(hashed):
+            atomic_write(hashed, data)
+        keep.add(hashed)
+        files[url_prefix + os.path.relpath(path, site_root).replace(os.sep, "/")] = \
+            url_prefix + os.path.relpath(hashed, site_root).replace(os.sep, "/")
+    removed = 0
+    for path in list(walk_files([root])):
+        if HASHED_NAME_RE.search(path) and path not in keep:
+            os.remove(path)
+            removed += 1
+    data = json.dumps({"version": MANIFEST_VERSION, "files": dict(sorted(files.items()))},
+                      ensure_ascii=False, indent=1).encode("utf-8")
+    previous = None
+    if os.path.exists(manifest_path):
+        with open(manifest_path, "rb") as f:
+            previous = f.read()
+    if data != previous:
+        atomic_write(manifest_path, data)
+    return {"files": len(files), "removed": removed}
@@ -1,15 +1,37 @@
+// --- precache manifest: service_worker.py が生成（python generate_data.py / daily_update.py） ---
 const CACHE_NAME = 'manga-reach-v2';
-const urlsToCache = [
-    '/',
-    '/index.html',
-    '/manifest.json'
+const PRECACHE = [
 ];
+// --- end precache manifest ---
+
+// アプリのシェル。ビルドごとに参照するバンドルが変わるので network-first で返し、オフライン時の代わりとして持っておく
+const SHELL = ['/', '/index.html', '/manifest.json'];
+// 内容ハッシュ付きのファイル（Vite の /assets/ と asset-manifest.json が指すデータシャード）は中身が変わらないので、
+// バージョンをまたいで別のキャッシュに置き cache-first で返す
+const IMMUTABLE_CACHE = 'manga-reach-immutable';
+const IMMUTABLE_MAX_ENTRIES = 200;
+
+const normalizePath = (path) => (path.length > 1 && path.endsWith('/') ? path.slice(0, -1) : path);
+const precacheKey = (entry) => `${entry.url}${entry.url.includes('?') ? '&' : '?'}__rev=${entry.revision}`;
+// パス（末尾の / なし）-> リビジョン付きのキャッシュキー
+const precacheKeys = new Map(PRECACHE.map(entry => [normalizePath(entry.url), precacheKey(entry)]));
+
+const isImmutable = (url) => url.origin === self.location.origin &&
+    (url.pathname.startsWith('/assets/') || /\.[0-9a-f]{10}\.json$/.test(url.pathname));
 
 self.addEventListener('install', event => {
     self.skipWaiting();
     event.waitUntil(
-        caches.open(CACHE_NAME)
-            .then(cache => cache.addAll(urlsToCache))
+        caches.open(CACHE_NAME).then(cache => Promise.all([
+            cache.addAll(SHELL),
+            ...PRECACHE.map(async entry => {
+                // 前のバージョンのキャッシュに同じリビジョンがあれば取得し直さない
+                const key = precacheKey(entry);
+                const cached = await caches.match(key);
+                const response = cached || await fetch(new Request(entry.url, { cache: 'reload' })).catch(() => null);
+                if (response && response.ok) await cache.put(key, response);
+            })
+        ]))
     );
 });
 
@@ -18,7 +40,7 @@ self.addEventListener('activate', event => {
         caches.keys().then(cacheNames => {
             return Promise.all(
                 cacheNames.map(cacheName => {
-                    if (cacheName !== CACHE_NAME) {
+                    if (cacheName !== CACHE_NAME && cacheName !== IMMUTABLE_CACHE) {
                         return caches.delete(cacheName);
                     }
                 })
@@ -27,10 +49,45 @@ self.addEventListener('activate', event => {
     );
 });
 
+async function cacheFirst(request) {
+    const cache = await caches.open(IMMUTABLE_CACHE);
+    const cached = await cache.match(request);
+    if (cached) return cached;
+    const response = await fetch(request);
+    if (response.ok) {
+        await cache.put(request, response.clone());
+        // 古いものから消して件数を抑える
+        const keys = await cache.keys();
+        await Promise.all(keys.slice(0, Math.max(0, keys.length - IMMUTABLE_MAX_ENTRIES)).map(key => cache.delete(key)));
+    }
+    return response;
+}
+
+async function networkFirst(request) {
+    try {
+        return await fetch(request);
+    } catch (error) {
+        const cached = await caches.match(request);
+        if (cached) return cached;
+        // オフラインでのページ遷移は SPA のシェルで開く
+        if (request.mode === 'navigate') return caches.match('/index.html');
+        throw error;
+    }
+}
+
 self.addEventListener('fetch', event => {
-    // Network First strategy
-    event.respondWith(
-        fetch(event.request)
-            .catch(() => caches.match(event.request))
-    );
+    const { request } = event;
+    if (request.method !== 'GET') return;
+    const url = new URL(request.url);
+    if (isImmutable(url)) {
+        event.respondWith(cacheFirst(request));
+        return;
+    }
+    // 事前キャッシュしたもの（人気シリーズのページ）はリビジョンが変わるまでキャッシュから返す
+    const key = url.origin === self.location.origin && !url.search && precacheKeys.get(normalizePath(url.pathname));
+    if (key) {
+        event.respondWith(caches.match(key).then(cached => cached || networkFirst(request)));
+        return;
+    }
+    event.respondWith(networkFirst(request));
 });
@@ -0,0 +1,170 @@
+import gzip
+import hashlib
+import json
+import os
+import ssl
+import subprocess
+import tempfile
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# テスト・ベンチマーク用の楽天ブックスAPIスタブサーバー
+# items_for(params) が返すアイテム一覧を hits 件ずつページングして返す
+# routes: エンドポイント（"Kobo/EbookSearch" 等、パスに含まれる部分）ごとの items_for。当たらなければ items_for
+# latency: 応答までの待ち時間（秒）、rate_limit: エンドポイントごとの毎秒のリクエスト上限（超えた分は実APIと同じく 429 を返す）、
+# burst: 上限の判定で許す連続リクエスト数（到着時刻の揺れを吸収する）
+# items_for が StubError を送出すると、そのステータスで応答する（パラメータ誤りの 400 など）
+
+
+class StubError(Exception):
+    def __init__(self, status, error="wrong_parameter"):
+        super().__init__(f"{status} {error}")
+        self.status = status
+        self.error = error
+
+
+def make_item(title, author, genre_id="001001001", caption="", image="https://thumbnail.image.rakuten.co.jp/stub.jpg",
+              sales_date=""):
+    return {"Item": {
+        "title": title, "author": author, "booksGenreId": genre_id,
+        "itemCaption": caption, "largeImageUrl": image, "salesDate": sales_date
+    }}
+
+
+def make_self_signed_context(host="127.0.0.1"):
+    # ベンチマーク用の自己署名証明書を openssl で生成し、(サーバー用, クライアント用) のSSLContextを返す
+    tmp = tempfile.mkdtemp(prefix="rakuten_stub_")
+    cert, key = os.path.join(tmp, "cert.pem"), os.path.join(tmp, "key.pem")
+    subprocess.run([
+        "openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+        "-keyout", key, "-out", cert, "-subj", f"/CN={host}", "-addext", f"subjectAltName=IP:{host}"
+    ], check=True, capture_output=True)
+    server_ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    server_ctx.load_cert_chain(cert, key)
+    client_ctx = ssl.create_default_context(cafile=cert)
+    return server_ctx, client_ctx
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # キープアライブを有効にするため HTTP/1.1 で応答する
+    protocol_version = "HTTP/1.1"
+    # ヘッダーとボディを別々に送るため、Nagle を切らないとキープアライブ時に遅延ACK待ちが発生する
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        stub = self.server.stub
+        parts = urllib.parse.urlparse(self.path)
+        params = {k: v[0] for k, v in urllib.parse.parse_qs(parts.query).items()}
+        endpoint = next((e for e in stub.routes if e in parts.path), None)
+        with stub.lock:
+            stub.requests.append(params)
+            throttled = not stub.admit(endpoint)
+        if stub.latency:
+            time.sleep(stub.latency)
+        if throttled:
+            self._send_error(429, "too_many_requests",
+                             "number of allowed requests has been exceeded for this API. please try again soon.")
+            return
+        try:
+            items = stub.routes[endpoint](params) if endpoint else stub.items_for(params)
+        except StubError as e:
+            self._send_error(e.status, e.error, "")
+            return
+        hits = int(params.get("hits", 30))
+        page = int(params.get("page", 1))
+        page_items = items[(page - 1) * hits:page * hits]
+        body = json.dumps({
+            "count": len(items), "page": page, "hits": len(page_items),
+            "pageCount": (len(items) + hits - 1) // hits,
+            "Items": page_items
+        }, ensure_ascii=False).encode("utf-8")
+        etag = '"%s"' % hashlib.md5(body).hexdigest()
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status, error, description):
+        # 304 などボディを持てないステータスは空で返す
+        body = b"" if status == 304 else json.dumps({"error": error, "error_description": description}).encode("utf-8")
+        self.send_response(status)
+        if body:
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class RakutenStub:
+    def __init__(self, items_for, host="127.0.0.1", port=0, ssl_context=None, latency=0, rate_limit=None, burst=1,
+                 routes=None):
+        self.items_for = items_for
+        self.routes = routes or {}
+        self.requests = []
+        self.lock = threading.Lock()
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.burst = burst
+        self.throttled = 0
+        # エンドポイント -> (トークン数, 最終更新時刻)
+        self._buckets = {}
+        self.server = ThreadingHTTPServer((host, port), _Handler)
+        self.server.daemon_threads = True
+        self.server.stub = self
+        self.scheme = "https" if ssl_context else "http"
+        if ssl_context:
+            self.server.socket = ssl_context.wrap_socket(self.server.socket, server_side=True)
+        self._thread = None
+
+    def admit(self, endpoint=None):
+        # エンドポイントごとの容量 burst のトークンバケット（lock を持った状態で呼ぶ）。上限を超えたリクエストは False
+        if not self.rate_limit:
+            return True
+        now = time.monotonic()
+        tokens, last = self._buckets.get(endpoint, (float(self.burst), now))
+        tokens = min(float(self.burst), tokens + (now - last) * self.rate_limit)
+        admitted = tokens >= 1
+        self._buckets[endpoint] = (tokens - 1 if admitted else tokens, now)
+        if not admitted:
+            self.throttled += 1
+        return admitted
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"{self.scheme}://{host}:{port}/services/api/BooksBook/Search/20170404"
+
+    def url_for(self, endpoint, version="20170404"):
+        host, port = self.server.server_address[:2]
+        return f"{self.scheme}://{host}:{port}/services/api/{endpoint}/{version}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
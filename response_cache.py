@@ -0,0 +1,194 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+# 楽天APIレスポンスのディスクキャッシュ（SQLite）
+# キー: エンドポイント + 正規化したクエリパラメータ（applicationId 等の認証情報は含めない）
+# 値:   zlib 圧縮したレスポンスボディ + ETag/Last-Modified（条件付きリクエスト用）
+
+# モード
+#   readwrite: TTL 内ならキャッシュを返し、期限切れなら条件付きで再検証する（既定）
+#   replay:    ネットワークに出ずキャッシュのみを返す（オフライン開発・再現用）
+#   off:       キャッシュを使わない
+CACHE_MODES = ("readwrite", "replay", "off")
+
+# エンドポイントごとの有効期限（秒）
+DEFAULT_TTLS = {
+    "BooksBook/Search": 24 * 3600,
+}
+DEFAULT_TTL = 24 * 3600
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+# 上限超過時に古い順に読み出す行数
+EVICT_BATCH = 64
+
+# キーに含めないパラメータ
+IGNORED_PARAMS = {"applicationId", "affiliateId", "format"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    endpoint TEXT NOT NULL,
+    params TEXT NOT NULL,
+    body BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    fetched_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at);
+"""
+
+
+class CacheMiss(Exception):
+    pass
+
+
+def normalize_params(params):
+    # 値はすべて文字列化し、キー順を固定する（page=1 と page="1" を同一視）
+    return json.dumps({k: str(v) for k, v in sorted(params.items()) if k not in IGNORED_PARAMS},
+                      ensure_ascii=False, separators=(",", ":"))
+
+
+def cache_key(endpoint, params):
+    return hashlib.sha256(f"{endpoint}?{normalize_params(params)}".encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, path, mode="readwrite", ttls=None, default_ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"unknown cache mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.default_ttl = default_ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self._lock = threading.Lock()
+        self._db = None
+        # 合計サイズ（開いたときに1回だけ集計し、以後は store / _evict で増減させる）
+        self._total = 0
+
+    def _conn(self):
+        # 接続は初回利用時に開く（キャッシュを使わない実行ではファイルを作らない）
+        if self._db is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.executescript(SCHEMA)
+            self._total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        return self._db
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def ttl_for(self, endpoint):
+        return self.ttls.get(endpoint, self.default_ttl)
+
+    def lookup(self, key):
+        with self._lock:
+            row = self._conn().execute(
+                "SELECT body, etag, last_modified, fetched_at, size FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            body, etag, last_modified, fetched_at, size = row
+            try:
+                body = zlib.decompress(body)
+            except zlib.error:
+                # 壊れたエントリは捨てて、無かったものとして扱う
+                self._conn().execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._total -= size
+                return None
+            self._conn().execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        return {"body": body, "etag": etag, "last_modified": last_modified, "fetched_at": fetched_at}
+
+    def store(self, key, endpoint, params, body, etag=None, last_modified=None):
+        blob = zlib.compress(body, 6)
+        now = time.time()
+        with self._lock:
+            db = self._conn()
+            old = db.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, endpoint, normalize_params(params), blob, len(blob), etag, last_modified, now, now)
+            )
+            self._total += len(blob) - (old[0] if old else 0)
+            if self._total > self.max_bytes:
+                self._evict()
+
+    def touch(self, key):
+        # 304 で再検証できた場合は取得時刻だけ更新する
+        now = time.time()
+        with self._lock:
+            self._conn().execute("UPDATE responses SET fetched_at = ?, accessed_at = ? WHERE key = ?", (now, now, key))
+
+    def _evict(self):
+        # 合計サイズが上限を下回るまで、最後にアクセスされた時刻が古い順に削除する（LRU）
+        db = self._conn()
+        while self._total > self.max_bytes:
+            rows = db.execute("SELECT key, size FROM responses ORDER BY accessed_at LIMIT ?", (EVICT_BATCH,)).fetchall()
+            if not rows:
+                self._total = 0
+                return
+            for key, size in rows:
+                db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._total -= size
+                if self._total <= self.max_bytes:
+                    return
+
+    def stats(self):
+        with self._lock:
+            count, size = self._conn().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return {"entries": count, "bytes": size, "hits": self.hits, "misses": self.misses, "revalidated": self.revalidated}
+
+    def fetch_json(self, client, endpoint, params, url):
+        if self.mode == "off":
+            return client.get_json(url)
+
+        key = cache_key(endpoint, params)
+        entry = self.lookup(key)
+        if entry and (self.mode == "replay" or time.time() - entry["fetched_at"] < self.ttl_for(endpoint)):
+            self.hits += 1
+            return json.loads(entry["body"])
+        if self.mode == "replay":
+            self.misses += 1
+            raise CacheMiss(f"{endpoint} {normalize_params(params)}")
+
+        headers = {}
+        if entry and entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry and entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+        try:
+            response = client.request(url, headers, ok_statuses=(200, 304))
+        except Exception:
+            # 期限切れでも手元にあれば通信失敗時はそれを返す
+            if entry:
+                self.hits += 1
+                return json.loads(entry["body"])
+            raise
+        if response.status == 304:
+            if entry:
+                self.touch(key)
+                self.revalidated += 1
+                return json.loads(entry["body"])
+            # 手元に無いのに 304 が返った。条件付きヘッダーを付けずに取り直す
+            response = client.request(url)
+
+        self.misses += 1
+        data = json.loads(response.body)
+        # エラー応答はキャッシュしない
+        if "error" not in data:
+            self.store(key, endpoint, params, response.body,
+                       response.headers.get("etag"), response.headers.get("last-modified"))
+        return data
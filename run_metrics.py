@@ -0,0 +1,147 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
+
+from incremental_writer import atomic_write
+
+# パイプラインの計測
+#   phases      フェーズ別の経過時間・CPU時間（入れ子は "親/子" の名前で記録、同名は呼び出し回数とともに積算）
+#   counters    件数・バイト数などのカウンタ（API呼び出し、再試行、判定の内訳、書き込みページ数など）
+#   histograms  遅延の分布（ミリ秒、累積ではなくバケットごとの件数）
+# 実行ごとに JSON レポートとして書き出し、遅くなった箇所や差分クロールが空振りした理由を後から追えるようにする。
+# CPU時間はプロセス全体（全スレッド）の値。SSG のワーカープロセス分はカウンタ側で別に集計する
+
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class Histogram:
+    def __init__(self, bounds=LATENCY_BUCKETS_MS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        i = 0
+        while i < len(self.bounds) and value > self.bounds[i]:
+            i += 1
+        self.counts[i] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def to_dict(self):
+        buckets = {f"<={b}": n for b, n in zip(self.bounds, self.counts)}
+        buckets["+Inf"] = self.counts[-1]
+        return {"count": self.count, "sum": round(self.total, 3), "max": round(self.max, 3),
+                "mean": round(self.total / self.count, 3) if self.count else 0, "buckets": buckets}
+
+
+class RunMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started_at = datetime.now(timezone.utc)
+            self._start = time.perf_counter()
+            self._cpu_start = time.process_time()
+            self.phases = {}
+            self.counters = {}
+            self.histograms = {}
+
+    def _stack(self):
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    @contextmanager
+    def phase(self, name):
+        stack = self._stack()
+        stack.append(name)
+        path = "/".join(stack)
+        start, cpu_start = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter() - start, time.process_time() - cpu_start
+            stack.pop()
+            with self._lock:
+                p = self.phases.setdefault(path, {"calls": 0, "wall_seconds": 0.0, "cpu_seconds": 0.0})
+                p["calls"] += 1
+                p["wall_seconds"] += wall
+                p["cpu_seconds"] += cpu
+
+    def incr(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def observe(self, name, value, bounds=LATENCY_BUCKETS_MS):
+        with self._lock:
+            h = self.histograms.get(name)
+            if h is None:
+                h = self.histograms[name] = Histogram(bounds)
+            h.observe(value)
+
+    def report(self, **extra):
+        with self._lock:
+            report = {
+                "started_at": self.started_at.isoformat(timespec="seconds"),
+                "finished_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "wall_seconds": round(time.perf_counter() - self._start, 3),
+                "cpu_seconds": round(time.process_time() - self._cpu_start, 3),
+                "phases": {k: {"calls": v["calls"], "wall_seconds": round(v["wall_seconds"], 3),
+                               "cpu_seconds": round(v["cpu_seconds"], 3)} for k, v in self.phases.items()},
+                "counters": dict(sorted(self.counters.items())),
+                "histograms": {k: h.to_dict() for k, h in sorted(self.histograms.items())},
+            }
+        report.update(extra)
+        return report
+
+    def write(self, path, **extra):
+        report = self.report(**extra)
+        atomic_write(path, (json.dumps(report, ensure_ascii=False, indent=2) + "\n").encode("utf-8"))
+        return report
+
+
+@contextmanager
+def profiled(path, top=30):
+    # cProfile で囲み、統計を path に保存して累積時間の上位を表示する（snakeviz 等でも開ける）
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        profiler.dump_stats(path)
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(top)
+        print(out.getvalue(), flush=True)
+        print(f"Profile saved to {path}", flush=True)
+
+
+@contextmanager
+def instrumented_run(metrics, command, report_path, profile_path=None, extra=None):
+    # 1回の実行を計測し、成否にかかわらず終了時にレポートを書き出す
+    # extra: 終了時に呼ばれ、レポートに追加する値（dict）を返す関数
+    metrics.reset()
+    status, error = "ok", None
+    try:
+        with profiled(profile_path) if profile_path else nullcontext():
+            yield metrics
+    except BaseException as e:
+        status, error = "error", repr(e)
+        raise
+    finally:
+        metrics.write(report_path, command=command, status=status, error=error, **(extra() if extra else {}))
+        print(f"Run report saved to {report_path}", flush=True)
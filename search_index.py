@@ -0,0 +1,103 @@
+import json
+import math
+import re
+
+from incremental_writer import atomic_write
+
+# フロント検索用の Fuse.js インデックスをビルド時に作る
+#   search.json = {"docs": [["s", seriesId] | ["m", id], ...], "keys": [...], "norms": [...]}
+# docs は検索対象（シリーズ + レジェンド作品の各巻）の並び。norms はドキュメントごとの
+# {キー番号: フィールド長ノルム | [[配列内の位置, ノルム], ...]} で、fuse.js 7 の FuseIndex と同じ手順で求める
+# （キーの順・ノルムの丸め・配列の積み方まで一致させる）。
+# Fuse.createIndex().toJSON() の形式はレコードに検索対象の文字列をそのまま持つため、mangaData.json と同じ本文を
+# 二重に配信することになる。ここでは文字列を省き、クライアントは手元のデータから
+# {v, n}（配列なら {v, i, n}）のレコードを組み立てて Fuse.parseIndex に渡す（トークン化・ノルム計算はしない）
+
+FUSE_KEYS = ["seriesTitle", "title", "author", "description", "tags"]
+SPACE_RE = re.compile(r'[^ ]+')
+NORM_MANTISSA = 3
+
+
+def fuse_norm(value, weight=1):
+    # fuse.js の norm(): 1 / トークン数^(0.5*weight) を小数3桁に丸める（Math.round と同じく .5 は切り上げ）
+    norm = 1 / math.pow(len(SPACE_RE.findall(value)), 0.5 * weight)
+    m = 10 ** NORM_MANTISSA
+    n = math.floor(norm * m + 0.5) / m
+    return int(n) if n == int(n) else n
+
+
+def _is_blank(value):
+    return not value.strip()
+
+
+def fuse_key(key):
+    return {"path": key.split("."), "id": key, "weight": 1, "src": key, "getFn": None}
+
+
+def fuse_record(doc, doc_index, keys=FUSE_KEYS):
+    record = {"i": doc_index, "$": {}}
+    for key_index, key in enumerate(keys):
+        value = doc.get(key)
+        if value is None:
+            continue
+        if isinstance(value, list):
+            # get() は null を飛ばした配列を返し、FuseIndex はそれをスタックで積むので末尾から並ぶ
+            values = [v for v in value if v is not None]
+            sub_records = []
+            for i in range(len(values) - 1, -1, -1):
+                v = values[i]
+                if isinstance(v, str) and not _is_blank(v):
+                    sub_records.append({"v": v, "i": i, "n": fuse_norm(v)})
+            record["$"][str(key_index)] = sub_records
+        elif isinstance(value, str) and not _is_blank(value):
+            record["$"][str(key_index)] = {"v": value, "n": fuse_norm(value)}
+    return record
+
+
+def search_docs(manga_list):
+    # 検索対象: シリーズ（先頭巻の情報、rating 降順）+ レジェンド作品の各巻（データ順）
+    # 戻り値: [(種別, id, Fuse に渡すオブジェクトのうち検索キー部分)]
+    series = {}
+    for m in manga_list:
+        if m["seriesId"] not in series:
+            series[m["seriesId"]] = m
+    docs = [("s", sid, {"seriesTitle": m.get("seriesTitle"), "author": m.get("author"), "description": m.get("description")})
+            for sid, m in sorted(series.items(), key=lambda x: -(x[1].get("rating") or 0))]
+    docs += [("m", m["id"], m) for m in manga_list if m.get("isLegendary")]
+    return docs
+
+
+def compact_record(record):
+    # レコードから文字列を除いたもの
+    return {k: [[sub["i"], sub["n"]] for sub in v] if isinstance(v, list) else v["n"] for k, v in record["$"].items()}
+
+
+def expand_record(norms, doc, doc_index, keys=FUSE_KEYS):
+    # compact_record の逆（クライアントの組み立てと同じ処理）
+    record = {"i": doc_index, "$": {}}
+    for k, n in norms.items():
+        value = doc[keys[int(k)]]
+        if isinstance(n, list):
+            values = [v for v in value if v is not None]
+            record["$"][k] = [{"v": values[i], "i": i, "n": sub_n} for i, sub_n in n]
+        else:
+            record["$"][k] = {"v": value, "n": n}
+    return record
+
+
+def build_search_index(manga_list, keys=FUSE_KEYS):
+    docs = search_docs(manga_list)
+    return {
+        "docs": [[kind, doc_id] for kind, doc_id, _ in docs],
+        "keys": [fuse_key(k) for k in keys],
+        "norms": [compact_record(fuse_record(doc, i, keys)) for i, (_, _, doc) in enumerate(docs)],
+    }
+
+
+def write_search_index(path, manga_list):
+    # 戻り値: (ドキュメント数, バイト数)
+    data = build_search_index(manga_list)
+    body = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    atomic_write(path, body)
+    return len(data["docs"]), len(body)
+
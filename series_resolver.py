@@ -0,0 +1,227 @@
+import re
+import unicodedata
+from collections import defaultdict
+from difflib import SequenceMatcher
+
+# シリーズの解決と、表記ゆれで分かれたシリーズの統合
+# PrefixTrie: 既知のシリーズ名（正規化済み）の接頭辞木。「名前が入力の接頭辞」「入力が名前の接頭辞」の両方向の一致を
+#   入力の長さ分たどるだけで引く（名前の数に比例した総当たりをしない）
+# merge_series: クロール後のシリーズ単位のまとまりを見直し、新装版・副題つき・空白や全半角・著者名の表記違いで
+#   別の seriesId になったものを1つにまとめる。比べるのはブロッキングキー（正規化した著者 + 正規化名の先頭 n-gram）が
+#   同じシリーズどうしだけなので、全ペアの比較はしない
+
+# 版の違い（同じシリーズとして扱う）
+EDITION_RE = re.compile(r"新装版|完全版|愛蔵版|復刻版|新版|電子版|デジタル版|文庫版|ワイド版|モノクロ版|カラー版|通常版")
+# 副題の区切り（これより後ろを副題とみなす）。空白は区切りにしない（"ONE PIECE" の途中で切らない）
+SUBTITLE_RE = re.compile(r"([～〜~―—:：/「」『』<>＜＞]|\s-\s)")
+# 「」『』 は作品名そのものを囲むことが多い（同じ著者の「短編集『A』」「短編集『B』」は別作品）。
+# 括弧の中を副題とみなすのは、括弧の前に共通の作品名が BRACKET_HEAD_MIN 文字以上あるときだけにする
+BRACKETS = frozenset("「」『』")
+BRACKET_HEAD_MIN = 5
+NON_WORD_RE = re.compile(r"[\W_]+")
+DIGITS_RE = re.compile(r"\d+")
+# ブロッキングキーの n-gram の長さと、副題を除いた頭の部分で統合するときの最小の長さ
+NGRAM = 3
+# 表記の近さで統合するときの最小の長さと類似度
+FUZZY_MIN_LENGTH = 8
+FUZZY_RATIO = 0.9
+# これより大きいブロックは長さ順で後ろの WINDOW 件とだけ比べる
+MAX_BLOCK = 64
+WINDOW = 16
+
+
+class _Node:
+    __slots__ = ("children", "terminal", "best")
+
+    def __init__(self):
+        self.children = {}
+        self.terminal = None  # (順位, 値): ここで終わる名前
+        self.best = None      # (順位, 値): この節以下で最も先に登録した名前
+
+
+class PrefixTrie:
+    # 登録順を順位として持ち、一致したもののうち最も先に登録した値を返す（リストを先頭から調べるのと同じ結果）
+    def __init__(self, names=()):
+        self.root = _Node()
+        self.size = 0
+        for name, value in names:
+            self.insert(name, value)
+
+    def insert(self, name, value):
+        entry = (self.size, value)
+        self.size += 1
+        node = self.root
+        path = [node]
+        for ch in name:
+            node = node.children.setdefault(ch, _Node())
+            path.append(node)
+        if node.terminal is None:
+            node.terminal = entry
+        for n in path:
+            if n.best is None:
+                n.best = entry
+
+    def lookup(self, text):
+        # name が text の接頭辞、または text が name の接頭辞になる名前の値。無ければ None
+        found = None
+        node = self.root
+        for ch in text:
+            if node.terminal is not None and (found is None or node.terminal < found):
+                found = node.terminal
+            node = node.children.get(ch)
+            if node is None:
+                return found[1] if found else None
+        # text を最後までたどれた: この節以下の名前はすべて text で始まる
+        if node.best is not None and (found is None or node.best < found):
+            found = node.best
+        return found[1] if found else None
+
+
+def normalize_text(text):
+    return NON_WORD_RE.sub("", unicodedata.normalize("NFKC", text).lower())
+
+
+def series_key(title):
+    # (正規化名, 副題を除いた頭の部分の正規化名, 正規化名から数字を除いたもの, 正規化名の文字の集合)
+    # 版の表記・空白・記号・全半角・大小文字の違いは落とす
+    text = EDITION_RE.sub(" ", unicodedata.normalize("NFKC", title))
+    tokens = SUBTITLE_RE.split(text)
+    parts = [normalize_text(p) for p in tokens[0::2]]
+    separators = tokens[1::2]
+    key = "".join(p for p in parts if p)
+    i = next((i for i, p in enumerate(parts) if p), None)
+    head = parts[i] if i is not None else ""
+    # 括弧で始まる（頭の部分が括弧の中）か、括弧の前の作品名が短ければ副題を切り出さない
+    if i is not None and (i > 0 and separators[i - 1] in BRACKETS or
+                          i < len(separators) and separators[i] in BRACKETS and len(head) < BRACKET_HEAD_MIN):
+        head = key
+    return key, head, DIGITS_RE.sub("", key), frozenset(key)
+
+
+def author_key(author):
+    # 姓と名の間の空白や全半角の違いを落とす
+    return normalize_text(author)
+
+
+def match_rule(a, b):
+    # a, b: series_key の戻り値。同じシリーズとみなす理由（"same" / "subtitle" / "fuzzy"）か None
+    key_a, head_a, core_a, chars_a = a
+    key_b, head_b, core_b, chars_b = b
+    if not key_a or not key_b:
+        return None
+    if key_a == key_b:
+        return "same"
+    if (head_a != key_a and head_a == key_b or head_b != key_b and head_b == key_a) and len(min(key_a, key_b, key=len)) >= NGRAM:
+        return "subtitle"
+    if min(len(key_a), len(key_b)) >= FUZZY_MIN_LENGTH and core_a != core_b:
+        # 数字だけが違うもの（"作品2" と "作品3"）は別シリーズ
+        # 一致しうる文字数の上限（片方にしか無い文字の種類数だけは必ず一致しない）で足りないものは SequenceMatcher に渡さない
+        common = min(len(key_a) - len(chars_a - chars_b), len(key_b) - len(chars_b - chars_a))
+        if 2 * common >= FUZZY_RATIO * (len(key_a) + len(key_b)) \
+                and SequenceMatcher(None, key_a, key_b, autojunk=False).ratio() >= FUZZY_RATIO:
+            return "fuzzy"
+    return None
+
+
+def blocking_keys(author, key):
+    # 著者 + 正規化名の先頭2つの n-gram（先頭に表記ゆれがあっても2つ目のブロックで出会える）
+    return [(author, i, key[i * NGRAM:(i + 1) * NGRAM]) for i in range(2) if len(key) >= (i + 1) * NGRAM or i == 0]
+
+
+def candidate_pairs(block):
+    # block: [(正規化名, seriesId)]。表記の近さで比べる組を返す
+    # 長さの差だけで類似度が FUZZY_RATIO に届かない組は出さない（長さ順に並べ、届かなくなったら打ち切る）。
+    # MAX_BLOCK より大きいブロックは後ろの WINDOW 件までしか見ない
+    block = sorted(block, key=lambda entry: (len(entry[0]), entry))
+    window = len(block) if len(block) <= MAX_BLOCK else WINDOW
+    for i, (key_a, a) in enumerate(block):
+        for key_b, b in block[i + 1:i + 1 + window]:
+            if 2 * len(key_a) < FUZZY_RATIO * (len(key_a) + len(key_b)):
+                break
+            yield a, b
+
+
+def find(parent, x):
+    while parent[x] != x:
+        parent[x] = parent[parent[x]]
+        x = parent[x]
+    return x
+
+
+def cluster_series(series):
+    # series: {seriesId: (シリーズ名, 著者)} -> ([統合するまとまり [seriesId...]], {seriesId: 統合の理由})
+    keys = {sid: series_key(title) for sid, (title, _) in series.items()}
+    authors = {sid: author_key(author) for sid, (_, author) in series.items()}
+    parent = {sid: sid for sid in series}
+    rules = {}
+
+    def union(a, b, rule):
+        ra, rb = find(parent, a), find(parent, b)
+        if ra != rb:
+            parent[max(ra, rb)] = min(ra, rb)
+            rules.setdefault(a, rule)
+            rules.setdefault(b, rule)
+
+    # 正規化名が同じもの（"same"）と、副題を除いた頭の部分が別のシリーズの正規化名になっているもの（"subtitle"）は索引で引く
+    by_key = {}
+    for sid, (key, _, _, _) in keys.items():
+        if key:
+            first = by_key.setdefault((authors[sid], key), sid)
+            if first != sid:
+                union(first, sid, "same")
+    for sid, (key, head, _, _) in keys.items():
+        if head != key and len(head) >= NGRAM and (authors[sid], head) in by_key:
+            union(by_key[(authors[sid], head)], sid, "subtitle")
+    # 表記の近いもの（"fuzzy"）だけブロッキングキーが同じ組を比べる
+    blocks = defaultdict(list)
+    for sid, (key, _, _, _) in keys.items():
+        if len(key) >= FUZZY_MIN_LENGTH:
+            for block in blocking_keys(authors[sid], key):
+                blocks[block].append((key, sid))
+    for block in blocks.values():
+        for a, b in candidate_pairs(block):
+            if find(parent, a) != find(parent, b):
+                rule = match_rule(keys[a], keys[b])
+                if rule:
+                    union(a, b, rule)
+    clusters = defaultdict(list)
+    for sid in series:
+        clusters[find(parent, sid)].append(sid)
+    return [members for members in clusters.values() if len(members) > 1], rules
+
+
+def merge_series(series_groups):
+    # series_groups: {seriesId: [巻]}（generate_data.group_series の出力）を統合してその場で書き換える
+    # 統合先はまとまりの中で巻数の最も多いシリーズ（同数なら重要作品、seriesId の順）。統合された巻は seriesId・seriesTitle を付け替える
+    # 戻り値: 統合の記録 [{"into", "title", "author", "merged": [{"seriesId", "seriesTitle", "author", "volumes", "rule", "items"}]}]
+    series = {sid: (vols[0]["seriesTitle"], vols[0]["author"]) for sid, vols in series_groups.items() if vols}
+    clusters, rules = cluster_series(series)
+    merges = []
+    for members in clusters:
+        members.sort(key=lambda sid: (-len(series_groups[sid]), not series_groups[sid][0]["isLegendary"], sid))
+        into, others = members[0], members[1:]
+        title, author = series[into]
+        merged = []
+        for sid in others:
+            old_title = series[sid][0]
+            rule = rules[sid]
+            for m in series_groups[sid]:
+                m["seriesId"] = into
+                m["seriesTitle"] = title
+                m["tags"] = list(dict.fromkeys(title if t == old_title else t for t in m["tags"]))
+            merged.append({"seriesId": sid, "seriesTitle": old_title, "author": series[sid][1],
+                           "volumes": len(series_groups[sid]), "rule": rule,
+                           "items": [m["id"] for m in series_groups[sid]]})
+            series_groups[into].extend(series_groups.pop(sid))
+        merges.append({"into": into, "title": title, "author": author, "merged": merged})
+    merges.sort(key=lambda m: m["into"])
+    return merges
+
+
+def resolve_series(title, author, known):
+    # 既知のシリーズ known [(seriesId, シリーズ名, 著者)]（同じ著者の掲載済みシリーズ等）から同じシリーズを探す。無ければ None
+    key, a = series_key(title), author_key(author)
+    for sid, known_title, known_author in known:
+        if author_key(known_author) == a and match_rule(key, series_key(known_title)):
+            return sid
+    return None
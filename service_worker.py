@@ -0,0 +1,44 @@
+import hashlib
+import json
+import os
+import re
+
+from incremental_writer import atomic_write
+
+# Service Worker（public/sw.js）の事前キャッシュマニフェストをビルドの出力から生成する
+# sw.js のマーカーで囲まれた部分（CACHE_NAME と PRECACHE）だけを書き換え、それ以外の処理は手書きのまま。
+# revision は各ファイルの内容ハッシュ、CACHE_NAME はマニフェスト全体のハッシュから作るので、
+# 出力の内容が変わったときだけ sw.js が変わり、ブラウザが新しい Service Worker を入れる
+
+BLOCK_RE = re.compile(r"(// --- precache manifest[^\n]*\n).*?(// --- end precache manifest ---)", re.S)
+CACHE_PREFIX = "manga-reach"
+
+
+def file_revision(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()[:10]
+
+
+def precache_entries(files):
+    # files: [(URL, ディスク上のパス)] -> [{"url", "revision"}]（存在しないファイルは除く）
+    return [{"url": url, "revision": file_revision(path)} for url, path in files if os.path.isfile(path)]
+
+
+def render_manifest(entries, prefix=CACHE_PREFIX):
+    digest = hashlib.sha256(json.dumps(entries, sort_keys=True).encode("utf-8")).hexdigest()[:10]
+    cache_name = f"{prefix}-{digest}"
+    lines = "".join(f"    {json.dumps(e, ensure_ascii=False)},\n" for e in entries)
+    return cache_name, f"const CACHE_NAME = '{cache_name}';\nconst PRECACHE = [\n{lines}];\n"
+
+
+def write_service_worker(path, entries, prefix=CACHE_PREFIX):
+    # 戻り値: {"cache_name", "entries", "changed"}
+    with open(path, "r", encoding="utf-8") as f:
+        source = f.read()
+    if not BLOCK_RE.search(source):
+        raise ValueError(f"precache manifest block not found in {path}")
+    cache_name, block = render_manifest(entries, prefix)
+    updated = BLOCK_RE.sub(lambda m: m.group(1) + block + m.group(2), source, count=1)
+    if updated != source:
+        atomic_write(path, updated.encode("utf-8"))
+    return {"cache_name": cache_name, "entries": len(entries), "changed": updated != source}
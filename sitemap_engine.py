@@ -0,0 +1,239 @@
+import filecmp
+import gzip
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import time
+import urllib.parse
+from xml.sax.saxutils import escape
+
+from incremental_writer import atomic_write
+
+# ストリーミング型のサイトマップ生成エンジン
+#   public/sitemap.xml               サイトマップインデックス（robots.txt から参照）
+#   public/sitemaps/<section>-N.xml.gz  セクション（pages / series / manga / tag）ごとの gzip シャード
+# URL ごとの内容ハッシュを LastmodStore に記録し、内容が変わったURLだけ lastmod を当日に更新する。
+# URL は1件ずつシャードへ書き出すので、件数が増えてもXMLをメモリに溜めない
+# （シリーズ・タグのハッシュはメンバー全体から決まるため、グループ数ぶんのハッシュだけを保持する）
+
+BASE_URL = "https://manga-reach.com"
+# プロトコル上限（1ファイル 50,000 URL / 非圧縮 50MB）
+MAX_URLS = 50000
+MAX_BYTES = 50 * 1024 * 1024
+
+STATIC_PAGES = [("/", "daily", "1.0"), ("/about", "monthly", "0.5"), ("/privacy", "monthly", "0.5")]
+
+URLSET_HEAD = '<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+URLSET_TAIL = '</urlset>\n'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS urls (
+    loc TEXT PRIMARY KEY,
+    hash TEXT NOT NULL,
+    lastmod TEXT NOT NULL,
+    run INTEGER NOT NULL
+);
+"""
+
+
+# 巻ページに表示される項目（lastmod はこれらが変わったときだけ動かす）
+PAGE_FIELDS = ("title", "seriesId", "seriesTitle", "volumeNumber", "isSpecial", "description", "commentary", "author",
+               "rating", "cover", "genreId", "isLegendary")
+
+
+def _digest(value):
+    return hashlib.sha256(json.dumps(value, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def page_digest(m):
+    # 表示項目だけを取り出し、タグは並び順に依らないよう整列してからハッシュする
+    page = {k: m.get(k) for k in PAGE_FIELDS}
+    page["tags"] = sorted(t for t in m.get("tags") or [] if isinstance(t, str))
+    return _digest(page)
+
+
+class LastmodStore:
+    # loc -> (内容ハッシュ, lastmod)。ハッシュが前回と同じなら前回の日付を返す
+    def __init__(self, path, today=None):
+        self.path = path
+        self.today = today or time.strftime("%Y-%m-%d")
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(SCHEMA)
+        self.run = (self.conn.execute("SELECT MAX(run) FROM urls").fetchone()[0] or 0) + 1
+        self.changed = 0
+
+    def lastmod(self, loc, digest):
+        row = self.conn.execute("SELECT hash, lastmod FROM urls WHERE loc = ?", (loc,)).fetchone()
+        if row is not None and row[0] == digest:
+            self.conn.execute("UPDATE urls SET run = ? WHERE loc = ?", (self.run, loc))
+            return row[1]
+        self.conn.execute("INSERT OR REPLACE INTO urls (loc, hash, lastmod, run) VALUES (?, ?, ?, ?)",
+                          (loc, digest, self.today, self.run))
+        self.changed += 1
+        return self.today
+
+    def prune(self):
+        # 今回出力しなかったURL（消えた作品・タグ）を忘れる
+        removed = self.conn.execute("DELETE FROM urls WHERE run != ?", (self.run,)).rowcount
+        self.conn.commit()
+        return removed
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+
+class _ShardWriter:
+    # 1セクション分のシャード列。上限に達したら次のファイルへ切り替える
+    def __init__(self, out_dir, section, max_urls=MAX_URLS, max_bytes=MAX_BYTES):
+        self.out_dir = out_dir
+        self.section = section
+        self.max_urls = max_urls
+        self.max_bytes = max_bytes
+        self.shards = []   # [(ファイル名, lastmod, 書き換えたか)]
+        self.urls = 0
+        self._file = None
+
+    def _open(self):
+        os.makedirs(self.out_dir, exist_ok=True)
+        fd, self._tmp = tempfile.mkstemp(dir=self.out_dir, prefix=".tmp-")
+        self._raw = os.fdopen(fd, "wb")
+        # mtime=0 で圧縮結果を内容だけで決まるようにする（同じ内容なら同じバイト列）
+        self._file = gzip.GzipFile(filename="", mode="wb", fileobj=self._raw, mtime=0)
+        self._count = 0
+        self._bytes = 0
+        self._lastmod = ""
+        self._pending = []
+        self._write(URLSET_HEAD)
+
+    def _write(self, s):
+        # 圧縮器への受け渡しはある程度まとめて行う（1行ごとに compress を呼ばない）
+        data = s.encode("utf-8")
+        self._pending.append(data)
+        self._bytes += len(data)
+        if len(self._pending) >= 512:
+            self._flush()
+
+    def _flush(self):
+        self._file.write(b"".join(self._pending))
+        self._pending = []
+
+    def add(self, loc, lastmod, changefreq, priority):
+        line = (f'  <url><loc>{escape(loc)}</loc><lastmod>{lastmod}</lastmod>'
+                f'<changefreq>{changefreq}</changefreq><priority>{priority}</priority></url>\n')
+        if self._file is not None and (self._count >= self.max_urls or
+                                       self._bytes + len(line.encode("utf-8")) + len(URLSET_TAIL) > self.max_bytes):
+            self._close()
+        if self._file is None:
+            self._open()
+        self._write(line)
+        self._count += 1
+        self.urls += 1
+        self._lastmod = max(self._lastmod, lastmod)
+
+    def _close(self):
+        self._write(URLSET_TAIL)
+        self._flush()
+        self._file.close()
+        self._raw.close()
+        self._file = None
+        name = f"{self.section}-{len(self.shards) + 1}.xml.gz"
+        path = os.path.join(self.out_dir, name)
+        if os.path.exists(path) and filecmp.cmp(self._tmp, path, shallow=False):
+            os.remove(self._tmp)
+            self.shards.append((name, self._lastmod, False))
+        else:
+            os.chmod(self._tmp, 0o644)
+            os.replace(self._tmp, path)
+            self.shards.append((name, self._lastmod, True))
+
+    def finish(self):
+        if self._file is not None:
+            self._close()
+        return self.shards
+
+
+class SitemapEngine:
+    def __init__(self, index_path, shard_dir, store, base_url=BASE_URL, max_urls=MAX_URLS, max_bytes=MAX_BYTES):
+        self.index_path = index_path
+        self.shard_dir = shard_dir
+        self.store = store
+        self.base_url = base_url
+        self.max_urls = max_urls
+        self.max_bytes = max_bytes
+
+    def _shard_url(self, name):
+        rel = os.path.relpath(os.path.join(self.shard_dir, name), os.path.dirname(self.index_path) or ".")
+        return f"{self.base_url}/{rel.replace(os.sep, '/')}"
+
+    def generate(self, manga_list):
+        # manga_list は1回だけ走査する（ジェネレータでもよい）。戻り値: 統計
+        writers = {s: _ShardWriter(self.shard_dir, s, self.max_urls, self.max_bytes)
+                   for s in ("pages", "series", "manga", "tag")}
+
+        for path, changefreq, priority in STATIC_PAGES:
+            loc = f"{self.base_url}{path}"
+            writers["pages"].add(loc, self.store.lastmod(loc, _digest(path)), changefreq, priority)
+
+        series = {}   # seriesId -> ハッシュ（登場順）
+        tags = {}     # 小文字化したタグ -> (表記, ハッシュ)
+        for m in manga_list:
+            m_digest = page_digest(m)
+            loc = f"{self.base_url}/manga/{m['id']}"
+            writers["manga"].add(loc, self.store.lastmod(loc, m_digest), "weekly", "0.7")
+            series.setdefault(m["seriesId"], hashlib.sha256()).update(m_digest.encode())
+            for tag in m.get("tags") or []:
+                if not tag:
+                    continue
+                tags.setdefault(tag.lower(), (tag, hashlib.sha256()))[1].update(m_digest.encode())
+
+        for sid, h in series.items():
+            loc = f"{self.base_url}/series/{sid}"
+            writers["series"].add(loc, self.store.lastmod(loc, h.hexdigest()), "daily", "0.9")
+        for key in sorted(tags):
+            tag, h = tags[key]
+            loc = f"{self.base_url}/tag/{urllib.parse.quote(tag)}"
+            writers["tag"].add(loc, self.store.lastmod(loc, h.hexdigest()), "weekly", "0.6")
+
+        shards = []
+        for writer in writers.values():
+            shards.extend(writer.finish())
+        removed = self._remove_stale({name for name, _, _ in shards})
+        pruned = self.store.prune()
+        self._write_index(shards)
+        return {
+            "urls": sum(w.urls for w in writers.values()),
+            "shards": len(shards),
+            "shards_written": sum(1 for _, _, written in shards if written),
+            "shards_removed": removed,
+            "urls_changed": self.store.changed,
+            "urls_pruned": pruned,
+        }
+
+    def _remove_stale(self, keep):
+        removed = 0
+        for name in os.listdir(self.shard_dir):
+            if name.endswith(".xml.gz") and name not in keep:
+                os.remove(os.path.join(self.shard_dir, name))
+                removed += 1
+        return removed
+
+    def _write_index(self, shards):
+        lines = ['<?xml version="1.0" encoding="UTF-8"?>',
+                 '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">']
+        for name, lastmod, _ in shards:
+            lines.append(f'  <sitemap><loc>{escape(self._shard_url(name))}</loc><lastmod>{lastmod}</lastmod></sitemap>')
+        lines.append('</sitemapindex>')
+        atomic_write(self.index_path, ("\n".join(lines) + "\n").encode("utf-8"))
+
+
+def write_sitemaps(manga_list, index_path, shard_dir, store_path, today=None, **kwargs):
+    store = LastmodStore(store_path, today)
+    try:
+        return SitemapEngine(index_path, shard_dir, store, **kwargs).generate(manga_list)
+    finally:
+        store.close()
@@ -0,0 +1,108 @@
+import re
+from collections import Counter
+
+# 取得元（楽天の各検索API）の差分を吸収する層
+# BooksBook/Search・BooksEbook/Search・Kobo/EbookSearch はパラメータ名（booksGenreId / koboGenreId）や
+# Item の項目が少しずつ違うので、各取得元の Item を BooksBook と同じ形
+# （title / author / itemCaption / booksGenreId / largeImageUrl / isbn）にそろえてから判定・ItemRecord 化する。
+# 取得元をまたいだ重複は DedupIndex で除く
+
+# Kobo の「漫画（コミック）」ジャンル。この配下は楽天ブックスの漫画（001001）として扱う
+KOBO_COMIC_GENRE = "101904"
+BOOKS_COMIC_GENRE = "001001"
+ISBN_CHARS_RE = re.compile(r"[^0-9X]")
+# 各APIのリファレンスにある sort の値。Kobo には売上順（sales）が無い
+BOOKS_SORTS = ("standard", "sales", "+releaseDate", "-releaseDate", "+itemPrice", "-itemPrice", "reviewCount", "reviewAverage")
+KOBO_SORTS = ("standard", "+releaseDate", "-releaseDate", "+itemPrice", "-itemPrice", "reviewCount", "reviewAverage")
+
+
+def isbn13(value):
+    # ISBN-10 / ISBN-13（ハイフン・空白入りも可）を ISBN-13 の数字列に。ISBN として読めなければ ""
+    digits = ISBN_CHARS_RE.sub("", str(value or "").upper())
+    if len(digits) == 10 and digits[:9].isdigit():
+        body = "978" + digits[:9]
+        check = (10 - sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(body)) % 10) % 10
+        return body + str(check)
+    if len(digits) == 13 and digits.isdigit() and digits.startswith(("978", "979")):
+        return digits
+    return ""
+
+
+def books_item(item):
+    # BooksBook / BooksEbook: 形はそのまま、ISBN だけ正規化する
+    return dict(item, isbn=isbn13(item.get("isbn")))
+
+
+def kobo_genre(genre_id):
+    # 漫画配下のジャンルは 001001 に読み替える（それ以外は is_manga のジャンル判定で除外される）
+    genre_id = str(genre_id or "")
+    return BOOKS_COMIC_GENRE if genre_id.startswith(KOBO_COMIC_GENRE) else "kobo" + genre_id
+
+
+def kobo_item(item):
+    # Kobo: ジャンルは koboGenreId、表紙は大きいサイズが無いものがある。ISBN は無いことが多い
+    return {
+        "title": item.get("title", ""), "author": item.get("author", "不明"), "itemCaption": item.get("itemCaption", ""),
+        "booksGenreId": kobo_genre(item.get("koboGenreId")),
+        "largeImageUrl": item.get("largeImageUrl") or item.get("mediumImageUrl") or item.get("smallImageUrl") or "",
+        "isbn": isbn13(item.get("isbn")), "salesDate": item.get("salesDate", "")
+    }
+
+
+class Source:
+    # endpoint: レスポンスキャッシュ・計測のキー, genre_param: ジャンル指定のパラメータ名,
+    # root_genre: ジャンル指定が無いとき（キーワード検索）に絞り込むジャンル, normalize: Item の正規化,
+    # extra: 取得元ごとの追加パラメータ, sorts: その API が受け付ける sort の値,
+    # crawl_sorts: ジャンル巡回で使うソート順（並びの違う列として別々にページングする）
+    def __init__(self, name, endpoint, genre_param, root_genre, normalize, extra=None, sorts=BOOKS_SORTS,
+                 crawl_sorts=("reviewCount", "sales", "standard")):
+        self.name = name
+        self.endpoint = endpoint
+        self.genre_param = genre_param
+        self.root_genre = root_genre
+        self.normalize = normalize
+        self.extra = extra or {}
+        self.sorts = sorts
+        self.crawl_sorts = crawl_sorts
+
+    def params(self, app_id, genre_id=None, keyword=None, sort_method="reviewCount", page=1, hits=30):
+        if sort_method not in self.sorts:
+            raise ValueError(f"{self.endpoint} does not support sort={sort_method}")
+        params = {"format": "json", "applicationId": app_id, "hits": hits, "page": page, "sort": sort_method}
+        params.update(self.extra)
+        params[self.genre_param] = genre_id or self.root_genre
+        if keyword: params["title"] = keyword
+        return params
+
+    def normalize_page(self, data):
+        # レスポンス全体の Items を正規化する（count・pageCount 等はそのまま）
+        if not data.get("Items"):
+            return data
+        return dict(data, Items=[{"Item": self.normalize(it.get("Item", {}))} for it in data["Items"]])
+
+
+class DedupIndex:
+    # 取得元をまたいだ重複判定
+    # ISBN があれば ISBN のハッシュ索引で引き（表記の違うタイトル・著者でも同じ本）、無ければ id（正規化タイトル+著者の MD5）で判定する。
+    # 同じ本には最初に登録された id を使うので、優先したい取得元から順に登録する。
+    # ISBN で寄せた id も覚えておき、あとから同じ id で ISBN の無いもの（Kobo 等）が来ても同じ本とみなす
+    def __init__(self):
+        self.by_isbn = {}
+        self.by_id = {}
+        self.duplicates = Counter()
+
+    def resolve(self, m_id, isbn=""):
+        # 戻り値: (採用する id, 新規か)
+        known = self.by_isbn.get(isbn) if isbn else None
+        kind = "isbn"
+        if known is None:
+            known, kind = self.by_id.get(m_id), "id"
+        if known is None:
+            known = m_id
+        else:
+            self.duplicates[kind] += 1
+        new = m_id not in self.by_id and known == m_id
+        self.by_id.setdefault(m_id, known)
+        if isbn:
+            self.by_isbn.setdefault(isbn, known)
+        return known, new
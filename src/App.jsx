@@ -6,15 +6,155 @@ import { motion, AnimatePresence } from 'framer-motion';
 import { PrivacyPolicy, About } from './components/LegalPages';
 import featuresData from './data/features.json';
 
-// Dynamic data loading to handle large JSON size
+// 漫画データはシャード分割して public/data/manga に置いてある（manga_store.py）
+//   index.json  件数・シャード一覧・id -> シャードキー
+//   <key>.json  seriesId の先頭 prefixLength 文字ごとのアイテム
+// 詳細ページは必要なシャードだけを取得し、一覧・検索・タグページのときだけ全シャードを取得する
+// 実際には asset-manifest.json（precompress.fingerprint）が指す内容ハッシュ付きのファイルを取得する（immutable でキャッシュできる）
+const DATA_ROOT = '/data/manga';
 let mangaDataCache = [];
+// id -> アイテム（同じ id が複数あれば先頭）
+let mangaById = new Map();
+const shardRequests = {};
+// ビルド時に事前計算したインデックス（catalog_index.py）。初回描画には含めず、使う画面・操作になってから個別に読み込む
+const INDEX_LOADERS = {
+  tags: () => import('./data/index/tags.json'),
+  related: () => import('./data/index/related.json'),
+  search: () => import('./data/index/search.json')
+};
+const catalogIndex = {};
+const indexRequests = {};
+function loadIndex(name) {
+  if (!indexRequests[name]) {
+    indexRequests[name] = INDEX_LOADERS[name]().then(mod => { catalogIndex[name] = mod.default; });
+  }
+  return indexRequests[name];
+}
+
+// enabled になったらインデックス name を読み込み、読み込み済みかを返す
+function useCatalogIndex(name, enabled = true) {
+  const [ready, setReady] = useState(() => name in catalogIndex);
+  useEffect(() => {
+    if (!enabled || ready) return;
+    let active = true;
+    loadIndex(name).then(() => { if (active) setReady(true); });
+    return () => { active = false; };
+  }, [name, enabled, ready]);
+  return ready;
+}
+
+const fetchJSON = (url) => fetch(url).then(res => {
+  if (!res.ok) throw new Error(`${url}: ${res.status}`);
+  return res.json();
+});
+
+// 取得に失敗したリクエストは覚えておかず、次の呼び出しで取得し直す
+function cachedRequest(cache, key, request) {
+  if (!cache[key]) {
+    cache[key] = request().catch(err => {
+      delete cache[key];
+      throw err;
+    });
+  }
+  return cache[key];
+}
+
+// 論理パス -> 内容ハッシュ付きのパス。マニフェストが無い（開発サーバー等）ときは論理パスのまま取得する
+function loadAssetManifest() {
+  return cachedRequest(shardRequests, 'asset-manifest', () => fetchJSON('/asset-manifest.json').then(m => m.files, () => ({})));
+}
+
+async function fetchAsset(path) {
+  const files = await loadAssetManifest();
+  return fetchJSON(files[path] || path);
+}
+
+function loadShardIndex() {
+  return cachedRequest(shardRequests, 'index.json', () => fetchAsset(`${DATA_ROOT}/index.json`));
+}
+
+function loadShard(key) {
+  return cachedRequest(shardRequests, `${key}.json`, () => fetchAsset(`${DATA_ROOT}/${key}.json`).then(items => {
+    items.forEach(m => {
+      if (!mangaById.has(m.id.toString())) mangaById.set(m.id.toString(), m);
+    });
+    return items;
+  }));
+}
+
+// ids のアイテムを含むシャードだけを読み込む（カタログに無い id は無視する）
+async function loadManga(ids) {
+  const index = await loadShardIndex();
+  const keys = new Set(ids.map(id => index.ids[id]).filter(Boolean));
+  await Promise.all([...keys].map(loadShard));
+}
+
+// シリーズの巻（重複除去・巻数順。catalog_index.series_index と同じ並び）。シリーズのシャード1つだけを読み込む
+async function loadSeries(seriesId) {
+  const index = await loadShardIndex();
+  const key = seriesId.slice(0, index.prefixLength);
+  if (!(key in index.shards)) return [];
+  const seen = new Set();
+  return (await loadShard(key))
+    .filter(m => m.seriesId === seriesId && !seen.has(m.id) && seen.add(m.id))
+    .sort((a, b) => (parseInt(a.volumeNumber) || 0) - (parseInt(b.volumeNumber) || 0));
+}
+
 async function loadMangaData() {
   if (mangaDataCache.length > 0) return mangaDataCache;
-  const data = await import('./data/mangaData.json');
-  mangaDataCache = data.default;
+  const index = await loadShardIndex();
+  await Promise.all(Object.keys(index.shards).map(loadShard));
+  // index.ids の並びが全体の並び順（id は12桁の16進なので、整数キーとして並び替わることはない）
+  mangaDataCache = Object.keys(index.ids).map(id => mangaById.get(id)).filter(Boolean);
   return mangaDataCache;
 }
 
+// load() の完了を待ち、key が変わったら読み込み直す。取得に失敗しても完了扱いにし、見つからない表示に進める
+function useLoaded(load, key, enabled = true) {
+  const [loadedKey, setLoadedKey] = useState(null);
+  useEffect(() => {
+    if (!enabled) return;
+    let active = true;
+    const done = () => { if (active) setLoadedKey(key); };
+    load().then(done, done);
+    return () => { active = false; };
+  }, [key, enabled]);
+  return enabled && loadedKey === key;
+}
+
+// SSG で詳細ページに埋め込んだそのページのデータ（ssg_template.py）。全件データの読み込みを待たずに描画する
+const ssgPage = (() => {
+  const el = document.getElementById('ssg-data');
+  if (!el) return {};
+  try {
+    return JSON.parse(el.textContent);
+  } catch {
+    return {};
+  }
+})();
+
+const lookupManga = (ids) => (ids || []).map(id => mangaById.get(id)).filter(Boolean);
+
+// ビルド時に計算したフィールド長ノルム（search_index.py）から Fuse のインデックスレコードを組み立てる
+// 文字列は手元のデータを参照するだけで、トークン化・ノルム計算はしない
+const buildSearchIndex = (items, { keys, norms }) => Fuse.parseIndex({
+  keys,
+  records: norms.map((fields, i) => {
+    const $ = {};
+    Object.keys(fields).forEach(k => {
+      const value = items[i][keys[k].id];
+      const n = fields[k];
+      if (Array.isArray(n)) {
+        const values = value.filter(v => v !== undefined && v !== null);
+        $[k] = n.map(([j, norm]) => ({ v: values[j], i: j, n: norm }));
+      } else {
+        $[k] = { v: value, n };
+      }
+    });
+    return { i, $ };
+  })
+});
+
 const RAKUTEN_AFFILIATE_ID = "5025407c.d8994699.5025407d.e9a413e7";
 const AMAZON_ASSOCIATE_ID = "mangaanimeosu-22";
 const SITE_URL = "https://manga-reach.com";
@@ -203,31 +343,22 @@ const VolumeCard = ({ manga, index }) => (
 );
 
 // シリーズ詳細ページ (Plan A - 刷新版)
-const SeriesDetail = ({ dataLoaded }) => {
+const SeriesDetail = () => {
   const { seriesId } = useParams();
   const navigate = useNavigate();
+  const [loaded, setLoaded] = useState(null);
+  useEffect(() => {
+    let active = true;
+    const done = (volumes) => { if (active) setLoaded({ seriesId, volumes }); };
+    loadSeries(seriesId).then(done, () => done([]));
+    return () => { active = false; };
+  }, [seriesId]);
+  const ready = loaded?.seriesId === seriesId;
 
   const series = useMemo(() => {
-    if (!dataLoaded) return null;
-    const volumesRaw = mangaDataCache.filter(m => m.seriesId === seriesId);
-    if (volumesRaw.length === 0) return null;
-
-    // 重複排除 (念のため ID でユニーク化)
-    const uniqueVolumes = [];
-    const seenIds = new Set();
-    volumesRaw.forEach(v => {
-      if (!seenIds.has(v.id)) {
-        uniqueVolumes.push(v);
-        seenIds.add(v.id);
-      }
-    });
-
-    // ソート
-    uniqueVolumes.sort((a, b) => {
-      const aNum = parseInt(a.volumeNumber) || 0;
-      const bNum = parseInt(b.volumeNumber) || 0;
-      return aNum - bNum;
-    });
+    if (!ready) return ssgPage.series?.seriesId === seriesId ? ssgPage.series : null;
+    const uniqueVolumes = loaded.volumes;
+    if (uniqueVolumes.length === 0) return null;
 
     return {
       seriesId,
@@ -237,7 +368,7 @@ const SeriesDetail = ({ dataLoaded }) => {
       description: uniqueVolumes[0].description,
       volumes: uniqueVolumes
     };
-  }, [seriesId, dataLoaded]);
+  }, [seriesId, ready, loaded]);
 
   useEffect(() => {
     if (series) {
@@ -246,8 +377,7 @@ const SeriesDetail = ({ dataLoaded }) => {
     }
   }, [series]);
 
-  if (!dataLoaded) return <div className="loader-container"><div className="loader"></div></div>;
-  if (!series) return <NotFound />;
+  if (!series) return ready ? <NotFound /> : <div className="loader-container"><div className="loader"></div></div>;
 
   return (
     <div className="container pt-layout">
@@ -284,39 +414,36 @@ const SeriesDetail = ({ dataLoaded }) => {
 };
 
 // タグ専用ページコンポーネント
-const TagPage = ({ dataLoaded }) => {
+const TagPage = ({ dataLoaded, requestData }) => {
   const { tagName } = useParams();
   const [displayCount, setDisplayCount] = useState(24);
+  useEffect(() => { requestData(); }, [requestData]);
+  const indexLoaded = useCatalogIndex('tags');
+  const ready = dataLoaded && indexLoaded;
 
   const filteredSeries = useMemo(() => {
-    if (!dataLoaded) return [];
-    const groups = {};
-    mangaDataCache.forEach(m => {
-      // タグが含まれているか、またはシリーズタイトルにキーワードが含まれているか
-      const matchesTag = m.tags?.some(tag => tag.toLowerCase() === tagName.toLowerCase());
-      if (matchesTag) {
-        if (!groups[m.seriesId]) {
-          groups[m.seriesId] = {
-            seriesId: m.seriesId,
-            seriesTitle: m.seriesTitle,
-            author: m.author,
-            cover: m.cover,
-            rating: m.rating,
-            volumes: []
-          };
-        }
-        groups[m.seriesId].volumes.push(m);
-      }
-    });
-    return Object.values(groups).sort((a, b) => b.rating - a.rating);
-  }, [tagName, dataLoaded]);
+    if (!ready) return [];
+    // タグ -> [[seriesId, [巻id...]], ...]（rating 降順でビルド時に並べ済み）
+    return (catalogIndex.tags[tagName.toLowerCase()] || []).map(([seriesId, ids]) => {
+      const volumes = lookupManga(ids);
+      const m = volumes[0];
+      return m && {
+        seriesId,
+        seriesTitle: m.seriesTitle,
+        author: m.author,
+        cover: m.cover,
+        rating: m.rating,
+        volumes
+      };
+    }).filter(Boolean);
+  }, [tagName, ready]);
 
   useEffect(() => {
     document.title = `#${tagName} の作品一覧 - Manga Reach`;
     window.scrollTo(0, 0);
   }, [tagName]);
 
-  if (!dataLoaded) return <div className="loader-container"><div className="loader"></div></div>;
+  if (!ready) return <div className="loader-container"><div className="loader"></div></div>;
 
   return (
     <div className="container pt-layout">
@@ -348,34 +475,26 @@ const TagPage = ({ dataLoaded }) => {
     </div>
   );
 };
-const MangaDetail = ({ dataLoaded, toggleFavorite, isFavorite, addToHistory, adGroup }) => {
+const MangaDetail = ({ toggleFavorite, isFavorite, addToHistory, adGroup }) => {
   const { id } = useParams();
   const navigate = useNavigate();
-  const manga = useMemo(() => mangaDataCache.find(m => m.id.toString() === id), [id, dataLoaded]);
+  // この巻のシャードだけを読み込む
+  const itemLoaded = useLoaded(() => loadManga([id]), id);
+  const manga = useMemo(() => mangaById.get(id) || (ssgPage.manga?.id === id ? ssgPage.manga : undefined), [id, itemLoaded]);
 
   useEffect(() => {
     if (id) addToHistory(id);
   }, [id, addToHistory]);
 
+  const relatedLoaded = useCatalogIndex('related', Boolean(manga));
+  // 関連作品の入っているシャードも読み込む
+  const relatedItemsLoaded = useLoaded(() => loadManga(catalogIndex.related[manga.id] || []), manga?.id,
+    Boolean(manga) && relatedLoaded);
   const relatedManga = useMemo(() => {
-    if (!manga) return [];
-    return mangaDataCache
-      .filter(m => m.id !== manga.id)
-      .map(m => {
-        let score = 0;
-        // 著者が同じなら大幅加点
-        if (m.author === manga.author) score += 10;
-        // 共通タグ1つにつき加点
-        const commonTags = m.tags?.filter(t => manga.tags?.includes(t)) || [];
-        score += commonTags.length * 3;
-        // レーティングも加味 (人気順)
-        score += (m.rating || 0) * 0.5;
-        return { item: m, score };
-      })
-      .sort((a, b) => b.score - a.score)
-      .slice(0, 6)
-      .map(entry => entry.item);
-  }, [manga]);
+    if (!manga || !relatedItemsLoaded) return [];
+    // 著者一致 +10・共通タグ1つにつき +3・レーティング ×0.5 の上位6件（ビルド時に計算済み）
+    return lookupManga(catalogIndex.related[manga.id]);
+  }, [manga, relatedItemsLoaded]);
 
   useEffect(() => {
     if (manga) {
@@ -460,7 +579,7 @@ const MangaDetail = ({ dataLoaded, toggleFavorite, isFavorite, addToHistory, adG
     }
   };
 
-  if (!dataLoaded) return (
+  if (!itemLoaded && !manga) return (
     <div className="container" style={{ textAlign: 'center', padding: '10rem 2rem' }}>
       <div className="loader"></div>
       <p style={{ marginTop: '1rem' }}>作品情報を読み込み中...</p>
@@ -476,7 +595,8 @@ const MangaDetail = ({ dataLoaded, toggleFavorite, isFavorite, addToHistory, adG
 
   return (
     <motion.div
-      initial={{ opacity: 0 }}
+      // 事前描画で既に見えている内容はフェードインし直さない
+      initial={manga === ssgPage.manga ? false : { opacity: 0 }}
       animate={{ opacity: 1 }}
       className="container detail-container"
     >
@@ -633,8 +753,9 @@ const FeaturesSection = () => (
 );
 
 // ホーム（一覧ページ）
-const HomePage = ({ query, setQuery, results, loadMore, hasMore, favorites, history, adGroup, selectedGenre, setSelectedGenre }) => {
+const HomePage = ({ query, setQuery, onSearchIntent, requestData, results, loadMore, hasMore, favorites, history, adGroup, selectedGenre, setSelectedGenre }) => {
   const observer = useRef();
+  useEffect(() => { requestData(); }, [requestData]);
   const lastElementRef = useCallback(node => {
     if (observer.current) observer.current.disconnect();
     observer.current = new IntersectionObserver(entries => {
@@ -661,6 +782,7 @@ const HomePage = ({ query, setQuery, results, loadMore, hasMore, favorites, hist
             type="text" className="search-bar"
             placeholder="作品名、著者名、キーワードで検索..."
             value={query} onChange={(e) => setQuery(e.target.value)}
+            onKeyDown={onSearchIntent} onPointerDown={onSearchIntent}
             autoFocus
           />
         </div>
@@ -678,7 +800,7 @@ const HomePage = ({ query, setQuery, results, loadMore, hasMore, favorites, hist
                 </div>
                 <div className="manga-grid mini">
                   {favorites.map(fid => {
-                    const m = mangaDataCache.find(md => md.id.toString() === fid);
+                    const m = mangaById.get(fid);
                     return m ? <MangaCard key={m.id} manga={m} /> : null;
                   })}
                 </div>
@@ -693,7 +815,7 @@ const HomePage = ({ query, setQuery, results, loadMore, hasMore, favorites, hist
                 </div>
                 <div className="manga-grid mini">
                   {history.map(hid => {
-                    const m = mangaDataCache.find(md => md.id.toString() === hid);
+                    const m = mangaById.get(hid);
                     return m ? <MangaCard key={m.id} manga={m} /> : null;
                   })}
                 </div>
@@ -796,10 +918,20 @@ function App() {
   const [query, setQuery] = useState('');
   const [selectedGenre, setSelectedGenre] = useState('all');
   const [results, setResults] = useState([]);
+  // 検索インデックスは検索しようとしたとき（検索欄のキー入力・タップ、トレンドキーワード）に読み込む
+  // （検索欄は autoFocus なので、フォーカスだけでは読み込まない）
+  const [searchRequested, setSearchRequested] = useState(false);
+  const onSearchIntent = useCallback(() => setSearchRequested(true), []);
+  const searchLoaded = useCatalogIndex('search', searchRequested || Boolean(query));
+
+  // 全件データはホーム・タグページを開いたときに読み込む（詳細ページはシャード単位で読むので待たない）
+  const [dataRequested, setDataRequested] = useState(false);
+  const requestData = useCallback(() => setDataRequested(true), []);
 
   useEffect(() => {
+    if (!dataRequested) return;
     loadMangaData().then(() => setDataLoaded(true));
-  }, []);
+  }, [dataRequested]);
 
   // データをシリーズ単位で集計
   const seriesData = useMemo(() => {
@@ -823,18 +955,16 @@ function App() {
   }, [dataLoaded]);
 
   const fuse = useMemo(() => {
-    if (!dataLoaded) return null;
-    // 検索対象にシリーズと個別巻の両方を含める
-    const searchItems = [
-      ...seriesData,
-      ...mangaDataCache.filter(m => m.isLegendary) // 伝説級は巻数直接検索にも対応
-    ];
+    if (!dataLoaded || !searchLoaded) return null;
+    // 検索対象はシリーズと伝説級の個別巻（巻数直接検索用）。並びと索引はビルド時に作成済み（search_index.py）
+    const seriesById = new Map(seriesData.map(s => [s.seriesId, s]));
+    const searchItems = catalogIndex.search.docs.map(([kind, id]) => (kind === 's' ? seriesById.get(id) : mangaById.get(id)));
     return new Fuse(searchItems, {
       keys: ['seriesTitle', 'title', 'author', 'description', 'tags'],
       threshold: 0.35,
       distance: 100,
-    });
-  }, [dataLoaded, seriesData]);
+    }, buildSearchIndex(searchItems, catalogIndex.search));
+  }, [dataLoaded, searchLoaded, seriesData]);
 
   // 無限スクロールとユーザーデータのステート
   const [displayCount, setDisplayCount] = useState(24);
@@ -890,8 +1020,9 @@ function App() {
       }
     }
 
-    // 2. 検索クエリ（Fuse.js）
+    // 2. 検索クエリ（Fuse.js）。検索インデックスの読み込み中は表示を変えない
     if (query) {
+      if (!fuse) return;
       filtered = fuse.search(query).map(r => r.item);
     }
 
@@ -923,6 +1054,8 @@ function App() {
             <HomePage
               query={query}
               setQuery={setQuery}
+              onSearchIntent={onSearchIntent}
+              requestData={requestData}
               results={results}
               loadMore={loadMore}
               hasMore={hasMore}
@@ -933,17 +1066,16 @@ function App() {
               setSelectedGenre={setSelectedGenre}
             />
           } />
-          <Route path="/series/:seriesId" element={<SeriesDetail dataLoaded={dataLoaded} />} />
+          <Route path="/series/:seriesId" element={<SeriesDetail />} />
           <Route path="/manga/:id" element={
             <MangaDetail
-              dataLoaded={dataLoaded}
               toggleFavorite={toggleFavorite}
               isFavorite={(id) => favorites.includes(id)}
               addToHistory={addToHistory}
               adGroup={adGroup}
             />
           } />
-          <Route path="/tag/:tagName" element={<TagPage dataLoaded={dataLoaded} />} />
+          <Route path="/tag/:tagName" element={<TagPage dataLoaded={dataLoaded} requestData={requestData} />} />
           <Route path="/about" element={<div className="container pt-layout"><button onClick={() => window.history.back()} className="back-btn"><ArrowLeft size={16} />戻る</button><About /></div>} />
           <Route path="/privacy" element={<div className="container pt-layout"><button onClick={() => window.history.back()} className="back-btn"><ArrowLeft size={16} />戻る</button><PrivacyPolicy /></div>} />
           <Route path="*" element={<NotFound />} />
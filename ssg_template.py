@@ -0,0 +1,134 @@
+import html
+import json
+import re
+
+# SSG用のコンパイル済みテンプレート
+# index.html を一度だけ解析して「固定部分」と「差し替えスロット」の列に分解し、
+# ページごとの描画はスロット値をエスケープして join するだけにする
+
+# スロット名 -> (テンプレート内の該当タグ, 差し替え後のタグ)
+SLOT_TAGS = {
+    "title": (r'<title>[^<]*</title>', '<title>{}</title>'),
+    "description": (r'<meta\s+name="description"\s+content="[^"]*"\s*/>', '<meta name="description" content="{}" />'),
+    "og_title": (r'<meta\s+property="og:title"\s+content="[^"]*"\s*/>', '<meta property="og:title" content="{}" />'),
+    "og_image": (r'<meta\s+property="og:image"\s+content="[^"]*"\s*/>', '<meta property="og:image" content="{}" />'),
+    "canonical": (r'<link\s+rel="canonical"\s+href="[^"]*"\s*/>', '<link rel="canonical" href="{}" />'),
+    "body": (r'<div id="root"></div>', '<div id="root">{}</div>'),
+}
+# エスケープせずに埋め込むスロット（値は下の prerender_* で組み立てたHTML。省略時は空）
+RAW_SLOTS = {"body"}
+
+
+def escape_attr(value):
+    # 属性値・テキストの両方で安全な形（& < > " ' をエスケープ）
+    return html.escape(str(value), quote=True)
+
+
+class PageTemplate:
+    def __init__(self, source, slots=SLOT_TAGS):
+        # (位置, スロット名, 元の長さ) を出現順に並べて分割する
+        found = []
+        for name, (pattern, _) in slots.items():
+            m = re.search(pattern, source)
+            if m is None:
+                raise ValueError(f"slot '{name}' not found in template")
+            found.append((m.start(), m.end(), name))
+        found.sort()
+
+        self.statics = []
+        self.slot_names = []
+        self.formats = {name: fmt for name, (_, fmt) in slots.items()}
+        pos = 0
+        for start, end, name in found:
+            self.statics.append(source[pos:start])
+            self.slot_names.append(name)
+            pos = end
+        self.statics.append(source[pos:])
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(f.read())
+
+    def render(self, **values):
+        parts = [self.statics[0]]
+        for name, static in zip(self.slot_names, self.statics[1:]):
+            value = values.get(name, "") if name in RAW_SLOTS else escape_attr(values[name])
+            parts.append(self.formats[name].format(value))
+            parts.append(static)
+        return "".join(parts)
+
+
+# --- 詳細ページの事前描画 ---
+# JS の読み込み前に見える部分（表紙・タイトル・著者・あらすじ、シリーズは巻リスト）を #root に入れ、
+# そのページのデータを <script id="ssg-data" type="application/json"> で埋め込む。
+# クラス名は App.jsx の MangaDetail / SeriesDetail と同じ。React は起動時に埋め込みデータで同じページを描き直す
+
+# 表紙は ?_ex=300x420 で取得している
+COVER_WIDTH, COVER_HEIGHT = 300, 420
+
+
+def inline_json(data):
+    # </script> や <!-- で script 要素が閉じないよう < をエスケープする（JSON.parse の結果は同じ）
+    text = json.dumps(data, ensure_ascii=False, separators=(",", ":")).replace("<", "\\u003c")
+    return f'<script id="ssg-data" type="application/json">{text}</script>'
+
+
+def cover_img(src, alt, cls=None, lazy=False):
+    attrs = f' class="{cls}"' if cls else ""
+    attrs += ' loading="lazy"' if lazy else ' fetchpriority="high"'
+    return (f'<img src="{escape_attr(src)}" alt="{escape_attr(alt)}"{attrs} '
+            f'width="{COVER_WIDTH}" height="{COVER_HEIGHT}" />')
+
+
+def prerender_manga(m):
+    e = escape_attr
+    return "".join([
+        '<div class="container detail-container"><div class="detail-layout">',
+        '<div class="detail-sidebar"><div class="detail-cover-wrapper">',
+        cover_img(m["cover"], m["title"], "detail-cover"),
+        '</div></div><div class="detail-main">',
+        f'<h1 class="detail-title">{e(m["title"])}</h1><p class="detail-author">{e(m["author"])}</p>',
+        f'<div class="detail-description"><h3>あらすじ</h3><p>{e(m["description"])}</p></div>',
+        '</div></div></div>',
+        inline_json({"manga": m}),
+    ])
+
+
+def series_summary(sid, volumes):
+    # SeriesDetail が使う形（volumes は巻数順。巻は VolumeCard に必要な項目だけ）
+    first = volumes[0]
+    return {
+        "seriesId": sid, "seriesTitle": first["seriesTitle"], "author": first["author"],
+        "cover": first["cover"], "description": first["description"],
+        "volumes": [{k: v[k] for k in ("id", "seriesTitle", "volumeNumber", "cover")} for v in volumes],
+    }
+
+
+def prerender_series(series):
+    e = escape_attr
+    title = series["seriesTitle"]
+    parts = [
+        '<div class="container pt-layout"><div class="series-header-hero">',
+        f'<div class="hero-poster">{cover_img(series["cover"], title)}</div><div class="hero-text">',
+        f'<h1 class="series-main-title">{e(title)}</h1><p class="series-author-name">著者: {e(series["author"])}</p>',
+        f'<div class="series-meta">全{len(series["volumes"])}巻 配信中</div>',
+        f'<div class="series-desc-box"><p>{e(series["description"])}</p></div>',
+        '</div></div><section class="volume-grid-section"><div class="section-header">',
+        '<h2 class="section-title">全巻リスト</h2></div><div class="volume-grid">',
+    ]
+    for v in series["volumes"]:
+        alt = f'{v["seriesTitle"]} 第{v["volumeNumber"]}巻'
+        parts.append(f'<div class="volume-card"><a href="/manga/{e(v["id"])}" class="volume-link">'
+                     f'<div class="volume-cover-wrapper">{cover_img(v["cover"], alt, lazy=True)}</div></a></div>')
+    parts.append('</div></section></div>')
+    parts.append(inline_json({"series": series}))
+    return "".join(parts)
+
+
+def redirect_page(canonical, path):
+    # 移動したページ（統合で消えたシリーズ等）。canonical と即時リフレッシュで新しいURLへ送る
+    e = escape_attr
+    return ('<!DOCTYPE html>\n<html lang="ja">\n<head>\n<meta charset="UTF-8" />\n<title>Manga Reach</title>\n'
+            f'<link rel="canonical" href="{e(canonical)}" />\n<meta http-equiv="refresh" content="0; url={e(path)}" />\n'
+            f'</head>\n<body><a href="{e(path)}">{e(canonical)}</a></body>\n</html>\n')
@@ -0,0 +1,43 @@
+import json
+
+from catalog_db import CatalogDB
+from test_ssg import sample_manga
+
+
+def test_replace_all_and_queries(tmp_path):
+    manga = sample_manga(20)
+    manga[3]["tags"] = ["作者", "漫画", "SF"]
+    with CatalogDB(str(tmp_path / "catalog.sqlite3")) as db:
+        assert db.replace_all(manga) == (20, 0)
+        assert db.all() == manga
+        assert db.has_id("m00000000004") and not db.has_id("missing")
+        assert db.has_title("テスト作品0 1")
+        assert [m["id"] for m in db.by_tag("sf")] == ["m00000000003"]
+        # 並び替え・削除: 内容が同じアイテムは書き換えない
+        assert db.replace_all(manga[10:] + manga[:5]) == (0, 5)
+        assert [m["id"] for m in db.iter_all()] == [m["id"] for m in manga[10:] + manga[:5]]
+
+
+def test_upsert_keeps_order_and_skips_unchanged(tmp_path):
+    manga = sample_manga(10)
+    path = str(tmp_path / "catalog.sqlite3")
+    with CatalogDB(path) as db:
+        db.replace_all(manga)
+    new = dict(manga[0], id="new000000000", title="新しい巻", volumeNumber="0")
+    changed = dict(manga[2], description="更新")
+    with CatalogDB(path) as db:
+        assert db.upsert([manga[1], changed, new]) == (1, 1)
+        ids = [m["id"] for m in db.all()]
+        assert ids == [m["id"] for m in manga] + ["new000000000"]
+        assert db.get(manga[2]["id"])["description"] == "更新"
+        # 巻数順（volumeNumber "0" が先頭）
+        assert [m["id"] for m in db.series(manga[0]["seriesId"])][:2] == ["new000000000", manga[0]["id"]]
+
+
+def test_export_json(tmp_path):
+    manga = sample_manga(7)
+    with CatalogDB(":memory:") as db:
+        db.replace_all(manga)
+        db.export_json(str(tmp_path / "mangaData.json"))
+    with open(tmp_path / "mangaData.json", encoding="utf-8") as f:
+        assert json.load(f) == manga
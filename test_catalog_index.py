@@ -0,0 +1,69 @@
+import json
+import random
+
+from benchmarks.dataset import synthetic_manga_list
+from catalog_index import build_indexes, parse_int, related_ids, write_indexes
+
+
+def brute_force_related(manga_list, manga):
+    # App.jsx の MangaDetail と同じ総当たり
+    scored = []
+    for m in manga_list:
+        if m["id"] == manga["id"]:
+            continue
+        score = 0
+        if m.get("author") == manga.get("author"): score += 10
+        score += len([t for t in (m.get("tags") or []) if t in (manga.get("tags") or [])]) * 3
+        score += (m.get("rating") or 0) * 0.5
+        scored.append((score, m))
+    return [m["id"] for _, m in sorted(scored, key=lambda x: -x[0])[:6]]
+
+
+def mixed_manga(n, seed=0):
+    # 同点・重複タグ・タグ無し・rating 無しを混ぜる
+    rng = random.Random(seed)
+    manga = synthetic_manga_list(n, seed)
+    for m in manga:
+        r = rng.random()
+        if r < 0.05:
+            m["tags"] = []
+        elif r < 0.1:
+            m["tags"] = m["tags"] + ["漫画", "人気"]
+        elif r < 0.3:
+            m["tags"].append("人気")
+        if rng.random() < 0.05:
+            del m["rating"]
+        else:
+            m["rating"] = rng.choice([4.5, 4.6, 5.0, 5])
+    return manga
+
+
+def test_related_matches_brute_force():
+    manga = mixed_manga(400)
+    related = related_ids(manga)
+    for m in manga:
+        assert related[m["id"]] == brute_force_related(manga, m), m["id"]
+
+
+def test_tag_and_series_indexes():
+    manga = mixed_manga(200, seed=1)
+    indexes = build_indexes(manga)
+    # TagPage: タグ一致アイテムをシリーズごとにまとめ、先頭巻の rating 降順（同点はデータ順）
+    groups = {}
+    for m in manga:
+        if any(t.lower() == "漫画" for t in m["tags"]):
+            groups.setdefault(m["seriesId"], (m.get("rating") or 0, []))[1].append(m["id"])
+    expected = [[sid, ids] for sid, (_, ids) in sorted(groups.items(), key=lambda x: -x[1][0])]
+    assert indexes["tags"]["漫画"] == expected
+    sid = manga[0]["seriesId"]
+    volumes = [m for m in manga if m["seriesId"] == sid]
+    assert indexes["series"][sid] == [m["id"] for m in sorted(volumes, key=lambda m: int(m["volumeNumber"]))]
+    assert parse_int(" 12巻") == 12 and parse_int("上") == 0
+
+
+def test_write_indexes(tmp_path):
+    manga = synthetic_manga_list(50)
+    counts = write_indexes(str(tmp_path), manga)
+    for name in ("tags", "authors", "related", "series"):
+        with open(tmp_path / f"{name}.json", encoding="utf-8") as f:
+            assert len(json.load(f)) == counts[name]
@@ -0,0 +1,75 @@
+import json
+import os
+import subprocess
+import sys
+
+from commentary_engine import CommentaryCache, CommentaryEngine, stable_rating
+
+HIGHLIGHTS = {
+    "キングダム": {"50": "朱海平原の戦い。"},
+    "ONE PIECE": {"100": "鬼ヶ島の決戦。"},
+}
+
+
+def test_commentary_is_stable_per_id():
+    engine = CommentaryEngine(HIGHLIGHTS)
+    a = engine.generate("abc123", "テスト 3", "作者", False, "主人公が魔法学園で成長する")
+    assert a == CommentaryEngine(HIGHLIGHTS).generate("abc123", "テスト 3", "作者", False, "主人公が魔法学園で成長する")
+    texts = {engine.generate(f"id{i}", "テスト 3", "作者", False) for i in range(30)}
+    # id ごとにパターンの組み合わせが変わる
+    assert len(texts) > 1
+    assert "魔法学園" in a and "第3巻" in a
+    assert stable_rating("abc123", 4.5, 5.0) == stable_rating("abc123", 4.5, 5.0)
+
+
+def test_highlight_lookup():
+    engine = CommentaryEngine(HIGHLIGHTS)
+    assert "朱海平原" in engine.generate("k", "キングダム 50", "原泰久", True)
+    assert engine.highlight("ONE PIECE 100", "100") == "鬼ヶ島の決戦。"
+    assert engine.highlight("ONE PIECE 99", "99") == ""
+    assert engine.highlight("別作品 100", "100") == ""
+
+
+def test_cache_hits_and_invalidation(tmp_path):
+    path = str(tmp_path / "commentary.sqlite3")
+    cache = CommentaryCache(path)
+    engine = CommentaryEngine(HIGHLIGHTS, cache)
+    first = engine.generate("x1", "作品 1", "作者", False, "あらすじ")
+    cache.close()
+
+    cache = CommentaryCache(path)
+    engine = CommentaryEngine(HIGHLIGHTS, cache)
+    assert engine.generate("x1", "作品 1", "作者", False, "あらすじ") == first
+    assert (cache.hits, cache.misses) == (1, 0)
+    # 入力が変われば作り直す
+    engine.generate("x1", "作品 1", "作者", False, "新しいあらすじ")
+    assert cache.misses == 1
+
+    # VOLUME_HIGHLIGHTS の該当文面を書き換えたら、その巻だけ作り直す
+    engine.generate("k50", "キングダム 50", "原泰久", True)
+    edited = CommentaryEngine(dict(HIGHLIGHTS, キングダム={"50": "新しい見どころ。"}), cache)
+    assert "新しい見どころ" in edited.generate("k50", "キングダム 50", "原泰久", True)
+    hits = cache.hits
+    assert edited.generate("x1", "作品 1", "作者", False, "新しいあらすじ") and cache.hits == hits + 1
+
+
+BUILD_ITEM = """
+import json
+import generate_data
+from commentary_engine import CommentaryCache, CommentaryEngine
+from item_record import ItemRecord
+generate_data.COMMENTARY = CommentaryEngine(generate_data.VOLUME_HIGHLIGHTS, CommentaryCache(":memory:"))
+rec = ItemRecord("薬屋のひとりごと 3", "日向夏", "あらすじ", "001001001", "https://x/c.jpg")
+print(json.dumps(generate_data.build_manga_item("abc123", rec), ensure_ascii=False))
+"""
+
+
+def test_item_is_identical_across_processes(tmp_path):
+    # 文字列ハッシュの乱数化（PYTHONHASHSEED）でタグの順序等が変わらないこと
+    outputs = []
+    for seed in ("1", "2"):
+        env = dict(os.environ, PYTHONHASHSEED=seed, MANGA_REACH_CACHE_DIR=str(tmp_path))
+        outputs.append(subprocess.run([sys.executable, "-c", BUILD_ITEM], env=env, capture_output=True, text=True,
+                                      check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout)
+    assert outputs[0] == outputs[1]
+    assert json.loads(outputs[0])["tags"] == ["日向夏", "漫画", "薬屋のひとりごと"]
@@ -0,0 +1,65 @@
+from crawl_planner import CrawlPlanner
+from crawler import CrawlStream
+
+
+def paged(catalogs, hits=3):
+    # catalogs: {列のパラメータ名: id のリスト} を hits 件ずつのページとして返す fetch
+    requests = []
+
+    def fetch(page, name):
+        requests.append((name, page))
+        ids = catalogs[name]
+        return {"Items": ids[(page - 1) * hits:page * hits], "pageCount": (len(ids) + hits - 1) // hits}
+
+    return fetch, requests
+
+
+def streams_for(catalogs, max_pages=100):
+    return [CrawlStream((i, name), {"name": name}, max_pages) for i, name in enumerate(catalogs)]
+
+
+def test_saturated_stream_is_cut_and_page_count_respected():
+    catalogs = {"fresh": list(range(0, 12)), "dupe": list(range(0, 12))}
+    fetch, requests = paged(catalogs)
+    done = []
+    planner = CrawlPlanner(fetch, streams_for(catalogs), batch=2, workers=2)
+    planner.run(lambda s, p, items: items, lambda s: done.append(s.key[1]))
+    assert planner.seen == set(range(12))
+    # fresh は pageCount の4ページで止まり、空の5ページ目は取りに行かない
+    assert ("fresh", 5) not in requests and ("fresh", 4) in requests
+    # dupe は新規なしが2ページ続いた時点で打ち切り
+    assert ("dupe", 3) not in requests
+    assert planner.summary()["saturated"] == 1 and sorted(done) == ["dupe", "fresh"]
+
+
+def test_budget_goes_to_high_yield_streams():
+    catalogs = {"low": [0] * 30, "high": list(range(100, 130))}
+    fetch, requests = paged(catalogs)
+    planner = CrawlPlanner(fetch, streams_for(catalogs), batch=1, workers=1, min_yield=0, budget=6)
+    planner.run(lambda s, p, items: items)
+    assert requests[:2] == [("low", 1), ("high", 1)]
+    assert requests[2:] == [("high", p) for p in range(2, 6)]
+    assert planner.summary()["budget"] == 2
+
+
+def test_plan_does_not_depend_on_workers():
+    catalogs = {f"s{i}": list(range(i * 7, i * 7 + 40)) for i in range(5)}
+    runs = []
+    for workers in (1, 4):
+        fetch, requests = paged(catalogs)
+        planner = CrawlPlanner(fetch, streams_for(catalogs), batch=3, workers=workers, target=60)
+        order = []
+        planner.run(lambda s, p, items: order.append((s.key, p)) or items)
+        runs.append((sorted(requests), order, planner.seen))
+    assert runs[0] == runs[1]
+
+
+def test_lanes_measure_yield_on_their_own():
+    # 別経路（レート上限が別）が先に見つけた id では打ち切らず、経路ごとに batch 本ずつ進める
+    catalogs = {"a": list(range(0, 30)), "b": list(range(0, 30))}
+    fetch, requests = paged(catalogs)
+    streams = [CrawlStream((i, name), {"name": name}, 100) for i, name in enumerate(catalogs)]
+    planner = CrawlPlanner(fetch, streams, batch=1, workers=1, lane=lambda s: s.params["name"])
+    planner.run(lambda s, p, items: items)
+    assert requests[:2] == [("a", 1), ("b", 1)]
+    assert ("b", 10) in requests and planner.summary()["saturated"] == 0
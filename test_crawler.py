@@ -0,0 +1,138 @@
+import threading
+import time
+
+import generate_data
+from crawl_journal import CrawlJournal
+from crawler import TokenBucket
+from http_client import HTTPClient
+from response_cache import ResponseCache
+from rakuten_stub import RakutenStub, make_item
+
+
+def stub_catalog(params):
+    if params.get("title"):
+        kw = params["title"]
+        return [make_item(f"{kw} {n}", "尾田栄一郎") for n in range(1, 46)]
+    gid = params["booksGenreId"]
+    sort = params.get("sort", "")
+    # ソート順が違っても大部分は同じ作品が並ぶ
+    offset = 5 if sort == "sales" else 0
+    return [make_item(f"作品{gid}-{n}", f"作者{n % 7}", gid) for n in range(offset, 90 + offset)]
+
+
+def use_stub(monkeypatch, stub, rate=500):
+    monkeypatch.setattr(generate_data, "BOOKS_BASE_URL", stub.url)
+    monkeypatch.setattr(generate_data, "CRAWL_SOURCES", ["books"])
+    monkeypatch.setattr(generate_data, "HTTP_CLIENT", HTTPClient(limiter=TokenBucket(rate, capacity=rate), metrics=generate_data.METRICS))
+    monkeypatch.setattr(generate_data, "RESPONSE_CACHE", ResponseCache(":memory:", mode="off"))
+
+
+def test_token_bucket_enforces_rate():
+    bucket = TokenBucket(20)
+    start = time.monotonic()
+    for _ in range(6):
+        bucket.acquire()
+    assert time.monotonic() - start >= 0.24
+
+
+def test_token_bucket_returns_on_stop():
+    bucket = TokenBucket(0.1)
+    bucket.acquire()
+    stop = threading.Event()
+    stop.set()
+    assert bucket.acquire(stop) is False
+
+
+def journal_at(tmp_path, name="journal.jsonl"):
+    return CrawlJournal(str(tmp_path / name))
+
+
+def test_crawl_catalog_against_stub(monkeypatch, tmp_path):
+    monkeypatch.setattr(generate_data, "LEGENDARY_TITLES", ["ONE PIECE"])
+    with RakutenStub(stub_catalog) as stub:
+        use_stub(monkeypatch, stub)
+        series_map = generate_data.crawl_catalog(genres=["001001001", "001001002"], workers=4,
+                                                 journal=journal_at(tmp_path))
+    # ジャンル2つ×95作品 + ONE PIECE 45巻
+    assert len(series_map) == 2 * 95 + 45
+    # マージ順は実行ごとに同じ
+    first = list(series_map.values())[0]
+    assert first.title == "作品001001001-0"
+
+
+def test_crawl_catalog_is_deterministic(monkeypatch, tmp_path):
+    monkeypatch.setattr(generate_data, "LEGENDARY_TITLES", ["ONE PIECE"])
+    with RakutenStub(stub_catalog) as stub:
+        use_stub(monkeypatch, stub)
+        a = list(generate_data.crawl_catalog(genres=["001001001", "001001002"], workers=8,
+                                             journal=journal_at(tmp_path, "a.jsonl")))
+        b = list(generate_data.crawl_catalog(genres=["001001001", "001001002"], workers=2,
+                                             journal=journal_at(tmp_path, "b.jsonl")))
+    assert a == b
+
+
+def test_target_count_stops_outstanding_work(monkeypatch, tmp_path):
+    monkeypatch.setattr(generate_data, "LEGENDARY_TITLES", [])
+    monkeypatch.setattr(generate_data, "TARGET_COUNT", 40)
+    with RakutenStub(stub_catalog) as stub:
+        use_stub(monkeypatch, stub, rate=50)
+        series_map = generate_data.crawl_catalog(genres=["001001001", "001001002", "001001003"], workers=3,
+                                                 journal=journal_at(tmp_path))
+        requests = len(stub.requests)
+    assert len(series_map) >= 40
+    # 全列を最後まで取得すると 3ジャンル×3ソート×4ページ = 36 リクエスト
+    assert requests < 36
+
+
+def test_interrupted_crawl_resumes_at_cursor(monkeypatch, tmp_path):
+    monkeypatch.setattr(generate_data, "LEGENDARY_TITLES", ["ONE PIECE"])
+    genres = ["001001001", "001001002"]
+    with RakutenStub(stub_catalog) as stub:
+        use_stub(monkeypatch, stub)
+        expected = generate_data.crawl_catalog(genres=genres, workers=2, journal=journal_at(tmp_path, "full.jsonl"))
+        full_requests = len(stub.requests)
+
+    # 3ページ目以降が落ちるAPIで1回目を途中終了させる
+    def flaky_catalog(params):
+        if int(params["page"]) >= 3:
+            raise RuntimeError("network blip")
+        return stub_catalog(params)
+
+    with RakutenStub(flaky_catalog) as stub:
+        use_stub(monkeypatch, stub)
+        monkeypatch.setattr(generate_data.HTTP_CLIENT, "backoff", 0.001)
+        generate_data.crawl_catalog(genres=genres, workers=2, journal=journal_at(tmp_path))
+
+    journal = journal_at(tmp_path).load()
+    assert journal.next_page(1, (0, "001001001", "reviewCount")) == 3
+    assert not journal.is_done(1, (0, "001001001", "reviewCount"))
+
+    with RakutenStub(stub_catalog) as stub:
+        use_stub(monkeypatch, stub)
+        resumed = generate_data.crawl_catalog(genres=genres, workers=2, journal=journal)
+        # 取得済みの1〜2ページは再取得しない
+        assert all(int(r["page"]) >= 3 for r in stub.requests)
+        assert len(stub.requests) < full_requests
+    assert list(resumed) == list(expected)
+
+
+def test_journal_survives_repeated_crashes(tmp_path):
+    # 書き込み途中で2回落ちても、再開のたびに記録した分がすべて読み戻せる
+    path = tmp_path / "journal.jsonl"
+    stream = (0, "001001001", "reviewCount")
+    journal = CrawlJournal(str(path)).load()
+    for page in (1, 2):
+        journal.record_page(1, stream, page, [[f"id{page}", ["t", "a", "", "001001001", "", ""]]])
+    journal.flush()
+    journal.close()
+    for page in (3, 4):
+        with open(path, "a", encoding="utf-8") as f:
+            f.write('{"type":"page","phase":1,"str')
+        journal = CrawlJournal(str(path)).load()
+        assert journal.next_page(1, stream) == page
+        journal.record_page(1, stream, page, [[f"id{page}", ["t", "a", "", "001001001", "", ""]]])
+        journal.flush()
+        journal.close()
+    journal = CrawlJournal(str(path)).load()
+    assert journal.next_page(1, stream) == 5
+    assert sorted(journal.phase_pages(1)) == [(stream, p) for p in (1, 2, 3, 4)]
@@ -0,0 +1,78 @@
+import daily_update
+from catalog_db import CatalogDB
+from crawl_watermark import Watermarks, sales_date_key
+from rakuten_stub import RakutenStub, make_item
+from test_crawler import use_stub
+
+
+def release_catalog(count):
+    # 発売日の新しい順（-releaseDate）に並んだジャンル別の新刊。1日3冊ずつ
+    def items_for(params):
+        gid = params["booksGenreId"]
+        items = [make_item(f"新刊{gid}-{n}", f"作者{n}", gid, sales_date=f"2024年{1 + n // 90:02d}月{1 + n // 3 % 30:02d}日")
+                 for n in range(count)]
+        return items[::-1]
+    return items_for
+
+
+def test_sales_date_key():
+    assert sales_date_key("2024年05月02日") == "2024-05-02"
+    assert sales_date_key("2024年5月上旬") == "2024-05-00"
+    assert sales_date_key("") == ""
+
+
+def test_delta_crawl_stops_at_watermark(monkeypatch, tmp_path):
+    path = str(tmp_path / "watermarks.json")
+    catalog = {"count": 100}
+    genres = ["001001001", "001001002"]
+    with RakutenStub(lambda params: release_catalog(catalog["count"])(params)) as stub:
+        use_stub(monkeypatch, stub)
+        # 初回: 上限に達したジャンルは高水位線を進めない
+        marks = Watermarks(path)
+        known = daily_update.KnownItems(CatalogDB(":memory:"))
+        found = daily_update.find_new_manga_delta(known, 5, marks, genres=genres, max_pages=2)
+        assert len(found) == 5
+        assert marks.marks == {}
+
+        # 上限を十分に取れば読み切って高水位線を保存する
+        found = daily_update.find_new_manga_delta(known, 500, marks, genres=genres, max_pages=4)
+        assert len(found) == 2 * 100 - 5
+        marks.save()
+
+        # 新刊が4冊増えた: 各ジャンル1ページで高水位線に達し、新しい分だけを拾う
+        catalog["count"] = 104
+        before = len(stub.requests)
+        found = daily_update.find_new_manga_delta(known, 500, Watermarks(path), genres=genres)
+        assert len(stub.requests) - before == 2
+        assert sorted(m["title"] for m in found) == sorted(f"新刊{gid}-{n}" for gid in genres for n in range(100, 104))
+
+        # 何も増えていなければ何も追加しない
+        marks = Watermarks(path)
+        daily_update.find_new_manga_delta(known, 500, marks, genres=genres)
+        marks.save()
+        assert daily_update.find_new_manga_delta(daily_update.KnownItems(CatalogDB(":memory:")), 500, Watermarks(path), genres=genres) == []
+
+
+def test_delta_crawl_keeps_watermark_until_caught_up(monkeypatch, tmp_path):
+    # ページ数の上限で読み切れなかったジャンルは高水位線を進めない（次回に続きを読む）
+    path = str(tmp_path / "watermarks.json")
+    with RakutenStub(release_catalog(200)) as stub:
+        use_stub(monkeypatch, stub)
+        marks = Watermarks(path)
+        known = daily_update.KnownItems(CatalogDB(":memory:"))
+        found = daily_update.find_new_manga_delta(known, 500, marks, genres=["001001001"], max_pages=2)
+        assert len(found) == 60 and marks.marks == {}
+        found = daily_update.find_new_manga_delta(known, 500, marks, genres=["001001001"], max_pages=10)
+        assert len(found) == 140 and marks.get("001001001")[0] == "2024-03-07"
+
+
+def test_watermark_ignores_preorders_and_undated_items(tmp_path):
+    marks = Watermarks(str(tmp_path / "watermarks.json"), today="2024-05-10")
+    marks.advance("g", [("2024-09-01", "preorder"), ("", "undated"), ("2024-05-10", "a"), ("2024-05-09", "b")])
+    assert marks.get("g") == ("2024-05-10", {"a"})
+    # 発売日の読めないものではページングを止めず、既知扱いにもしない
+    assert not marks.is_older("g", "") and not marks.is_known("g", "", "undated")
+    # 高水位線より後に登録された、発売済みの巻は新しいものとして読む
+    assert not marks.is_older("g", "2024-05-10") and not marks.is_known("g", "2024-05-10", "late")
+    assert marks.is_older("g", "2024-05-09")
+
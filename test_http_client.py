@@ -0,0 +1,77 @@
+import pytest
+
+from http_client import HTTPClient, HTTPStatusError
+from rakuten_stub import RakutenStub, StubError, make_item
+
+
+def test_reuses_connection_and_decodes_gzip():
+    with RakutenStub(lambda p: [make_item("ONE PIECE 1", "尾田栄一郎")]) as stub:
+        client = HTTPClient()
+        for _ in range(5):
+            data = client.get_json(f"{stub.url}?page=1")
+            assert data["Items"][0]["Item"]["title"] == "ONE PIECE 1"
+        # 接続は1本だけ作られてプールに戻っている
+        assert sum(len(idle) for idle in client._pool.values()) == 1
+        client.close()
+
+
+def test_retries_with_backoff():
+    calls = []
+
+    def flaky(params):
+        calls.append(1)
+        if len(calls) < 3:
+            raise RuntimeError("boom")
+        return [make_item("呪術廻戦 1", "芥見下々")]
+
+    with RakutenStub(flaky) as stub:
+        client = HTTPClient(retries=3, backoff=0.01)
+        data = client.get_json(stub.url)
+    assert len(calls) == 3
+    assert data["count"] == 1
+
+
+def test_gives_up_after_retries():
+    def broken(params):
+        raise RuntimeError("boom")
+
+    with RakutenStub(broken) as stub:
+        client = HTTPClient(retries=2, backoff=0.01)
+        with pytest.raises(Exception):
+            client.get_json(stub.url)
+
+
+def test_retries_when_rate_limited():
+    # スタブのレート制限を超えた分は 429 になり、バックオフ後の再試行で取れる
+    with RakutenStub(lambda p: [make_item("ONE PIECE 1", "尾田栄一郎")], rate_limit=20) as stub:
+        client = HTTPClient(retries=5, backoff=0.05)
+        for _ in range(3):
+            assert client.get_json(stub.url)["count"] == 1
+        client.close()
+    assert stub.throttled >= 1
+
+
+def test_client_errors_are_not_retried():
+    # applicationId・パラメータの誤り（4xx）は再試行しても直らないので1回で失敗する
+    def bad_request(params):
+        raise StubError(400)
+
+    with RakutenStub(bad_request) as stub:
+        client = HTTPClient(retries=3, backoff=10)
+        with pytest.raises(HTTPStatusError) as e:
+            client.get_json(stub.url)
+        assert e.value.status == 400 and len(stub.requests) == 1
+
+
+def test_server_errors_are_retried():
+    calls = []
+
+    def unavailable(params):
+        calls.append(1)
+        if len(calls) < 2:
+            raise StubError(503, "service_unavailable")
+        return [make_item("ONE PIECE 1", "尾田栄一郎")]
+
+    with RakutenStub(unavailable) as stub:
+        assert HTTPClient(retries=3, backoff=0.01).get_json(stub.url)["count"] == 1
+    assert len(calls) == 2
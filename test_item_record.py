@@ -0,0 +1,34 @@
+import generate_data
+from commentary_engine import CommentaryEngine
+from crawl_journal import CrawlJournal
+from item_record import ItemRecord
+
+
+def test_projects_used_fields():
+    api_item = {"title": "ONE PIECE 1", "author": "尾田栄一郎", "itemCaption": "海賊王に俺はなる！", "booksGenreId": "001001001",
+                "largeImageUrl": "https://thumbnail.image.rakuten.co.jp/a.jpg?_ex=200x200", "itemPrice": 528, "isbn": "978"}
+    rec = ItemRecord.from_api(api_item)
+    assert rec.to_json() == ["ONE PIECE 1", "尾田栄一郎", "海賊王に俺はなる！", "001001001", "https://thumbnail.image.rakuten.co.jp/a.jpg", "978"]
+    assert not hasattr(rec, "__dict__")
+    assert ItemRecord.from_json(rec.to_json()) == rec
+    # 欠けた項目は従来の v.get(...) と同じ既定値
+    assert ItemRecord.from_api({}).to_json() == ["", "不明", "", "001001", "", ""]
+    # isbn の無い旧形式の配列も読める
+    assert ItemRecord.from_json(["a", "b", "", "001001", ""]).isbn == ""
+
+
+def test_group_series_reads_records_and_legacy_journal(monkeypatch, tmp_path):
+    monkeypatch.setattr(generate_data, "COMMENTARY", CommentaryEngine(generate_data.VOLUME_HIGHLIGHTS))
+    # 旧形式のジャーナル（API の Item をそのまま記録）からも ItemRecord に復元できる
+    path = str(tmp_path / "journal.jsonl")
+    journal = CrawlJournal(path)
+    journal.record_page(1, (0, "001001001", "reviewCount"), 1,
+                        [("a", {"title": "呪術廻戦 2", "author": "芥見下々", "largeImageUrl": "https://x/b.jpg?_ex=1"})])
+    journal.flush()
+    pages = generate_data.journal_items(CrawlJournal(path).load(), 1)
+    (m_id, rec), = pages[((0, "001001001", "reviewCount"), 1)]
+    groups = generate_data.group_series({m_id: rec})
+    (item,), = groups.values()
+    assert item["title"] == "呪術廻戦 2" and item["volumeNumber"] == "2"
+    assert item["cover"] == "https://x/b.jpg?_ex=300x420"
+    assert item["genreId"] == "001001"
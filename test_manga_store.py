@@ -0,0 +1,72 @@
+import json
+import os
+import shutil
+
+import generate_data
+from manga_store import ShardedStore, append_json_array, write_json_array
+from test_ssg import sample_manga
+
+
+def test_round_trip_keeps_order(tmp_path):
+    manga = sample_manga(40)
+    manga.reverse()
+    store = ShardedStore(str(tmp_path / "shards"), prefix_length=11)
+    store.write_all(manga)
+    assert ShardedStore(str(tmp_path / "shards"), prefix_length=11).read_all() == manga
+    # 同じシリーズは同じシャードに入る
+    assert len(store.series(manga[0]["seriesId"])) == 5
+
+
+def test_rewrite_without_changes_touches_nothing(tmp_path):
+    manga = sample_manga(40)
+    ShardedStore(str(tmp_path)).write_all(manga)
+    assert ShardedStore(str(tmp_path)).write_all(manga) == 0
+
+
+def test_upsert_rewrites_a_single_shard(tmp_path):
+    manga = sample_manga(40)
+    root = str(tmp_path)
+    ShardedStore(root, prefix_length=11).write_all(manga)
+    before = {name: os.stat(os.path.join(root, name)).st_mtime_ns for name in os.listdir(root)}
+    new = dict(manga[0], id="new000000000", title="新しい巻")
+    assert ShardedStore(root, prefix_length=11).upsert([new]) == 1
+    after = {name: os.stat(os.path.join(root, name)).st_mtime_ns for name in os.listdir(root)}
+    changed = {name for name in after if after[name] != before.get(name)}
+    assert changed == {"index.json", manga[0]["seriesId"][:11] + ".json"}
+    store = ShardedStore(root, prefix_length=11)
+    assert store.get("new000000000")["title"] == "新しい巻"
+    assert store.read_all()[-1]["id"] == "new000000000"
+
+
+def test_append_json_array(tmp_path):
+    path = str(tmp_path / "data.json")
+    write_json_array(path, [{"id": 1}])
+    append_json_array(path, [{"id": 2}, {"id": 3}])
+    with open(path, encoding="utf-8") as f:
+        assert json.load(f) == [{"id": 1}, {"id": 2}, {"id": 3}]
+    write_json_array(path, [])
+    append_json_array(path, [{"id": 4}])
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    assert json.loads(text) == [{"id": 4}]
+    assert text == '[\n{"id":4}\n]\n'
+
+
+def test_daily_add_rewrites_only_its_shard(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    # seriesId の先頭2文字を散らして複数のシャードに分ける
+    manga = [dict(m, seriesId=f"{i // 5 % 4}{m['seriesId']}") for i, m in enumerate(sample_manga(40))]
+    generate_data.save_manga_data(manga)
+    root = generate_data.SHARD_DIR
+    before = {name: os.stat(os.path.join(root, name)).st_mtime_ns for name in os.listdir(root)}
+    new = dict(manga[0], id="new000000000", title="新しい巻")
+    generate_data.add_manga_data([new])
+    after = {name: os.stat(os.path.join(root, name)).st_mtime_ns for name in os.listdir(root)}
+    assert {name for name in after if after[name] != before.get(name)} == {"index.json", new["seriesId"][:2] + ".json"}
+    assert generate_data.load_exported_data() == manga + [new]
+
+    # シャードが無ければカタログ全件から作る
+    shutil.rmtree(root)
+    new2 = dict(manga[5], id="new000000001", title="次の巻")
+    generate_data.add_manga_data([new2])
+    assert ShardedStore(root).read_all() == manga + [new, new2]
@@ -0,0 +1,41 @@
+import threading
+
+import pytest
+
+from pipeline import BackgroundStage
+
+
+def test_processes_in_order_with_backpressure():
+    release = threading.Event()
+    seen = []
+
+    def handler(item):
+        release.wait()
+        seen.append(item)
+
+    stage = BackgroundStage(handler, maxsize=2)
+    producer = threading.Thread(target=lambda: [stage.submit(i) for i in range(6)])
+    producer.start()
+    producer.join(0.2)
+    # 処理段が止まっている間、生産側はキューが空くまで待たされる
+    assert producer.is_alive()
+    release.set()
+    producer.join()
+    assert stage.close() == 6
+    assert seen == list(range(6))
+    assert stage.waits >= 1
+
+
+def test_handler_error_is_raised_on_close():
+    def handler(item):
+        if item == 1:
+            raise ValueError("broken")
+
+    stage = BackgroundStage(handler, maxsize=1)
+    # 例外のあとも submit は詰まらない
+    for i in range(10):
+        stage.submit(i)
+    with pytest.raises(ValueError):
+        stage.close()
+    with pytest.raises(RuntimeError):
+        stage.submit(11)
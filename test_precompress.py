@@ -0,0 +1,89 @@
+import gzip
+import json
+import os
+
+import precompress
+
+
+def write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def site(tmp_path):
+    root = tmp_path / "public"
+    for i in range(5):
+        write(str(root / "manga" / f"m{i}" / "index.html"), f"<html>{'漫画' * 300}{i}</html>")
+    write(str(root / "robots.txt"), "tiny")
+    return root
+
+
+def test_writes_compressed_files_and_skips_unchanged(tmp_path):
+    root = site(tmp_path)
+    manifest = str(tmp_path / "compress.json")
+    page = str(root / "manga" / "m0" / "index.html")
+    first = precompress.precompress([str(root)], manifest)
+    assert first["files"] == 6 and first["compressed"] == 6
+    with open(page + ".gz", "rb") as f, open(page, "rb") as src:
+        assert gzip.decompress(f.read()) == src.read()
+    # 小さすぎるファイルは圧縮版を置かない
+    assert not os.path.exists(str(root / "robots.txt.gz"))
+    assert first["gz_bytes"] < first["bytes"]
+
+    second = precompress.precompress([str(root)], manifest)
+    assert second["compressed"] == 0 and second["unchanged"] == 6
+
+    write(page, "<html>" + "改訂" * 300 + "</html>")
+    third = precompress.precompress([str(root)], manifest)
+    assert third["compressed"] == 1
+    with open(page + ".gz", "rb") as f:
+        assert gzip.decompress(f.read()).decode("utf-8").startswith("<html>改訂")
+
+
+def test_without_manifest_compares_existing_gzip(tmp_path):
+    root = site(tmp_path)
+    precompress.precompress([str(root)], str(tmp_path / "a.json"))
+    # マニフェストが無くても（CIの新規チェックアウト等）ディスク上の .gz と同じ内容なら圧縮し直さない
+    assert precompress.precompress([str(root)], str(tmp_path / "b.json"))["compressed"] == 1  # robots.txt のみ
+
+
+def test_removed_sources_drop_their_compressed_files(tmp_path):
+    root = site(tmp_path)
+    manifest = str(tmp_path / "compress.json")
+    precompress.precompress([str(root)], manifest)
+    page = str(root / "manga" / "m4" / "index.html")
+    os.remove(page)
+    stats = precompress.precompress([str(root)], manifest)
+    assert stats["removed"] == len(precompress.encodings())
+    assert not os.path.exists(page + ".gz")
+
+
+def test_parallel_output_matches_serial(tmp_path):
+    root = site(tmp_path)
+    precompress.precompress([str(root)], None, workers=2, chunk_size=2)
+    parallel = {p: open(p + ".gz", "rb").read() for p in precompress.walk_files([str(root)]) if os.path.exists(p + ".gz")}
+    for p in parallel:
+        os.remove(p + ".gz")
+    precompress.precompress([str(root)], None)
+    assert parallel == {p: open(p + ".gz", "rb").read() for p in parallel}
+
+
+def test_fingerprint_maps_logical_to_hashed_names(tmp_path):
+    root = tmp_path / "public"
+    shard = str(root / "data" / "manga" / "ab.json")
+    write(shard, '[{"id": "1"}]')
+    manifest = str(root / "asset-manifest.json")
+    precompress.fingerprint(str(root / "data"), "/", manifest, site_root=str(root))
+    with open(manifest, encoding="utf-8") as f:
+        files = json.load(f)["files"]
+    hashed = files["/data/manga/ab.json"]
+    assert precompress.HASHED_NAME_RE.search(hashed)
+    assert os.path.exists(str(root) + hashed)
+
+    write(shard, '[{"id": "2"}]')
+    stats = precompress.fingerprint(str(root / "data"), "/", manifest, site_root=str(root))
+    with open(manifest, encoding="utf-8") as f:
+        assert json.load(f)["files"]["/data/manga/ab.json"] != hashed
+    # 古いハッシュ付きのコピーは消える
+    assert stats["removed"] == 1 and not os.path.exists(str(root) + hashed)
@@ -0,0 +1,106 @@
+import os
+
+import pytest
+
+from http_client import HTTPClient
+from rakuten_stub import RakutenStub, StubError, make_item
+from response_cache import CacheMiss, ResponseCache, cache_key
+
+PARAMS = {"applicationId": "x", "booksGenreId": "001001001", "sort": "reviewCount", "page": 1}
+
+
+def catalog(params):
+    return [make_item(f"キングダム {n}", "原泰久") for n in range(1, 31)]
+
+
+def test_key_ignores_credentials_and_value_types():
+    a = cache_key("BooksBook/Search", PARAMS)
+    b = cache_key("BooksBook/Search", dict(PARAMS, applicationId="y", page="1"))
+    assert a == b
+    assert a != cache_key("BooksBook/Search", dict(PARAMS, page=2))
+
+
+def test_hit_after_first_fetch(tmp_path):
+    cache = ResponseCache(str(tmp_path / "c.sqlite3"))
+    with RakutenStub(catalog) as stub:
+        client = HTTPClient()
+        first = cache.fetch_json(client, "BooksBook/Search", PARAMS, stub.url)
+        second = cache.fetch_json(client, "BooksBook/Search", PARAMS, stub.url)
+        assert len(stub.requests) == 1
+    assert first == second
+    assert cache.stats()["hits"] == 1
+
+
+def test_stale_entry_is_revalidated_with_etag(tmp_path):
+    cache = ResponseCache(str(tmp_path / "c.sqlite3"), ttls={"BooksBook/Search": 0})
+    with RakutenStub(catalog) as stub:
+        client = HTTPClient()
+        cache.fetch_json(client, "BooksBook/Search", PARAMS, stub.url)
+        data = cache.fetch_json(client, "BooksBook/Search", PARAMS, stub.url)
+        assert len(stub.requests) == 2
+    assert cache.revalidated == 1
+    assert data["Items"][0]["Item"]["title"] == "キングダム 1"
+
+
+def test_replay_mode_never_hits_network(tmp_path):
+    path = str(tmp_path / "c.sqlite3")
+    with RakutenStub(catalog) as stub:
+        ResponseCache(path).fetch_json(HTTPClient(), "BooksBook/Search", PARAMS, stub.url)
+        replay = ResponseCache(path, mode="replay", ttls={"BooksBook/Search": 0})
+        assert replay.fetch_json(HTTPClient(), "BooksBook/Search", PARAMS, stub.url)["count"] == 30
+        with pytest.raises(CacheMiss):
+            replay.fetch_json(HTTPClient(), "BooksBook/Search", dict(PARAMS, page=2), stub.url)
+        assert len(stub.requests) == 1
+
+
+def test_lru_eviction(tmp_path):
+    cache = ResponseCache(str(tmp_path / "c.sqlite3"), max_bytes=2500)
+    body = os.urandom(1000)
+    for page in range(1, 6):
+        cache.store(cache_key("e", {"page": page}), "e", {"page": page}, body)
+        cache.lookup(cache_key("e", {"page": 1}))
+    # 1ページ目は毎回参照しているので残り、古いものから消える
+    assert cache.lookup(cache_key("e", {"page": 1})) is not None
+    assert cache.lookup(cache_key("e", {"page": 2})) is None
+    assert cache.stats()["bytes"] <= 2500
+
+
+def test_store_keeps_running_total_without_rescanning(tmp_path):
+    path = str(tmp_path / "c.sqlite3")
+    cache = ResponseCache(path, max_bytes=10000)
+    body = os.urandom(1000)
+    statements = []
+    cache._conn().set_trace_callback(statements.append)
+    for page in range(1, 6):
+        cache.store(cache_key("e", {"page": page}), "e", {"page": page}, body)
+    # 同じキーの上書きは差分だけ数える
+    cache.store(cache_key("e", {"page": 1}), "e", {"page": 1}, os.urandom(500))
+    # 上限内の store では全件の集計も LRU の走査もしない
+    assert not [s for s in statements if "SUM(" in s or "ORDER BY" in s]
+    assert cache._total == cache.stats()["bytes"]
+    cache.close()
+    # 開き直すと既存の合計から数え直す
+    reopened = ResponseCache(path, max_bytes=4000)
+    reopened.store(cache_key("e", {"page": 6}), "e", {"page": 6}, body)
+    assert reopened._total == reopened.stats()["bytes"] <= 4000
+
+
+def test_not_modified_without_entry_refetches(tmp_path):
+    # 304 が返っても手元に本文が無ければ（壊れていて捨てた場合を含む）条件なしで取り直す
+    calls = []
+
+    def not_modified_once(params):
+        calls.append(1)
+        if len(calls) == 1:
+            raise StubError(304)
+        return catalog(params)
+
+    cache = ResponseCache(str(tmp_path / "c.sqlite3"))
+    key = cache_key("BooksBook/Search", PARAMS)
+    cache.store(key, "BooksBook/Search", PARAMS, b"{}", etag='"x"')
+    cache._conn().execute("UPDATE responses SET body = ? WHERE key = ?", (b"broken", key))
+    with RakutenStub(not_modified_once) as stub:
+        data = cache.fetch_json(HTTPClient(), "BooksBook/Search", PARAMS, stub.url)
+        assert len(stub.requests) == 2
+    assert data["count"] == 30
+    assert cache.lookup(key) is not None and cache._total == cache.stats()["bytes"]
@@ -0,0 +1,68 @@
+import json
+
+import pytest
+
+from http_client import HTTPClient
+from rakuten_stub import RakutenStub, make_item
+from run_metrics import Histogram, RunMetrics, instrumented_run
+
+
+def test_histogram_buckets():
+    h = Histogram((10, 100))
+    for v in (5, 10, 11, 100, 1000):
+        h.observe(v)
+    d = h.to_dict()
+    assert d["buckets"] == {"<=10": 2, "<=100": 2, "+Inf": 1}
+    assert d["count"] == 5 and d["max"] == 1000
+
+
+def test_nested_phases_accumulate():
+    metrics = RunMetrics()
+
+    @metrics.phase("outer")
+    def run():
+        for _ in range(3):
+            with metrics.phase("inner"):
+                metrics.incr("items")
+
+    run()
+    run()
+    report = metrics.report()
+    assert report["phases"]["outer"]["calls"] == 2
+    assert report["phases"]["outer/inner"]["calls"] == 6
+    assert report["counters"] == {"items": 6}
+
+
+def test_http_client_records_retries_and_bytes():
+    calls = []
+
+    def flaky(params):
+        calls.append(1)
+        if len(calls) < 2:
+            raise RuntimeError("boom")
+        return [make_item("呪術廻戦 1", "芥見下々")]
+
+    metrics = RunMetrics()
+    with RakutenStub(flaky) as stub:
+        HTTPClient(retries=3, backoff=0.01, metrics=metrics).get_json(stub.url)
+    report = metrics.report()
+    # スタブは例外時に接続を切るので、1回目は通信エラーとして数えられる
+    assert report["counters"]["http.retries"] == 1
+    assert sum(v for k, v in report["counters"].items() if k.startswith("http.errors.")) == 1
+    assert report["counters"]["http.requests"] == 1
+    assert report["counters"]["http.bytes_received"] > 0
+    assert report["histograms"]["http.latency_ms"]["count"] == 1
+
+
+def test_report_written_on_failure(tmp_path):
+    path = str(tmp_path / "report.json")
+    metrics = RunMetrics()
+    with pytest.raises(ValueError):
+        with instrumented_run(metrics, "test", path, extra=lambda: {"cache": {"hits": 1}}):
+            with metrics.phase("step"):
+                raise ValueError("boom")
+    with open(path, encoding="utf-8") as f:
+        report = json.load(f)
+    assert report["command"] == "test" and report["status"] == "error"
+    assert report["cache"] == {"hits": 1}
+    assert report["phases"]["step"]["calls"] == 1
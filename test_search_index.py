@@ -0,0 +1,33 @@
+from search_index import build_search_index, compact_record, expand_record, fuse_norm, fuse_record, search_docs
+
+
+def item(m_id, series_id, rating, legendary=False, tags=None):
+    return {"id": m_id, "seriesId": series_id, "seriesTitle": f"シリーズ {series_id}", "title": f"タイトル {m_id}",
+            "author": "作者", "description": "あらすじ", "rating": rating, "isLegendary": legendary, "tags": tags or []}
+
+
+def test_fuse_norm():
+    assert fuse_norm("a") == 1
+    assert fuse_norm("a b") == 0.707
+    assert fuse_norm("a b c") == 0.577
+    assert fuse_norm("a  b") == 0.707
+
+
+def test_fuse_record_matches_fuse_index():
+    doc = {"title": "ワンピース 1", "author": " ", "description": None, "tags": ["少年", None, "", "冒険 海賊"]}
+    record = fuse_record(doc, 3)
+    # 空白だけの値・None は飛ばし、配列は末尾から積まれる（位置は None を除いた配列での位置）
+    assert record == {"i": 3, "$": {
+        "1": {"v": "ワンピース 1", "n": 0.707},
+        "4": [{"v": "冒険 海賊", "i": 2, "n": 0.707}, {"v": "少年", "i": 0, "n": 1}],
+    }}
+    assert expand_record(compact_record(record), doc, 3) == record
+
+
+def test_search_docs_order():
+    manga_list = [item("a1", "A", 4.5), item("b1", "B", 4.9, legendary=True), item("a2", "A", 5.0), item("c1", "C", 4.7)]
+    assert [(kind, doc_id) for kind, doc_id, _ in search_docs(manga_list)] == [("s", "B"), ("s", "C"), ("s", "A"), ("m", "b1")]
+    data = build_search_index(manga_list)
+    assert data["docs"] == [["s", "B"], ["s", "C"], ["s", "A"], ["m", "b1"]]
+    assert len(data["norms"]) == len(data["docs"])
+    assert data["norms"][3] == {"0": 0.707, "1": 0.707, "2": 1, "3": 1, "4": []}
@@ -0,0 +1,98 @@
+import os
+
+import daily_update
+import generate_data
+from catalog_db import CatalogDB
+from series_resolver import PrefixTrie, merge_series, resolve_series
+from test_ssg import sample_manga, setup_site
+
+
+def legacy_lookup(names, text):
+    for name in names:
+        if text.startswith(name) or name.startswith(text):
+            return name
+    return None
+
+
+def test_trie_matches_list_scan():
+    names = ["ワンピース", "ワン", "NARUTO", "鬼滅の刃", "鬼滅", "ハイキュー!!", "ワンピース"]
+    trie = PrefixTrie((name, name) for name in names)
+    for text in ["", "ワ", "ワンピ", "ワンピース999", "ワンダフル", "鬼", "鬼滅の刃外伝", "NARUTOナルト", "ハイキュー", "呪術廻戦"]:
+        assert trie.lookup(text) == legacy_lookup(names, text), text
+
+
+def volumes(title, author, count, start=0):
+    out = []
+    for n in range(start, start + count):
+        series_id, core_title, vol_num, _ = generate_data.get_series_info(f"{title} {n + 1}", author)
+        out.append({"id": f"{core_title}-{author}-{n}", "title": f"{title} {n + 1}", "seriesId": series_id, "seriesTitle": core_title,
+                    "author": author, "isLegendary": False, "tags": [author, "漫画", core_title]})
+    return out
+
+
+def test_merge_series_variants():
+    groups = {}
+    for title, author, count, start in [("薬屋のひとりごと", "日向夏", 5, 0), ("薬屋のひとりごと 新装版", "日向夏", 2, 0),
+                                        ("薬屋のひとりごと～猫猫の後宮謎解き手帳～", "日向 夏", 2, 5),
+                                        ("異世界勇者", "佐藤翔", 3, 0), ("異世界勇者2", "佐藤翔", 1, 0),
+                                        ("薬屋のひとりごと", "別の作者", 1, 0)]:
+        for m in volumes(title, author, count, start):
+            groups.setdefault(m["seriesId"], []).append(m)
+    assert len(groups) == 6
+
+    merges = merge_series(groups)
+    assert len(groups) == 4 and len(merges) == 1
+    merge = merges[0]
+    assert merge["title"] == "薬屋のひとりごと" and merge["author"] == "日向夏"
+    assert sorted((s["rule"], s["volumes"]) for s in merge["merged"]) == [("same", 2), ("subtitle", 2)]
+    vols = groups[merge["into"]]
+    assert len(vols) == 9 and {m["seriesTitle"] for m in vols} == {"薬屋のひとりごと"}
+    assert all("薬屋のひとりごと" in m["tags"] for m in vols)
+    # 数字だけが違うもの・著者の違うものは別シリーズのまま
+    assert merge_series(groups) == []
+
+
+def test_bracketed_titles_need_a_long_shared_head():
+    groups = {}
+    for title, count in [("短編集『春の話』", 2), ("短編集『冬の話』", 1), ("短編集", 3), ("『恋文』の行方", 1), ("恋文", 2),
+                         ("薬屋のひとりごと", 3), ("薬屋のひとりごと「後宮編」", 1)]:
+        for m in volumes(title, "日向夏", count):
+            groups.setdefault(m["seriesId"], []).append(m)
+    merges = merge_series(groups)
+    # 括弧の前の作品名が長いものだけ副題として統合する（短い頭・括弧で始まる作品名は別作品のまま）
+    assert [m["title"] for m in merges] == ["薬屋のひとりごと"]
+    assert [s["seriesTitle"] for s in merges[0]["merged"]] == ["薬屋のひとりごと「後宮編」"]
+
+
+def test_resolve_series_against_catalog():
+    known = [("s1", "薬屋のひとりごと", "日向夏"), ("s2", "異世界勇者", "日向夏")]
+    assert resolve_series("薬屋のひとりごと 完全版", "日向 夏", known) == "s1"
+    assert resolve_series("異世界勇者2", "日向夏", known) is None
+
+    catalog = CatalogDB(":memory:")
+    catalog.upsert(volumes("薬屋のひとりごと", "日向夏", 2))
+    known_items = daily_update.KnownItems(catalog)
+    m = daily_update.build_new_manga({"title": "薬屋のひとりごと 新装版 3", "author": "日向夏", "itemCaption": "あらすじ",
+                                      "largeImageUrl": "https://x/c.jpg"}, "001001001", known_items)
+    assert m["seriesId"] == catalog.all()[0]["seriesId"] and m["seriesTitle"] == "薬屋のひとりごと"
+
+
+def test_merged_series_pages_redirect(monkeypatch, tmp_path):
+    setup_site(monkeypatch, tmp_path)
+    manga = sample_manga(10)
+    old, into = manga[5]["seriesId"], manga[0]["seriesId"]
+    generate_data.generate_ssg(manga)
+    # old を into に統合した結果、old のシリーズページは統合先への転送ページとして残る
+    merged = [dict(m, seriesId=into) if m["seriesId"] == old else m for m in manga]
+    generate_data.update_series_aliases([{"into": into, "merged": [{"seriesId": old}]}], {into})
+    generate_data.generate_ssg(merged)
+    with open(os.path.join("public/series", old, "index.html"), encoding="utf-8") as f:
+        page = f.read()
+    assert f'content="0; url=/series/{into}"' in page and f"https://manga-reach.com/series/{into}" in page
+    # さらに統合先が別のシリーズへ統合されたら、最終的な統合先に向け直す
+    aliases = generate_data.update_series_aliases([{"into": "s99999999999", "merged": [{"seriesId": into}]}],
+                                                  {"s99999999999"})
+    assert aliases == {old: "s99999999999", into: "s99999999999"}
+    # 統合先が無くなった別名のページは残さない
+    generate_data.generate_ssg(manga[:5])
+    assert not os.path.exists(os.path.join("public/series", old))
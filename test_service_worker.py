@@ -0,0 +1,52 @@
+import os
+import shutil
+
+import pytest
+
+import generate_data
+import service_worker
+from test_ssg import REPO_DIR, sample_manga, setup_site
+
+
+def build(manga):
+    generate_data.generate_ssg(manga)
+    generate_data.compress_artifacts(workers=1)
+    return generate_data.generate_service_worker(manga)
+
+
+def setup_build(monkeypatch, tmp_path):
+    setup_site(monkeypatch, tmp_path)
+    os.makedirs("public")
+    shutil.copy(os.path.join(REPO_DIR, "public", "sw.js"), "public/sw.js")
+    monkeypatch.setattr(generate_data, "COMPRESS_MANIFEST_PATH", str(tmp_path / ".cache" / "compress.json"))
+    monkeypatch.setattr(generate_data, "PRECACHE_SERIES", 2)
+
+
+def test_manifest_lists_outputs_and_cache_name_follows_content(monkeypatch, tmp_path):
+    setup_build(monkeypatch, tmp_path)
+    manga = sample_manga()
+    first = build(manga)
+    with open("public/sw.js", encoding="utf-8") as f:
+        source = f.read()
+    assert f"const CACHE_NAME = '{first['cache_name']}';" in source
+    assert '"url": "/series/s00000000000/"' in source and '"url": "/series/s00000000001/"' in source
+    assert "/series/s00000000002/" not in source
+    # アプリが取得しないデータ（asset-manifest・シャードの索引）は入れない
+    assert "/asset-manifest.json" not in source and "/data/" not in source
+    # 手書きの処理部分はそのまま
+    assert "self.addEventListener('fetch'" in source
+
+    # 内容が同じなら sw.js もキャッシュ名も変わらない
+    second = build(manga)
+    assert not second["changed"] and second["cache_name"] == first["cache_name"]
+
+    manga[0]["description"] = "新しいあらすじ"
+    third = build(manga)
+    assert third["changed"] and third["cache_name"] != first["cache_name"]
+
+
+def test_missing_block_is_an_error(tmp_path):
+    path = tmp_path / "sw.js"
+    path.write_text("const CACHE_NAME = 'x';\n", encoding="utf-8")
+    with pytest.raises(ValueError):
+        service_worker.write_service_worker(str(path), [])
@@ -0,0 +1,80 @@
+import gzip
+import os
+import xml.etree.ElementTree as ET
+
+from sitemap_engine import write_sitemaps
+from test_ssg import sample_manga
+
+NS = "{http://www.sitemaps.org/schemas/sitemap/0.9}"
+
+
+def build(tmp_path, manga, today, **kwargs):
+    return write_sitemaps(manga, str(tmp_path / "sitemap.xml"), str(tmp_path / "sitemaps"),
+                          str(tmp_path / "lastmod.db"), today=today, **kwargs)
+
+
+def read_index(tmp_path):
+    root = ET.parse(tmp_path / "sitemap.xml").getroot()
+    return [(e.find(NS + "loc").text, e.find(NS + "lastmod").text) for e in root.iter(NS + "sitemap")]
+
+
+def read_urls(tmp_path):
+    urls = {}
+    for name in sorted(os.listdir(tmp_path / "sitemaps")):
+        with gzip.open(tmp_path / "sitemaps" / name) as f:
+            for e in ET.parse(f).getroot().iter(NS + "url"):
+                urls[e.find(NS + "loc").text] = e.find(NS + "lastmod").text
+    return urls
+
+
+def test_index_and_sections(tmp_path):
+    manga = sample_manga(20)
+    manga[0]["tags"] = ["作者", "漫画", "R&D"]
+    stats = build(tmp_path, manga, "2024-01-01")
+    urls = read_urls(tmp_path)
+    # 固定3 + シリーズ4 + 巻20 + タグ3
+    assert stats["urls"] == len(urls) == 30
+    assert "https://manga-reach.com/series/s00000000000" in urls
+    assert "https://manga-reach.com/tag/R%26D" in urls
+    assert [loc for loc, _ in read_index(tmp_path)] == [
+        f"https://manga-reach.com/sitemaps/{s}-1.xml.gz" for s in ("pages", "series", "manga", "tag")]
+
+
+def test_lastmod_follows_content(tmp_path):
+    manga = sample_manga(20)
+    build(tmp_path, manga, "2024-01-01")
+    shard = tmp_path / "sitemaps" / "pages-1.xml.gz"
+    mtime = os.stat(shard).st_mtime_ns
+
+    manga[7] = dict(manga[7], description="新しいあらすじ")
+    stats = build(tmp_path, manga, "2024-02-01")
+    urls = read_urls(tmp_path)
+    changed = {loc for loc, date in urls.items() if date == "2024-02-01"}
+    # 変わった巻・そのシリーズ・その巻を含むタグだけが当日付になる
+    assert changed == {"https://manga-reach.com/manga/m00000000007", "https://manga-reach.com/series/s00000000001",
+                       "https://manga-reach.com/tag/%E4%BD%9C%E8%80%85", "https://manga-reach.com/tag/%E6%BC%AB%E7%94%BB"}
+    assert stats["urls_changed"] == 4
+    # 中身が同じシャードは書き換えない
+    assert os.stat(shard).st_mtime_ns == mtime
+    assert dict(read_index(tmp_path))["https://manga-reach.com/sitemaps/pages-1.xml.gz"] == "2024-01-01"
+
+
+def test_lastmod_ignores_tag_order_and_hidden_fields(tmp_path):
+    manga = sample_manga(20)
+    manga[0]["tags"] = ["作者", "漫画", "R&D"]
+    build(tmp_path, manga, "2024-01-01")
+    manga[0] = dict(manga[0], tags=["R&D", "漫画", "作者"], internal="表示されない項目")
+    stats = build(tmp_path, manga, "2024-02-01")
+    assert stats["urls_changed"] == 0
+    assert set(read_urls(tmp_path).values()) == {"2024-01-01"}
+
+
+def test_shards_split_and_stale_removed(tmp_path):
+    manga = sample_manga(25)
+    build(tmp_path, manga, "2024-01-01", max_urls=10)
+    assert sorted(n for n in os.listdir(tmp_path / "sitemaps") if n.startswith("manga-")) == \
+        ["manga-1.xml.gz", "manga-2.xml.gz", "manga-3.xml.gz"]
+    stats = build(tmp_path, manga[:10], "2024-01-02", max_urls=10)
+    assert stats["shards_removed"] == 2
+    assert stats["urls_pruned"] == 15 + 3
+    assert len(read_urls(tmp_path)) == 3 + 2 + 10 + 2
@@ -0,0 +1,87 @@
+import pytest
+
+import generate_data
+from crawler import TokenBucket
+from http_client import HTTPClient
+from rakuten_stub import RakutenStub, make_item
+from sources import KOBO_SORTS, DedupIndex, isbn13, kobo_item
+from test_crawler import journal_at, use_stub
+
+
+def test_isbn_and_kobo_normalization():
+    assert isbn13("4-08-872509-3") == "9784088725093"
+    assert isbn13("978-4-08-872509-3") == "9784088725093"
+    assert isbn13("") == isbn13("4910") == ""
+    item = kobo_item({"title": "ONE PIECE 1", "koboGenreId": "101904001", "mediumImageUrl": "https://x/m.jpg?_ex=150x150"})
+    assert item["booksGenreId"] == "001001" and item["largeImageUrl"] == "https://x/m.jpg?_ex=150x150"
+    assert item["author"] == "不明" and item["isbn"] == ""
+    assert not kobo_item({"koboGenreId": "101301"})["booksGenreId"].startswith("001001")
+
+
+def test_dedup_by_isbn_then_id():
+    index = DedupIndex()
+    assert index.resolve("paper", "9784088725093") == ("paper", True)
+    # 著者の表記が違って id が別でも ISBN が同じなら同じ本
+    assert index.resolve("ebook", "9784088725093") == ("paper", False)
+    # ISBN の無いものは id で。ISBN で寄せた id も同じ本とみなす
+    assert index.resolve("ebook", "") == ("paper", False)
+    assert index.resolve("kobo", "") == ("kobo", True)
+    assert index.resolve("kobo", "") == ("kobo", False)
+    assert index.duplicates == {"isbn": 1, "id": 2}
+
+
+def with_isbn(item, isbn):
+    item["Item"]["isbn"] = isbn
+    return item
+
+
+def books_catalog(params):
+    if params.get("title"):
+        return []
+    return [with_isbn(make_item(f"作品{n}", "作者", params["booksGenreId"]), f"97840000000{n:02d}") for n in range(40)]
+
+
+def ebook_catalog(params):
+    if params.get("title"):
+        return []
+    # 紙と同じ ISBN・著者表記違い（10件）と、電子のみ（5件）
+    return [with_isbn(make_item(f"作品{n}", "作 者", params["booksGenreId"]), f"97840000000{n:02d}" if n < 40 else "")
+            for n in range(30, 45)]
+
+
+def kobo_catalog(params):
+    if params.get("title"):
+        return []
+    return [{"Item": {"title": f"作品{n}（レーベルDIGITAL）", "author": "作者", "koboGenreId": "101904001",
+                      "largeImageUrl": "https://x/k.jpg"}} for n in range(35, 50)] + \
+           [{"Item": {"title": "小説 作品", "author": "作者", "koboGenreId": "101301", "largeImageUrl": "https://x/k.jpg"}}]
+
+
+def test_crawl_merges_sources(monkeypatch, tmp_path):
+    monkeypatch.setattr(generate_data, "LEGENDARY_TITLES", ["ONE PIECE"])
+    routes = {"BooksEbook/Search": ebook_catalog, "Kobo/EbookSearch": kobo_catalog}
+    with RakutenStub(books_catalog, routes=routes) as stub:
+        use_stub(monkeypatch, stub)
+        monkeypatch.setattr(generate_data, "BOOKS_EBOOK_URL", stub.url_for("BooksEbook/Search"))
+        monkeypatch.setattr(generate_data, "KOBO_BASE_URL", stub.url_for("Kobo/EbookSearch", "20170412"))
+        monkeypatch.setattr(generate_data, "HTTP_CLIENT", HTTPClient(limiter=TokenBucket(500, capacity=500), limiters={
+            "/services/api/Kobo/": TokenBucket(500, capacity=500)}))
+        series_map = generate_data.crawl_catalog(genres=["001001001"], workers=2, journal=journal_at(tmp_path),
+                                                 sources=["books", "ebook", "kobo"])
+        assert any("koboGenreId" in r for r in stub.requests)
+        # Kobo には Kobo のリファレンスにある sort だけを送る（sales は無い）
+        kobo_sorts = {r["sort"] for r in stub.requests if "koboGenreId" in r}
+        assert kobo_sorts <= set(KOBO_SORTS) and "sales" not in kobo_sorts
+    # 紙40件 + 電子のみ5件（ISBN なし・著者表記違い）+ Kobo のみ10件（40〜49、レーベル表記は正規化で落ちる）
+    assert len(series_map) == 40 + 5 + 10
+    # 重複は先に書いた取得元（紙）のものが残る
+    assert series_map[generate_data.hashlib.md5("作品30作者".encode()).hexdigest()[:12]].isbn == "9784000000030"
+    assert all(v.genre_id.startswith("001001") for v in series_map.values())
+
+
+def test_sort_must_be_documented_for_the_endpoint():
+    kobo = generate_data.SOURCES["kobo"]
+    assert set(kobo.crawl_sorts) <= set(KOBO_SORTS)
+    with pytest.raises(ValueError):
+        kobo.params("app", sort_method="sales")
+    assert generate_data.SOURCES["books"].params("app", sort_method="sales")["sort"] == "sales"
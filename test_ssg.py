@@ -0,0 +1,135 @@
+import json
+import os
+import shutil
+
+import generate_data
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def sample_manga(n=20):
+    items = []
+    for i in range(n):
+        sid = f"s{i // 5:011d}"
+        items.append({
+            "id": f"m{i:011d}", "title": f"テスト作品{i // 5} {i % 5 + 1}", "seriesId": sid,
+            "seriesTitle": f"テスト作品{i // 5}", "volumeNumber": str(i % 5 + 1), "isSpecial": False,
+            "description": "あらすじ", "commentary": "解説", "tags": ["作者", "漫画"], "author": "作者",
+            "rating": 4.8, "cover": f"https://thumbnail.image.rakuten.co.jp/{i}.jpg?_ex=300x420",
+            "genreId": "001001001", "isLegendary": False
+        })
+    return items
+
+
+def setup_site(monkeypatch, tmp_path):
+    shutil.copy(os.path.join(REPO_DIR, "index.html"), tmp_path / "index.html")
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(generate_data, "SSG_MANIFEST_PATH", str(tmp_path / ".cache" / "ssg_manifest.json"))
+
+
+def test_second_build_writes_nothing(monkeypatch, tmp_path):
+    setup_site(monkeypatch, tmp_path)
+    manga = sample_manga()
+    first = generate_data.generate_ssg(manga)
+    assert first.written == 20 + 4
+    second = generate_data.generate_ssg(manga)
+    assert second.written == 0
+    assert second.unchanged == 24
+
+
+def test_only_changed_pages_are_rewritten(monkeypatch, tmp_path):
+    setup_site(monkeypatch, tmp_path)
+    manga = sample_manga()
+    generate_data.generate_ssg(manga)
+    manga[7]["title"] = "改題された作品"
+    writer = generate_data.generate_ssg(manga)
+    assert writer.written == 1
+    with open("public/manga/m00000000007/index.html", encoding="utf-8") as f:
+        assert "改題された作品 - Manga Reach" in f.read()
+
+
+def test_removed_items_are_pruned(monkeypatch, tmp_path):
+    setup_site(monkeypatch, tmp_path)
+    manga = sample_manga()
+    generate_data.generate_ssg(manga)
+    writer = generate_data.generate_ssg(manga[:15])
+    assert writer.deleted == 5 + 1
+    assert not os.path.exists("public/manga/m00000000019")
+    assert not os.path.exists("public/series/s00000000003")
+    assert os.path.exists("public/manga/m00000000014/index.html")
+
+
+def test_without_manifest_compares_existing_files(monkeypatch, tmp_path):
+    setup_site(monkeypatch, tmp_path)
+    manga = sample_manga()
+    generate_data.generate_ssg(manga)
+    os.remove(generate_data.SSG_MANIFEST_PATH)
+    assert generate_data.generate_ssg(manga).written == 0
+    assert generate_data.generate_ssg(manga, incremental=False).written == 24
+
+
+def test_template_fills_slots_and_escapes():
+    from ssg_template import PageTemplate
+    template = PageTemplate.from_file(os.path.join(REPO_DIR, "index.html"))
+    page = template.render(title='A&B "X" - Manga Reach', description="説明<b>", og_title="og",
+                           og_image="https://example.com/a.jpg?x=1&y=2", canonical="https://manga-reach.com/manga/x")
+    assert '<title>A&amp;B &quot;X&quot; - Manga Reach</title>' in page
+    assert '<meta name="description" content="説明&lt;b&gt;" />' in page
+    assert '<meta property="og:image" content="https://example.com/a.jpg?x=1&amp;y=2" />' in page
+    assert '<link rel="canonical" href="https://manga-reach.com/manga/x" />' in page
+    assert page.count("<title>") == 1
+    # スロット以外はテンプレートのまま
+    assert page.endswith(template.statics[-1])
+
+
+def read_tree(root):
+    files = {}
+    for dirpath, _, names in os.walk(root):
+        for name in names:
+            path = os.path.join(dirpath, name)
+            with open(path, "rb") as f:
+                files[os.path.relpath(path, root)] = f.read()
+    return files
+
+
+def test_parallel_output_is_byte_identical(monkeypatch, tmp_path):
+    manga = sample_manga(60)
+    for name, workers in (("serial", 1), ("parallel", 3)):
+        site = tmp_path / name
+        site.mkdir()
+        setup_site(monkeypatch, site)
+        writer = generate_data.generate_ssg(manga, workers=workers)
+        assert writer.written == 60 + 12
+    serial = read_tree(tmp_path / "serial" / "public")
+    parallel = read_tree(tmp_path / "parallel" / "public")
+    assert len(serial) == 72
+    assert serial == parallel
+    assert sum(w["pages"] for w in writer.worker_stats) == 72
+
+
+def inline_data(page):
+    start = page.index('<script id="ssg-data" type="application/json">') + len('<script id="ssg-data" type="application/json">')
+    return json.loads(page[start:page.index("</script>", start)])
+
+
+def test_pages_are_prerendered_with_inline_data(monkeypatch, tmp_path):
+    setup_site(monkeypatch, tmp_path)
+    manga = sample_manga(10)
+    manga[0]["description"] = "あらすじ</script><b>"
+    manga[6]["volumeNumber"] = "9"
+    generate_data.generate_ssg(manga)
+    with open("public/manga/m00000000000/index.html", encoding="utf-8") as f:
+        page = f.read()
+    assert '<h1 class="detail-title">テスト作品0 1</h1>' in page
+    assert 'width="300" height="420"' in page
+    assert "<p>あらすじ&lt;/script&gt;&lt;b&gt;</p>" in page
+    assert inline_data(page) == {"manga": manga[0]}
+
+    with open("public/series/s00000000001/index.html", encoding="utf-8") as f:
+        page = f.read()
+    series = inline_data(page)["series"]
+    assert series["seriesId"] == "s00000000001"
+    # 巻は巻数順
+    assert [v["volumeNumber"] for v in series["volumes"]] == ["1", "3", "4", "5", "9"]
+    assert page.count('class="volume-card"') == 5
+    assert 'href="/manga/m00000000006"' in page
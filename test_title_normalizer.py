@@ -0,0 +1,35 @@
+from benchmarks import legacy_titles
+from benchmarks.title_corpus import title_corpus
+from generate_data import LEGENDARY_TITLES, NEGATIVE_KEYWORDS, NORMALIZER, SPECIAL_KEYWORDS
+from title_normalizer import TitleNormalizer
+
+
+def test_matches_previous_implementation_on_corpus():
+    for item in title_corpus(5000, seed=1):
+        v = item["Item"]
+        title = NORMALIZER.clean_title(v["title"])
+        assert title == legacy_titles.clean_title(v["title"])
+        assert NORMALIZER.is_manga(title, v["itemCaption"], v["booksGenreId"]) == \
+            legacy_titles.is_manga(title, v["itemCaption"], v["booksGenreId"], NEGATIVE_KEYWORDS, LEGENDARY_TITLES)
+        assert NORMALIZER.series_info(v["title"], v["author"]) == \
+            legacy_titles.get_series_info(v["title"], v["author"], SPECIAL_KEYWORDS, LEGENDARY_TITLES)
+
+
+def test_classify_page_reports_reasons():
+    items = [
+        {"Item": {"title": "ONE PIECE １０５", "author": "尾田栄一郎", "booksGenreId": "001001001"}},
+        {"Item": {"title": "週刊少年ジャンプ 2024年 10号", "author": "", "booksGenreId": "001001001"}},
+        {"Item": {"title": "ある作品 画集", "author": "誰か", "booksGenreId": "001001001"}},
+        {"Item": {"title": "実用書", "author": "誰か", "booksGenreId": "001004008"}},
+    ]
+    records = NORMALIZER.classify_page(items)
+    assert [r["reason"] for r in records] == [None, "magazine_issue", "negative_keyword", "genre"]
+    assert records[0]["seriesTitle"] == "ONE PIECE"
+    assert records[0]["volumeNumber"] == "105"
+    assert len(NORMALIZER.classify_page(items, keyword="one piece")) == 1
+
+
+def test_empty_keyword_lists_match_nothing():
+    normalizer = TitleNormalizer([], [], [])
+    assert normalizer.is_manga("何かの本", "", "001001001")
+    assert not normalizer.is_legendary("何かの本")
@@ -0,0 +1,109 @@
+import hashlib
+import re
+
+from series_resolver import PrefixTrie
+
+# タイトル正規化・漫画判定のコンパイル済みエンジン
+# キーワード群を起動時に一度だけ単一の選択正規表現へまとめ、レジェンダリータイトルの正規化形も事前計算する
+
+ZEN_TO_HAN = str.maketrans('０１２３４５６７８９', '0123456789')
+BRACKETS_RE = re.compile(r'\(.*?\)|（.*?）')
+SQUARE_BRACKETS_RE = re.compile(r'【.*?】|\[.*?\]')
+PARENS_RE = re.compile(r'[\(\)（）]')
+PUNCT_RE = re.compile(r'[!！?？:：\s]')
+TRAILING_NUM_RE = re.compile(r'(\d+)$')
+TRAILING_VOL_RE = re.compile(r'\s*\d+$')
+MAGAZINE_ISSUE_RE = re.compile(r'\d{4}年\s*\d+号|\d+号$')
+
+
+def _alternation(words, flags=0):
+    # 元のリスト順を保った選択（先に書かれた語が優先される）。空リストは何にもマッチしない
+    if not words:
+        return re.compile(r'(?!)')
+    return re.compile("|".join(re.escape(w) for w in words), flags)
+
+
+class TitleNormalizer:
+    def __init__(self, special_keywords, negative_keywords, legendary_titles):
+        self.legendary_titles = list(legendary_titles)
+        self.special_re = _alternation(special_keywords)
+        self.special_strip_re = _alternation(special_keywords, re.IGNORECASE)
+        self.negative_re = _alternation([nk.lower() for nk in negative_keywords])
+        self.legendary_upper_re = _alternation([lt.upper() for lt in legendary_titles])
+        self.legendary_lower_re = _alternation([lt.lower() for lt in legendary_titles])
+        # (正規化済みタイトル, 元のタイトル)
+        self.legendary_norm = [(PUNCT_RE.sub('', lt), lt) for lt in legendary_titles]
+        # 前方一致（どちら向きでも）をリストの先頭から探すのと同じ結果を、タイトルの長さ分たどるだけで引く
+        self.legendary_trie = PrefixTrie((norm_lt, (norm_lt, lt)) for norm_lt, lt in self.legendary_norm)
+
+    @staticmethod
+    def zen_to_han(text):
+        return text.translate(ZEN_TO_HAN)
+
+    @staticmethod
+    def clean_title(title):
+        title = title.translate(ZEN_TO_HAN)
+        cleaned = BRACKETS_RE.sub('', title)
+        cleaned = SQUARE_BRACKETS_RE.sub('', cleaned)
+        return PARENS_RE.sub('', cleaned).strip()
+
+    def is_legendary(self, title):
+        return bool(self.legendary_lower_re.search(title.lower()))
+
+    def is_manga(self, title, description, genre_id):
+        if genre_id and not genre_id.startswith("001001"): return False
+        # 有名作品リストに含まれていれば通過
+        if self.legendary_upper_re.search(title.upper()): return True
+        if MAGAZINE_ISSUE_RE.search(title): return False
+        text = (title + " " + (description or "")).lower()
+        return not self.negative_re.search(text)
+
+    def rejection_reason(self, title, description, genre_id):
+        # is_manga が False になる理由（計測・デバッグ用）。通過なら None
+        if genre_id and not genre_id.startswith("001001"): return "genre"
+        if self.legendary_upper_re.search(title.upper()): return None
+        if MAGAZINE_ISSUE_RE.search(title): return "magazine_issue"
+        if self.negative_re.search((title + " " + (description or "")).lower()): return "negative_keyword"
+        return None
+
+    def series_info(self, title, author):
+        title = self.clean_title(title)
+        is_special = bool(self.special_re.search(title))
+        vol_match = TRAILING_NUM_RE.search(PUNCT_RE.sub('', title))
+        vol_num = vol_match.group(1) if vol_match else "1"
+        # コア・シリーズ名（スペシャル系キーワードと末尾の巻数を除去）
+        core_title = self.special_strip_re.sub('', title).strip()
+        core_title = TRAILING_VOL_RE.sub('', core_title).strip()
+        normalized_core_name = PUNCT_RE.sub('', core_title)
+        # レジェンダリータイトルがあれば優先
+        legendary = self.legendary_trie.lookup(normalized_core_name)
+        if legendary:
+            normalized_core_name, core_title = legendary
+        if not normalized_core_name: normalized_core_name = "unknown"
+        series_id = hashlib.md5((normalized_core_name + author).encode()).hexdigest()[:12]
+        return series_id, core_title, vol_num, is_special
+
+    def classify_page(self, items, keyword=None, series=True):
+        # APIの1ページ分（{"Item": {...}} の列）をまとめて判定・正規化する
+        # keyword を指定した場合はタイトルにそれを含むものだけを対象にする
+        # series=False ならシリーズ情報の算出を省く（クロール中の判定のみの用途）
+        records = []
+        kw = keyword.lower() if keyword else None
+        for item in items:
+            v = item.get("Item", {})
+            title = self.clean_title(v.get("title", ""))
+            if kw and kw not in title.lower():
+                continue
+            caption = v.get("itemCaption", "")
+            reason = self.rejection_reason(title, caption, v.get("booksGenreId", ""))
+            author = v.get("author", "不明")
+            record = {
+                "id": hashlib.md5((title + author).encode()).hexdigest()[:12],
+                "title": title, "author": author, "item": v,
+                "is_manga": reason is None, "reason": reason
+            }
+            if series and reason is None:
+                series_id, core_title, vol_num, is_special = self.series_info(v.get("title", ""), author)
+                record.update(seriesId=series_id, seriesTitle=core_title, volumeNumber=vol_num, isSpecial=is_special)
+            records.append(record)
+        return records